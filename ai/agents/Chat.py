@@ -1,19 +1,27 @@
 """
 Repository Analysis Agents Module
 """
-from langchain_groq import ChatGroq
-from langgraph.prebuilt import create_react_agent
+from functools import lru_cache
 
-from ai.tools.rag_tool import retrieve_context
+from ai.agents.provider import get_llm
 
-llm = ChatGroq(
-        model="llama3-70b-8192",
-        temperature=0.4,
-        max_tokens=7000
-    )
 
-tools = [retrieve_context]
-ChatAgent = create_react_agent(
-        model=llm,
+@lru_cache(maxsize=1)
+def get_chat_agent():
+    from langgraph.prebuilt import create_react_agent
+
+    from ai.tools.rag_tool import retrieve_context
+    from ai.tools.code_navigation import find_symbol_definition, find_symbol_references, get_file_outline
+
+    tools = [retrieve_context, find_symbol_definition, find_symbol_references, get_file_outline]
+    return create_react_agent(
+        model=get_llm("ChatAgent"),
         tools=tools
     )
+
+
+def __getattr__(name):
+    # Совместимость: ChatAgent создаётся при первом обращении
+    if name == "ChatAgent":
+        return get_chat_agent()
+    raise AttributeError(name)
@@ -1,13 +1,20 @@
-from langchain_groq import ChatGroq
-from langgraph.prebuilt import create_react_agent
-
-llm = ChatGroq(
-    model="llama-3.3-70b-versatile",
-    temperature=0.3,
-    max_tokens=7000
-)
-
-CustomCriteria = create_react_agent(
-    model=llm,
-    tools=[]
-)
\ No newline at end of file
+from functools import lru_cache
+
+from ai.agents.provider import get_llm
+
+
+@lru_cache(maxsize=1)
+def get_custom_criteria_agent():
+    from langgraph.prebuilt import create_react_agent
+
+    return create_react_agent(
+        model=get_llm("CustomCriteria"),
+        tools=[]
+    )
+
+
+def __getattr__(name):
+    # Совместимость: CustomCriteria создаётся при первом обращении
+    if name == "CustomCriteria":
+        return get_custom_criteria_agent()
+    raise AttributeError(name)
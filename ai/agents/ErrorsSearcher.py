@@ -1,14 +1,20 @@
-from langgraph.prebuilt import create_react_agent
-from langchain_groq import ChatGroq
+from functools import lru_cache
 
+from ai.agents.provider import get_llm
 
-llm = ChatGroq(
-    model="llama-3.3-70b-versatile",
-    temperature=0,
-    max_tokens=5000
-)
 
-ErrorSearcher = create_react_agent(
-    model=llm,
-    tools=[]
-)
\ No newline at end of file
+@lru_cache(maxsize=1)
+def get_error_searcher():
+    from langgraph.prebuilt import create_react_agent
+
+    return create_react_agent(
+        model=get_llm("ErrorSearcher"),
+        tools=[]
+    )
+
+
+def __getattr__(name):
+    # Совместимость: ErrorSearcher создаётся при первом обращении
+    if name == "ErrorSearcher":
+        return get_error_searcher()
+    raise AttributeError(name)
@@ -1,24 +1,28 @@
-from langgraph.prebuilt import create_react_agent
-from langchain_groq import ChatGroq
-from ai.utils import load_agent_config, load_model_config
-from ai.tools.git_tools import get_code_author
+from functools import lru_cache
 
-agents_config = load_agent_config()
-models_config = load_model_config()
+from ai.agents.provider import get_llm
+from ai.config import get_prompt
 
 
-llm = ChatGroq(
-    model=models_config['TaskAllocationAgent']['model'],
-    temperature=models_config['TaskAllocationAgent']['temperature'],
-    max_tokens=5000
-)
+@lru_cache(maxsize=1)
+def get_task_allocation_agent():
+    from langgraph.prebuilt import create_react_agent
 
-TaskAllocationAgent = create_react_agent(
-    model=llm,
-    tools=[get_code_author],
-    prompt=agents_config['TaskAllocationAgent']['system_prompt'],
-    name="TaskAllocationAgent"
-)
+    # Без инструментов: авторы приходят в промпте из ai.tools.ownership,
+    # поэтому задача обходится одним обращением к модели
+    return create_react_agent(
+        model=get_llm("TaskAllocationAgent"),
+        tools=[],
+        prompt=get_prompt('TaskAllocationAgent', 'system_prompt'),
+        name="TaskAllocationAgent"
+    )
 
 
-__all__ = ["TaskAllocationAgent"]
\ No newline at end of file
+def __getattr__(name):
+    # Совместимость: TaskAllocationAgent создаётся при первом обращении
+    if name == "TaskAllocationAgent":
+        return get_task_allocation_agent()
+    raise AttributeError(name)
+
+
+__all__ = ["TaskAllocationAgent", "get_task_allocation_agent"]
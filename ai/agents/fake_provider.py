@@ -0,0 +1,217 @@
+"""
+Local stand-in for the LLM provider.
+
+Selected with `provider: fake` in models.yaml (or GITMETRICS_LLM_PROVIDER=fake
+for every entry). Answers are canned but schema-correct for the entry that
+asks: [ISSUE N] blocks (or the JSON issues object, when the prompt asks for
+it) for ErrorSearcher, [Task N] blocks for
+TaskAllocationAgent, yes/no for ChatGate, a JSON verdict for ErrorScreener and so on; they depend only on the
+prompt, so runs are reproducible. Latency, jitter and injected 429 errors make
+it usable for load tests of dispatchers, retries and rate limiters:
+
+    fake: {latency: 0.8, jitter: 0.3, rate_limit: 0.05, seed: 1}
+
+Every option can be overridden with GITMETRICS_FAKE_<OPTION>, e.g.
+GITMETRICS_FAKE_LATENCY=0.2.
+"""
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+import zlib
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional
+
+from ai.config import ModelSettings
+from ai.config.loader import FAKE_OPTIONS
+
+CRITICALITIES = ("низкий", "средний", "высокий")
+
+
+class FakeRateLimitError(Exception):
+    """Injected "429 Too Many Requests", shaped like the provider SDK errors"""
+
+    status_code = 429
+
+    def __init__(self, entry: str):
+        super().__init__(f"Error code: 429 - rate_limit_exceeded for {entry} (fake provider)")
+
+
+def _digest(text: str) -> int:
+    return int.from_bytes(hashlib.sha1(text.encode("utf-8")).digest()[:8], "big")
+
+
+def synthetic_issues(code: str) -> List[Dict[str, str]]:
+    """0-2 issues on lines that exist in the numbered code ("12: ...")"""
+    lines = len(re.findall(r"^\d+: ", code, re.MULTILINE)) or 1
+    digest = _digest(code)
+    issues = []
+    for number in range(1, digest % 3 + 1):
+        start = (digest >> (8 * number)) % lines + 1
+        end = min(lines, start + (digest >> (4 * number)) % 3)
+        issues.append({
+            "rows": f"{start}-{end}",
+            "error": f"Synthetic issue {number}",
+            "criticality": CRITICALITIES[(digest >> number) % 3],
+            "solution": f"Synthetic fix {number}",
+        })
+    return issues
+
+
+def issue_blocks(code: str) -> str:
+    """[ISSUE N] blocks of the synthetic issues"""
+    return "\n".join(
+        f"[ISSUE {number}]\n" + "".join(f"{key}: {value}\n" for key, value in issue.items())
+        for number, issue in enumerate(synthetic_issues(code), 1)
+    )
+
+
+def error_answer(prompt: str) -> str:
+    """JSON issues object if the prompt carries the output schema, [ISSUE N] blocks otherwise"""
+    if '"issues"' in prompt:
+        return json.dumps({"issues": synthetic_issues(prompt)}, ensure_ascii=False)
+    return issue_blocks(prompt)
+
+
+def screen_verdict(prompt: str) -> str:
+    """Screening verdict of the small model: issues in about half of the files, confidence 0.5-1"""
+    digest = _digest(prompt)
+    return json.dumps({"has_issues": bool(digest % 2), "confidence": round(0.5 + (digest >> 8) % 51 / 100, 2)})
+
+
+def task_blocks(prompt: str) -> str:
+    """1-3 [Task N] blocks, at least one for every file of the task prompt"""
+    files = list(dict.fromkeys(re.findall(r"Report for (\S+?)(?: \(part \d+/\d+\))?:\n", prompt)))
+    if not files:
+        file_match = re.search(r"for file: (\S+)", prompt)
+        files = [file_match.group(1) if file_match else "unknown"]
+    rows = re.findall(r'"rows": "(\d+-\d+)"', prompt) or ["1-1"]
+    digest = _digest(prompt)
+    blocks = []
+    for number in range(1, max(digest % 3 + 1, len(files)) + 1):
+        code_file = files[(number - 1) % len(files)]
+        blocks.append(
+            f"[Task {number}]\n"
+            f"  name: Synthetic task {number}\n"
+            f"  priority: {(digest >> number) % 91 / 10 + 1:.1f}\n"
+            f"  problem: Synthetic problem {number}\n"
+            f"  specification: Fix the synthetic problem {number}\n"
+            f"  code_file: {code_file}\n"
+            f"  rows: {rows[(number - 1) % len(rows)]}\n"
+            f"  author: Unknown\n"
+        )
+    return "\n".join(blocks)
+
+
+CANNED: Dict[str, Callable[[str], str]] = {
+    "ErrorSearcher": error_answer,
+    "ErrorScreener": screen_verdict,
+    "TaskAllocationAgent": task_blocks,
+    "ChatGate": lambda prompt: "yes" if _digest(prompt) % 4 else "no",
+    "ChatSummarizer": lambda prompt: f"Synthetic summary of {len(prompt)} characters of history",
+    "ComplexityAnalyzer": lambda prompt: f"Synthetic explanation ({_digest(prompt) % 50 + 1} branches)",
+    "ComplexityAnalyzerSmall": lambda prompt: (
+        screen_verdict(prompt) if '"has_issues"' in prompt
+        else f"Synthetic short explanation ({_digest(prompt) % 50 + 1} branches)"),
+}
+
+
+def canned_answer(entry: str, prompt: str) -> str:
+    answer = CANNED.get(entry)
+    return answer(prompt) if answer else f"Synthetic answer of {entry} to a {len(prompt)}-character prompt"
+
+
+def fake_options(settings: ModelSettings) -> Dict[str, float]:
+    """models.yaml `fake:` options with GITMETRICS_FAKE_* environment overrides"""
+    options = {"latency": 0.0, "jitter": 0.0, "rate_limit": 0.0, "seed": 0, **settings.fake}
+    for option in FAKE_OPTIONS:
+        value = os.getenv(f"GITMETRICS_FAKE_{option.upper()}")
+        if value:
+            options[option] = float(value)
+    return options
+
+
+class FakeBackend:
+    """Latency, jitter and 429 injection around canned answers; thread-safe"""
+
+    def __init__(self, entry: str, latency: float = 0.0, jitter: float = 0.0, rate_limit: float = 0.0,
+                 seed: float = 0, sleep: Callable[[float], None] = time.sleep):
+        self.entry = entry
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.sleep = sleep
+        self._random = random.Random(int(seed) ^ zlib.crc32(entry.encode("utf-8")))
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.rate_limited = 0
+
+    def respond(self, prompt: str) -> str:
+        with self._lock:
+            self.calls += 1
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+            limited = self._random.random() < self.rate_limit
+            if limited:
+                self.rate_limited += 1
+        if delay:
+            self.sleep(delay)
+        if limited:
+            raise FakeRateLimitError(self.entry)
+        return canned_answer(self.entry, prompt)
+
+
+def _prompt_of(messages: List) -> str:
+    """Text of the last user message (the agents put the task there)"""
+    for message in reversed(messages):
+        if getattr(message, "type", None) == "human":
+            return message.content if isinstance(message.content, str) else json.dumps(message.content)
+    return messages[-1].content if messages else ""
+
+
+@lru_cache(maxsize=1)
+def _fake_chat_model_class():
+    from langchain_core.language_models.chat_models import BaseChatModel
+    from langchain_core.messages import AIMessage
+    from langchain_core.outputs import ChatGeneration, ChatResult
+    from pydantic import ConfigDict
+
+    class FakeChatModel(BaseChatModel):
+        """LangChain chat model answering from a FakeBackend"""
+
+        model_config = ConfigDict(arbitrary_types_allowed=True)
+
+        entry: str
+        backend: FakeBackend
+
+        @property
+        def _llm_type(self) -> str:
+            return "gitmetrics-fake"
+
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+            prompt = _prompt_of(messages)
+            content = self.backend.respond(prompt)
+            tokens_in = sum(len(str(m.content)) for m in messages) // 4
+            tokens_out = len(content) // 4
+            message = AIMessage(content=content, usage_metadata={
+                "input_tokens": tokens_in, "output_tokens": tokens_out, "total_tokens": tokens_in + tokens_out,
+            })
+            return ChatResult(
+                generations=[ChatGeneration(message=message)],
+                llm_output={"model_name": f"fake:{self.entry}",
+                            "token_usage": {"prompt_tokens": tokens_in, "completion_tokens": tokens_out}},
+            )
+
+        def bind_tools(self, tools, **kwargs):
+            # Канонические ответы не вызывают инструменты
+            return self
+
+    return FakeChatModel
+
+
+def create_fake_llm(entry: str, settings: ModelSettings, callbacks: Optional[List] = None):
+    """Fake chat model for a models.yaml entry"""
+    backend = FakeBackend(entry, **fake_options(settings))
+    return _fake_chat_model_class()(entry=entry, backend=backend, callbacks=callbacks)
@@ -0,0 +1,40 @@
+"""
+Lazy construction of LLM clients.
+
+The backend of every models.yaml entry is its `provider`: groq (default) or
+fake, the local stand-in of ai/agents/fake_provider.py; GITMETRICS_LLM_PROVIDER
+overrides it for all entries (read when a client is first created).
+
+Clients are created on first use from the settings in ai/config/models.yaml and
+cached per model entry, so importing an agent or a graph module does not pull
+in the provider SDK or open HTTP clients. Every client reports its calls to
+ai.instrumentation (latency, tokens, retries, errors).
+"""
+import os
+from functools import lru_cache
+
+from ai.config import PROVIDERS, ConfigError, get_model_settings
+from ai.instrumentation import llm_callback
+
+
+@lru_cache(maxsize=None)
+def get_llm(name: str):
+    """Chat model for a models.yaml entry, e.g. get_llm("ErrorSearcher")"""
+    settings = get_model_settings(name)
+    provider = os.getenv("GITMETRICS_LLM_PROVIDER") or settings.provider
+    if provider not in PROVIDERS:
+        raise ConfigError(f"Unknown LLM provider {provider!r}, expected one of {', '.join(PROVIDERS)}")
+
+    if provider == "fake":
+        from ai.agents.fake_provider import create_fake_llm
+
+        return create_fake_llm(name, settings, callbacks=[llm_callback(name)])
+
+    from langchain_groq import ChatGroq
+
+    return ChatGroq(
+        model=settings.model,
+        temperature=settings.temperature,
+        max_tokens=settings.max_tokens,
+        callbacks=[llm_callback(name)]
+    )
@@ -0,0 +1,106 @@
+"""
+Model tiers: a small, fast model takes the first pass, the large one is asked
+only when it is needed.
+
+Configured per models.yaml entry:
+
+    ErrorSearcher:
+      routing:
+        small: ErrorScreener   # models.yaml entry of the small model
+        min_confidence: 0.7    # a "clean" verdict less sure than this is escalated
+
+    ComplexityAnalyzer:
+      routing:
+        small: ComplexityAnalyzerSmall
+        escalate: [high]       # criticalities that skip the screen and go to the large model
+
+Both agents work the same way: the small model screens the file (or the
+complex function) and answers {"has_issues", "confidence"}. The large model
+is called only when the screen flags something, is unsure or fails. For
+ErrorSearcher a confident "clean" verdict ends the analysis. For
+ComplexityAnalyzer it means the function is simple enough, so the small
+model writes the explanation and the simplification. Calls are timed per
+tier ("small"/"large") with ai.instrumentation.route and end up in the run
+report. GITMETRICS_ROUTING=off disables routing.
+"""
+import json
+import os
+import re
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from ai.agents.provider import get_llm
+from ai.config import get_model_settings
+from ai.instrumentation import incr, route
+from ai.progress import report_progress
+
+MIN_CONFIDENCE = 0.7
+ESCALATE = ("high",)
+
+
+class ScreenVerdict(NamedTuple):
+    has_issues: bool
+    confidence: float
+
+
+def routing_for(entry: str) -> Dict:
+    """`routing` section of a models.yaml entry; empty when routing is off"""
+    if os.getenv("GITMETRICS_ROUTING", "").lower() in ("off", "0", "false"):
+        return {}
+    return get_model_settings(entry).routing
+
+
+def parse_verdict(text: str) -> Optional[ScreenVerdict]:
+    """{"has_issues": bool, "confidence": 0..1} from the screen answer; None if there is none"""
+    match = re.search(r"\{.*?\}", text, re.DOTALL)
+    if not match:
+        return None
+    try:
+        data = json.loads(match.group(0))
+    except json.JSONDecodeError:
+        return None
+    has_issues, confidence = data.get("has_issues"), data.get("confidence")
+    if not isinstance(has_issues, bool) or not isinstance(confidence, (int, float)):
+        return None
+    return ScreenVerdict(has_issues, min(max(float(confidence), 0.0), 1.0))
+
+
+def screen(entry: str, prompt: str) -> Optional[ScreenVerdict]:
+    """Verdict of the entry's small model; None if the entry is not routed or the screen failed"""
+    small = routing_for(entry).get("small")
+    if not small:
+        return None
+    # Вызов считается и тогда, когда он завершился ошибкой
+    report_progress("llm_calls")
+    try:
+        with route(entry, "small"):
+            answer = get_llm(small).invoke(prompt)
+    except Exception as e:
+        print(f"Screening with {small} failed: {str(e)}")
+        incr(f"routing.{entry}.screen_failed")
+        return None
+    verdict = parse_verdict(answer.content if isinstance(answer.content, str) else "")
+    if verdict is None:
+        incr(f"routing.{entry}.screen_failed")
+    return verdict
+
+
+def needs_large_model(entry: str, verdict: Optional[ScreenVerdict]) -> bool:
+    """Escalate unless the screen is confident that there is nothing to find"""
+    if verdict is None:
+        return True
+    escalate = verdict.has_issues or verdict.confidence < routing_for(entry).get("min_confidence", MIN_CONFIDENCE)
+    incr(f"routing.{entry}.{'escalated' if escalate else 'resolved_small'}")
+    return escalate
+
+
+def tier_for(entry: str, criticality: str, screen_prompt: str) -> Tuple[str, str]:
+    """
+    (models.yaml entry, tier) that handles a fragment: criticalities listed in
+    `escalate` go to the large model directly, the rest are screened first
+    """
+    routing = routing_for(entry)
+    if not routing.get("small") or criticality in routing.get("escalate", ESCALATE):
+        return entry, "large"
+    if needs_large_model(entry, screen(entry, screen_prompt)):
+        return entry, "large"
+    return routing["small"], "small"
@@ -0,0 +1,12 @@
+"""
+Offline benchmarks of the analysis pipeline.
+
+    python -m ai.benchmarks run --files 300 --mix py=6,cpp=3,java=1
+    python -m ai.benchmarks compare
+
+A synthetic repository of the requested size and language mix is generated
+locally, the lint, complexity and triage (LLM error search) stages run on it
+with the LLM agents replaced by a deterministic stub, and throughput, peak RSS
+and per-stage times are appended to storage/benchmarks.jsonl, so runs of
+different versions can be compared.
+"""
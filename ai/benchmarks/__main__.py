@@ -0,0 +1,98 @@
+"""
+python -m ai.benchmarks run|compare
+
+`run` appends a result to the history and, if a previous run with the same
+configuration exists, compares against it; `compare` only compares the two
+latest runs of the same configuration. Both exit with 1 on a regression.
+"""
+import argparse
+import sys
+from typing import List, Optional
+
+from ai.benchmarks.runner import (
+    DEFAULT_TOLERANCE,
+    RESULTS_PATH,
+    STAGES,
+    append_result,
+    compare_runs,
+    find_baseline,
+    format_result,
+    load_results,
+    run_benchmark,
+)
+from ai.benchmarks.synthetic import parse_mix
+from ai.cli import EXIT_FAILED, EXIT_OK, EXIT_USAGE
+
+
+def _report(baseline, current, tolerance: float) -> int:
+    if baseline is None:
+        print("No earlier run with the same configuration to compare with")
+        return EXIT_OK
+    regressions = compare_runs(baseline, current, tolerance)
+    print(f"Compared with {baseline['version']}:")
+    for regression in regressions:
+        print(f"  REGRESSION {regression}")
+    if not regressions:
+        print("  no regressions")
+    return EXIT_FAILED if regressions else EXIT_OK
+
+
+def command_run(args) -> int:
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return EXIT_USAGE
+    history = load_results(args.results)
+    try:
+        result = run_benchmark(args.files, mix, args.functions, args.seed, args.stages, args.llm_latency)
+    except ImportError as e:
+        print(f"The analysis dependencies are not installed (pip install -r requirements.txt): {e}",
+              file=sys.stderr)
+        return EXIT_FAILED
+    print(format_result(result))
+    if not args.no_save:
+        append_result(result, args.results)
+    return _report(find_baseline(history, result), result, args.tolerance)
+
+
+def command_compare(args) -> int:
+    history = load_results(args.results)
+    if not history:
+        print(f"No benchmark results in {args.results}", file=sys.stderr)
+        return EXIT_USAGE
+    current = history[-1]
+    print(format_result(current))
+    return _report(find_baseline(history, current), current, args.tolerance)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m ai.benchmarks",
+                                     description="Offline benchmarks on synthetic repositories")
+    parser.add_argument("--results", default=RESULTS_PATH, help=f"results history (default: {RESULTS_PATH})")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="relative slowdown treated as a regression (default: 0.2)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="benchmark the current code")
+    run.add_argument("--files", type=int, default=100, help="files in the synthetic repository")
+    run.add_argument("--mix", default="py=6,cpp=3,java=1", help="language weights")
+    run.add_argument("--functions", type=int, default=5, help="functions per file")
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    run.add_argument("--llm-latency", type=float, default=0.0, help="simulated seconds per LLM call")
+    run.add_argument("--no-save", action="store_true", help="do not append the result to the history")
+    run.set_defaults(handler=command_run)
+
+    compare = commands.add_parser("compare", help="compare the latest run with the previous one")
+    compare.set_defaults(handler=command_compare)
+
+    args = parser.parse_args(argv)
+    if getattr(args, "files", 1) < 1:
+        print("--files must be at least 1", file=sys.stderr)
+        return EXIT_USAGE
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+"""
+Benchmark runs and their history.
+
+A run generates a synthetic repository, executes the stages of
+integrated_code_analysis_graph directly on it (no clone, no vector store) with
+stubbed LLM agents and returns per-stage time, files/s and growth of the peak
+RSS (the process peak only goes up, so a stage is charged with what it added
+on top of the earlier ones), plus the peak RSS of the whole run. The lint
+stage keeps pylint/cpplint but skips clang-format (it runs through sudo from a
+machine-specific path): C/C++/Java files are passed through unformatted.
+Results are appended as JSON lines; compare_runs() finds regressions against
+the previous run with the same configuration.
+"""
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional
+
+from ai.benchmarks.stub_llm import stub_llm_agents
+from ai.benchmarks.synthetic import DEFAULT_MIX, generate_repo
+from ai.instrumentation import recording
+
+RESULTS_PATH = os.path.join("storage", "benchmarks.jsonl")
+STAGES = ("lint", "complexity", "triage")
+
+# Рост времени/памяти больше чем на столько считается регрессией
+DEFAULT_TOLERANCE = 0.2
+# Стадии быстрее этого порога слишком шумные для сравнения
+MIN_COMPARABLE_SECONDS = 0.05
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process in MB (None where resource is unavailable)"""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux отдает килобайты, macOS — байты
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+
+
+def code_version() -> str:
+    """Commit of the analyzed code base ("+dirty" with local changes), "unknown" outside git"""
+    repo = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    try:
+        sha = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=repo, capture_output=True,
+                             text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=repo,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return sha + ("+dirty" if dirty else "")
+
+
+def _stage_functions():
+    from ai.graphs import code_analyse
+
+    return {
+        "lint": (code_analyse.process_all_files_lint, "linter_results"),
+        "complexity": (code_analyse.process_all_files_complexity, "complexity_results"),
+        "triage": (code_analyse.process_all_files_errors, "error_results"),
+    }
+
+
+@contextmanager
+def _skip_clang_format():
+    from ai.graphs import code_analyse
+
+    saved = code_analyse.clang_format
+    code_analyse.clang_format = lambda code, *args: code
+    try:
+        yield
+    finally:
+        code_analyse.clang_format = saved
+
+
+def run_benchmark(files: int = 100, mix: Optional[Dict[str, int]] = None, functions_per_file: int = 5,
+                  seed: int = 0, stages: Iterable[str] = STAGES, llm_latency: float = 0.0) -> Dict:
+    """One benchmark run; a stage that fails as a whole is reported with its error"""
+    mix = mix or DEFAULT_MIX
+    config = {"files": files, "mix": mix, "functions_per_file": functions_per_file, "seed": seed,
+              "stages": list(stages), "llm_latency": llm_latency}
+    root = tempfile.mkdtemp(prefix="gitmetrics-bench-")
+    try:
+        file_paths = generate_repo(root, files, mix, functions_per_file, seed=seed)
+        state = {"root_path": root, "file_paths": file_paths, "use_llm": True}
+        results = {}
+        started = time.perf_counter()
+        with recording() as recorder, stub_llm_agents(llm_latency), _skip_clang_format():
+            stage_functions = _stage_functions()
+            for stage in config["stages"]:
+                function, key = stage_functions[stage]
+                rss_before = peak_rss_mb()
+                stage_started = time.perf_counter()
+                try:
+                    output = function(state)[key]
+                except Exception as e:
+                    results[stage] = {"error": "".join(traceback.format_exception_only(e)).strip()}
+                    continue
+                seconds = time.perf_counter() - stage_started
+                rss_after = peak_rss_mb()
+                results[stage] = {
+                    "seconds": round(seconds, 4),
+                    "files_per_second": round(len(file_paths) / seconds, 2) if seconds else None,
+                    "failed_files": sum(1 for item in output if "error" in item),
+                    "rss_growth_mb": round(rss_after - rss_before, 1) if rss_after is not None else None,
+                }
+        total = time.perf_counter() - started
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    snapshot = recorder.snapshot()
+    return {
+        "timestamp": time.time(),
+        "version": code_version(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": config,
+        "stages": results,
+        "total_seconds": round(total, 4),
+        "files_per_second": round(files / total, 2) if total else None,
+        "peak_rss_mb": peak_rss_mb(),
+        "llm": snapshot["llm"],
+    }
+
+
+def append_result(result: Dict, path: str = RESULTS_PATH) -> None:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+
+def load_results(path: str = RESULTS_PATH) -> List[Dict]:
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def config_key(result: Dict) -> str:
+    return json.dumps(result["config"], sort_keys=True)
+
+
+def find_baseline(results: List[Dict], current: Dict) -> Optional[Dict]:
+    """Latest earlier run with the same configuration"""
+    key = config_key(current)
+    for result in reversed(results):
+        if result is not current and config_key(result) == key and result["timestamp"] < current["timestamp"]:
+            return result
+    return None
+
+
+def _grew(before: Optional[float], after: Optional[float], tolerance: float) -> bool:
+    return before is not None and after is not None and after > before * (1 + tolerance)
+
+
+def compare_runs(baseline: Dict, current: Dict, tolerance: float = DEFAULT_TOLERANCE) -> List[str]:
+    """Human-readable regressions of `current` against `baseline`; empty if none"""
+    regressions = []
+    for stage, after in current["stages"].items():
+        before = baseline["stages"].get(stage)
+        if not before:
+            continue
+        if "error" in after and "error" not in before:
+            regressions.append(f"{stage}: now fails ({after['error']})")
+            continue
+        seconds_before, seconds_after = before.get("seconds"), after.get("seconds")
+        if (seconds_after or 0) >= MIN_COMPARABLE_SECONDS and _grew(seconds_before, seconds_after, tolerance):
+            regressions.append(f"{stage}: {seconds_before:.3f}s -> {seconds_after:.3f}s")
+        if after.get("failed_files", 0) > before.get("failed_files", 0):
+            regressions.append(f"{stage}: failed files {before.get('failed_files', 0)} -> {after['failed_files']}")
+    if _grew(baseline.get("peak_rss_mb"), current.get("peak_rss_mb"), tolerance):
+        regressions.append(f"peak RSS: {baseline['peak_rss_mb']} MB -> {current['peak_rss_mb']} MB")
+    return regressions
+
+
+def format_result(result: Dict) -> str:
+    config = result["config"]
+    mix = ",".join(f"{language}={weight}" for language, weight in config["mix"].items())
+    lines = [f"{result['version']}: {config['files']} files ({mix}), seed {config['seed']}"]
+    for stage, stats in result["stages"].items():
+        if "error" in stats:
+            lines.append(f"  {stage:<12} FAILED: {stats['error']}")
+        else:
+            growth = stats.get("rss_growth_mb")
+            lines.append(f"  {stage:<12} {stats['seconds']:8.3f}s {stats['files_per_second'] or 0:10.1f} files/s"
+                         f"  failed files: {stats['failed_files']}"
+                         + (f"  peak RSS +{growth} MB" if growth is not None else ""))
+    lines.append(f"  {'total':<12} {result['total_seconds']:8.3f}s {result['files_per_second'] or 0:10.1f} files/s"
+                 f"  peak RSS: {result['peak_rss_mb']} MB")
+    return "\n".join(lines)
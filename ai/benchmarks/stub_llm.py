@@ -0,0 +1,111 @@
+"""
+Deterministic stand-ins for the LLM agents, so benchmarks run offline.
+
+The answers depend only on the prompt (a hash of it), have the format the
+real parsers expect (ErrorSearcher answers of the fake provider, chain
+{"text": ...} results) and are reported to ai.instrumentation like real
+calls. An optional fixed latency simulates the provider round trip.
+
+Unlike `provider: fake` this bypasses LangChain entirely, so the benchmark
+measures the analysis stages rather than the agent framework.
+"""
+import hashlib
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from ai.agents.fake_provider import canned_answer, error_answer as error_report
+from ai.instrumentation import get_recorder
+
+STUB_MODEL = "stub"
+
+
+@dataclass
+class StubMessage:
+    content: str
+
+
+def _digest(text: str) -> int:
+    return int.from_bytes(hashlib.sha1(text.encode("utf-8")).digest()[:8], "big")
+
+
+def _tokens(text: str) -> int:
+    # Грубая оценка: ~4 символа на токен
+    return max(1, len(text) // 4)
+
+
+class StubLLM:
+    """Base: one recorded "call" per invoke"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+
+    def _answer(self, prompt: str, answer: str) -> str:
+        started = time.perf_counter()
+        if self.latency:
+            time.sleep(self.latency)
+        self.calls += 1
+        get_recorder().record_llm_call(STUB_MODEL, time.perf_counter() - started, _tokens(prompt), _tokens(answer))
+        return answer
+
+
+class StubErrorSearcher(StubLLM):
+    """
+    Replaces get_error_searcher(): invoke({"messages": [...]}) -> {"messages": [..., answer]};
+    stream(..., stream_mode="messages") yields the answer as one (message, metadata) chunk
+    """
+
+    def invoke(self, inputs):
+        prompt = inputs["messages"][-1]["content"]
+        return {"messages": [StubMessage(self._answer(prompt, error_report(prompt)))]}
+
+    def stream(self, inputs, stream_mode="messages"):
+        yield self.invoke(inputs)["messages"][-1], {}
+
+
+class StubChain(StubLLM):
+    """Replaces an LLMChain of the complexity analysis: invoke({"code": ...}) -> {"text": ...}"""
+
+    def __init__(self, kind: str, latency: float = 0.0):
+        super().__init__(latency)
+        self.kind = kind
+
+    def invoke(self, inputs):
+        code = inputs["code"]
+        return {"text": self._answer(code, f"Synthetic {self.kind} for a {_digest(code) % 50 + 1}-branch function")}
+
+
+class StubChatModel(StubLLM):
+    """Replaces get_llm(entry) of the model routing: invoke(prompt) -> message with the canned answer"""
+
+    def __init__(self, entry: str, latency: float = 0.0):
+        super().__init__(latency)
+        self.entry = entry
+
+    def invoke(self, prompt):
+        return StubMessage(self._answer(prompt, canned_answer(self.entry, prompt)))
+
+
+@contextmanager
+def stub_llm_agents(latency: float = 0.0):
+    """
+    Point the integrated analysis graph at the stubs for the duration of the block.
+
+    Yields:
+        tuple: (error searcher stub, reason chain stub, simplify chain stub)
+    """
+    from ai.agents import routing
+    from ai.graphs import code_analyse
+
+    searcher = StubErrorSearcher(latency)
+    chains = (StubChain("reason", latency), StubChain("simplification", latency))
+    # Оба уровня модели сложности отвечают одними и теми же заглушками
+    saved = code_analyse.get_error_searcher, code_analyse.get_complexity_chains, routing.get_llm
+    code_analyse.get_error_searcher = lambda: searcher
+    code_analyse.get_complexity_chains = lambda entry="ComplexityAnalyzer": chains
+    routing.get_llm = lambda entry: StubChatModel(entry, latency)
+    try:
+        yield (searcher, *chains)
+    finally:
+        code_analyse.get_error_searcher, code_analyse.get_complexity_chains, routing.get_llm = saved
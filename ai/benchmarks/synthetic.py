@@ -0,0 +1,111 @@
+"""
+Generator of synthetic repositories for the benchmarks.
+
+The output depends only on the arguments (and the seed), so the same
+benchmark configuration always analyzes the same code. Functions get a
+random number of branches, so every complexity level (low/medium/high) and
+therefore the LLM explanation path is exercised.
+"""
+import os
+import random
+from typing import Dict, List, Optional
+
+LANGUAGES = ("py", "cpp", "java")
+DEFAULT_MIX = {"py": 6, "cpp": 3, "java": 1}
+
+# Каталоги внутри синтетического репозитория
+LANGUAGE_DIRS = {"py": "app", "cpp": "src", "java": "java/com/example"}
+
+
+def parse_mix(text: str) -> Dict[str, int]:
+    """"py=6,cpp=3,java=1" -> {"py": 6, "cpp": 3, "java": 1}"""
+    mix = {}
+    for part in filter(None, (p.strip() for p in text.split(","))):
+        language, _, weight = part.partition("=")
+        language = language.strip().lower()
+        if language not in LANGUAGES:
+            raise ValueError(f"Unknown language {language!r}, expected one of {', '.join(LANGUAGES)}")
+        try:
+            mix[language] = int(weight) if weight else 1
+        except ValueError:
+            raise ValueError(f"Bad weight in {part!r}") from None
+        if mix[language] < 0:
+            raise ValueError(f"Negative weight in {part!r}")
+    if not any(mix.values()):
+        raise ValueError("Language mix is empty")
+    return mix
+
+
+def split_counts(files: int, mix: Dict[str, int]) -> Dict[str, int]:
+    """Number of files per language, proportional to the weights (largest remainder)"""
+    total = sum(mix.values())
+    exact = {language: files * weight / total for language, weight in mix.items()}
+    counts = {language: int(value) for language, value in exact.items()}
+    leftover = files - sum(counts.values())
+    for language in sorted(exact, key=lambda l: (counts[l] - exact[l], l))[:leftover]:
+        counts[language] += 1
+    return counts
+
+
+def _conditions(rng: random.Random, branches: int, var: str) -> List[str]:
+    return [f"{var} {rng.choice(('>', '<', '=='))} {rng.randint(0, 100)}" for _ in range(branches)]
+
+
+def python_function(rng: random.Random, index: int, branches: int) -> str:
+    lines = [f"def function_{index}(value, items):", f'    """Synthetic function {index}"""', "    total = 0"]
+    for condition in _conditions(rng, branches, "value"):
+        lines += [f"    if {condition}:", f"        total += {rng.randint(1, 9)}"]
+    lines += ["    for item in items:", "        total += item", "    return total", ""]
+    return "\n".join(lines)
+
+
+def cpp_function(rng: random.Random, index: int, branches: int) -> str:
+    lines = [f"int function_{index}(int value, const std::vector<int>& items) {{", "    int total = 0;"]
+    for condition in _conditions(rng, branches, "value"):
+        lines += [f"    if ({condition}) {{", f"        total += {rng.randint(1, 9)};", "    }"]
+    lines += ["    for (int item : items) {", "        total += item;", "    }", "    return total;", "}", ""]
+    return "\n".join(lines)
+
+
+def java_function(rng: random.Random, index: int, branches: int) -> str:
+    lines = [f"    public static int function{index}(int value, int[] items) {{", "        int total = 0;"]
+    for condition in _conditions(rng, branches, "value"):
+        lines += [f"        if ({condition}) {{", f"            total += {rng.randint(1, 9)};", "        }"]
+    lines += ["        for (int item : items) {", "            total += item;", "        }",
+              "        return total;", "    }", ""]
+    return "\n".join(lines)
+
+
+def render_file(language: str, name: str, rng: random.Random, functions: int, max_branches: int) -> str:
+    bodies = [
+        {"py": python_function, "cpp": cpp_function, "java": java_function}[language](
+            rng, index, rng.randint(0, max_branches))
+        for index in range(functions)
+    ]
+    if language == "py":
+        return f'"""Synthetic module {name}"""\n\n\n' + "\n\n".join(bodies)
+    if language == "cpp":
+        return "#include <vector>\n\n" + "\n".join(bodies)
+    return f"package com.example;\n\npublic class {name} {{\n\n" + "\n".join(bodies) + "}\n"
+
+
+def generate_repo(root: str, files: int = 100, mix: Optional[Dict[str, int]] = None,
+                  functions_per_file: int = 5, max_branches: int = 10, seed: int = 0) -> List[str]:
+    """
+    Write a synthetic repository into `root`.
+
+    Returns:
+        list: file paths relative to root, as clone_repo produces them
+    """
+    rng = random.Random(seed)
+    paths = []
+    for language, count in split_counts(files, mix or DEFAULT_MIX).items():
+        directory = LANGUAGE_DIRS[language]
+        os.makedirs(os.path.join(root, directory), exist_ok=True)
+        for index in range(count):
+            name = f"Module{index}" if language == "java" else f"module_{index}"
+            path = os.path.join(directory, f"{name}.{language}")
+            with open(os.path.join(root, path), "w", encoding="utf-8") as f:
+                f.write(render_file(language, name, rng, functions_per_file, max_branches))
+            paths.append(path)
+    return paths
@@ -0,0 +1,192 @@
+"""
+Headless entry point for the analysis graphs.
+
+    python -m ai.cli analyze https://github.com/user/repo [more urls]
+    python -m ai.cli analyze --repos-file repos.txt --workers 4 --summary runs.json
+    python -m ai.cli delta --repo https://github.com/user/repo --base main --head feature
+
+Repositories are analyzed in separate processes; each prints its progress and
+per-stage timings. Exit codes: 0 - everything succeeded, 1 - at least one
+repository failed (or, with --fail-on-new, the delta has new issues), 2 - bad
+arguments.
+"""
+import argparse
+import json
+import multiprocessing
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+
+
+def load_repo_list(urls: List[str], repos_file: Optional[str]) -> List[str]:
+    """URLs from the command line and the file (one per line, # comments), without duplicates"""
+    repos = list(urls)
+    if repos_file:
+        with open(repos_file, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.split("#", 1)[0].strip()
+                if line:
+                    repos.append(line)
+    return list(dict.fromkeys(repos))
+
+
+def _log(repo: str, message: str) -> None:
+    print(f"[{repo}] {message}", flush=True)
+
+
+def analyze_repository(repo_url: str, storage: str, force: bool, use_llm: bool) -> Dict:
+    """Worker: full analysis of one repository; never raises"""
+    from ai.pipeline import repo_storage_name, run_all_analyses
+
+    name = repo_storage_name(repo_url)
+    started = time.perf_counter()
+    _log(name, "started")
+    try:
+        outcome = run_all_analyses(
+            repo_url, storage_base=storage, force=force, use_llm=use_llm, search_errors=use_llm,
+            on_stage=lambda stage, seconds: _log(name, f"{stage} done in {seconds:.1f}s"),
+        )
+    except Exception as e:
+        _log(name, f"failed: {e}")
+        return {"repo": repo_url, "ok": False, "error": "".join(traceback.format_exception_only(e)).strip(),
+                "seconds": time.perf_counter() - started, "timings": {}}
+
+    result = outcome["result"]
+    # Строковый результат — либо "Анализ не требуется", либо описание ошибки
+    ok = not isinstance(result, str) or result == "Анализ не требуется"
+    summary = {
+        "repo": repo_url,
+        "ok": ok,
+        "storage_dir": outcome["storage_dir"],
+        "seconds": time.perf_counter() - started,
+        "timings": outcome.get("timings", {}),
+    }
+    if isinstance(result, str):
+        summary["message"] = result
+    _log(name, f"{'finished' if ok else 'failed'} in {summary['seconds']:.1f}s"
+               + (f": {result}" if isinstance(result, str) else ""))
+    return summary
+
+
+def run_batch(repos: List[str], workers: int, storage: str, force: bool, use_llm: bool) -> List[Dict]:
+    if workers <= 1:
+        return [analyze_repository(repo, storage, force, use_llm) for repo in repos]
+
+    # spawn: дочерние процессы не наследуют потоки и клиенты родителя
+    context = multiprocessing.get_context("spawn")
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        futures = {pool.submit(analyze_repository, repo, storage, force, use_llm): repo for repo in repos}
+        for done, future in enumerate(as_completed(futures), start=1):
+            try:
+                results.append(future.result())
+            except Exception as e:  # процесс упал целиком
+                results.append({"repo": futures[future], "ok": False, "error": str(e), "timings": {}})
+            print(f"Progress: {done}/{len(repos)} repositories", flush=True)
+    return results
+
+
+def format_summary(results: List[Dict]) -> str:
+    lines = []
+    for result in results:
+        status = "OK  " if result["ok"] else "FAIL"
+        line = f"{status} {result['repo']} ({result.get('seconds', 0):.1f}s)"
+        if result.get("message") or result.get("error"):
+            line += f" - {result.get('message') or result.get('error')}"
+        lines.append(line)
+        for stage, seconds in sorted(result.get("timings", {}).items(), key=lambda item: -item[1]):
+            lines.append(f"       {stage:<32} {seconds:8.2f}s")
+    return "\n".join(lines)
+
+
+def command_analyze(args) -> int:
+    try:
+        repos = load_repo_list(args.urls, args.repos_file)
+    except OSError as e:
+        print(f"Cannot read {args.repos_file}: {e}", file=sys.stderr)
+        return EXIT_USAGE
+    if not repos:
+        print("No repositories to analyze", file=sys.stderr)
+        return EXIT_USAGE
+
+    results = run_batch(repos, args.workers, args.storage, args.force, not args.no_llm)
+    print(format_summary(results))
+    if args.summary:
+        with open(args.summary, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    return EXIT_OK if all(result["ok"] for result in results) else EXIT_FAILED
+
+
+def command_delta(args) -> int:
+    from ai.graphs.delta_analysis_graph import delta_analysis_graph
+    from ai.pipeline import run_graph_with_timings
+
+    state = {
+        "base_ref": args.base,
+        "head_ref": args.head,
+        "use_llm": not args.no_llm,
+        "context_lines": args.context,
+    }
+    state["repo_url" if "://" in args.repo or args.repo.startswith("git@") else "repo_path"] = args.repo
+    if args.output:
+        state["output_delta_path"] = args.output
+
+    try:
+        result, timings = run_graph_with_timings(
+            delta_analysis_graph, state,
+            on_stage=lambda stage, seconds: print(f"{stage} done in {seconds:.1f}s", flush=True),
+        )
+    except Exception as e:
+        print(f"Delta analysis failed: {e}", file=sys.stderr)
+        return EXIT_FAILED
+
+    summary = result["delta_report"]["summary"]
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    if args.fail_on_new and summary["new_total"] > 0:
+        return EXIT_FAILED
+    return EXIT_OK
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m ai.cli", description="GitMetrics headless analysis")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    analyze = commands.add_parser("analyze", help="full analysis of one or many repositories")
+    analyze.add_argument("urls", nargs="*", help="repository URLs")
+    analyze.add_argument("--repos-file", help="file with one repository URL per line")
+    analyze.add_argument("--workers", type=int, default=1, help="repositories analyzed in parallel")
+    analyze.add_argument("--storage", default="storage", help="storage directory (default: storage)")
+    analyze.add_argument("--force", action="store_true", help="analyze even if reports are up to date")
+    analyze.add_argument("--no-llm", action="store_true",
+                         help="do not call the LLM: skip the error search and explanations of complex code")
+    analyze.add_argument("--summary", help="write per-repository results and timings as JSON")
+    analyze.set_defaults(handler=command_analyze)
+
+    delta = commands.add_parser("delta", help="analyze only what changed between two refs")
+    delta.add_argument("--repo", required=True, help="repository URL or local path")
+    delta.add_argument("--base", required=True, help="base ref, e.g. origin/main")
+    delta.add_argument("--head", required=True, help="head ref, e.g. the PR branch")
+    delta.add_argument("--context", type=int, default=5, help="context lines around changed hunks")
+    delta.add_argument("--output", help="write the delta report as JSON")
+    delta.add_argument("--no-llm", action="store_true", help="skip the LLM error search")
+    delta.add_argument("--fail-on-new", action="store_true", help="exit with 1 if there are new issues")
+    delta.set_defaults(handler=command_delta)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if getattr(args, "workers", 1) < 1:
+        print("--workers must be at least 1", file=sys.stderr)
+        return EXIT_USAGE
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,27 @@
+from ai.config.loader import (
+    ConfigError,
+    ModelSettings,
+    PROVIDERS,
+    YamlConfig,
+    agents_config,
+    get_agent_setting,
+    get_model_settings,
+    get_prompt,
+    load_agent_config,
+    load_model_config,
+    models_config,
+)
+
+__all__ = [
+    "ConfigError",
+    "ModelSettings",
+    "PROVIDERS",
+    "YamlConfig",
+    "agents_config",
+    "get_agent_setting",
+    "get_model_settings",
+    "get_prompt",
+    "load_agent_config",
+    "load_model_config",
+    "models_config",
+]
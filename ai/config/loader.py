@@ -0,0 +1,179 @@
+"""
+Cached access to the YAML configuration in ai/config.
+
+Files are resolved relative to this package (not the working directory), parsed
+once, validated against a small schema and re-read only when their mtime or size
+changes. A broken edit of a file that was already loaded keeps the last valid
+version in place instead of failing running workers.
+"""
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, NamedTuple, Optional, Sequence
+
+import yaml
+
+CONFIG_DIR = Path(__file__).resolve().parent
+
+
+class ConfigError(ValueError):
+    """Configuration file is missing, unreadable or does not match the schema"""
+
+
+class ModelSettings(NamedTuple):
+    model: str
+    temperature: float
+    max_tokens: Optional[int] = None
+    provider: str = "groq"
+    # Параметры локального провайдера: latency, jitter, rate_limit, seed
+    fake: Dict[str, float] = {}
+    # Маршрутизация: small - запись дешевой модели, min_confidence, escalate
+    routing: Dict[str, Any] = {}
+
+
+PROVIDERS = ("groq", "fake")
+FAKE_OPTIONS = ("latency", "jitter", "rate_limit", "seed")
+ROUTING_OPTIONS = ("small", "min_confidence", "escalate")
+
+
+# Section -> keys that must be present
+AGENTS_SCHEMA = {
+    "ErrorSearcher": ("system_prompt", "user_prompt_template", "output_mode", "max_reasks",
+                      "json_prompt_template", "reask_template", "screen_prompt_template"),
+    "CodeAnalyzer": ("system_prompt", "user_prompt_template"),
+    "ComplexityAnalyzer": ("reason_template", "simplify_template", "screen_template"),
+    "ChatAgent": ("is_code_related_prompt", "system_prompt", "context_message",
+                  "gate", "retrieval", "history"),
+    "TaskAllocationAgent": ("system_prompt", "message", "concurrency", "batching"),
+}
+MODELS_SCHEMA = {
+    name: ("model", "temperature")
+    for name in ("TaskAllocationAgent", "ChatSummarizer", "ErrorSearcher", "CustomCriteria",
+                 "ChatAgent", "ChatGate", "ComplexityAnalyzer")
+}
+
+
+def _validate_models(data: Dict, path: Path) -> None:
+    for name, section in data.items():
+        if not isinstance(section, dict) or not isinstance(section.get("model"), str):
+            raise ConfigError(f"{path}: {name}.model must be a string")
+        if not isinstance(section.get("temperature", 0), (int, float)):
+            raise ConfigError(f"{path}: {name}.temperature must be a number")
+        max_tokens = section.get("max_tokens")
+        if max_tokens is not None and not isinstance(max_tokens, int):
+            raise ConfigError(f"{path}: {name}.max_tokens must be an integer")
+        if section.get("provider", "groq") not in PROVIDERS:
+            raise ConfigError(f"{path}: {name}.provider must be one of {', '.join(PROVIDERS)}")
+        fake = section.get("fake", {})
+        if not isinstance(fake, dict) or any(
+                key not in FAKE_OPTIONS or not isinstance(value, (int, float)) for key, value in fake.items()):
+            raise ConfigError(f"{path}: {name}.fake must map {', '.join(FAKE_OPTIONS)} to numbers")
+        routing = section.get("routing", {})
+        if not isinstance(routing, dict) or any(key not in ROUTING_OPTIONS for key in routing):
+            raise ConfigError(f"{path}: {name}.routing may only set {', '.join(ROUTING_OPTIONS)}")
+        if "small" in routing and routing["small"] not in data:
+            raise ConfigError(f"{path}: {name}.routing.small must name a model entry")
+        if not isinstance(routing.get("min_confidence", 0), (int, float)):
+            raise ConfigError(f"{path}: {name}.routing.min_confidence must be a number")
+        if not isinstance(routing.get("escalate", []), list):
+            raise ConfigError(f"{path}: {name}.routing.escalate must be a list")
+
+
+class YamlConfig:
+    """One YAML file: loaded lazily, validated, reloaded when the file changes"""
+
+    def __init__(self, path: Path, schema: Dict[str, Sequence[str]], validator=None):
+        self.path = Path(path)
+        self.schema = schema
+        self.validator = validator
+        self._data: Optional[Dict] = None
+        self._stamp = None
+        self._lock = threading.Lock()
+
+    def _read(self) -> Dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = yaml.safe_load(f) or {}
+        except (OSError, yaml.YAMLError) as e:
+            raise ConfigError(f"Cannot load {self.path}: {e}") from e
+        if not isinstance(data, dict):
+            raise ConfigError(f"{self.path}: top level must be a mapping")
+        for section, keys in self.schema.items():
+            if not isinstance(data.get(section), dict):
+                raise ConfigError(f"{self.path}: missing section '{section}'")
+            missing = [key for key in keys if key not in data[section]]
+            if missing:
+                raise ConfigError(f"{self.path}: section '{section}' misses {', '.join(missing)}")
+        if self.validator:
+            self.validator(data, self.path)
+        return data
+
+    def get(self) -> Dict:
+        """Parsed file contents; re-read only if mtime or size changed since the last load"""
+        try:
+            stat = os.stat(self.path)
+            stamp = (stat.st_mtime_ns, stat.st_size)
+        except OSError as e:
+            if self._data is not None:
+                return self._data
+            raise ConfigError(f"Cannot load {self.path}: {e}") from e
+
+        if stamp == self._stamp:
+            return self._data
+
+        with self._lock:
+            if stamp != self._stamp:
+                try:
+                    self._data = self._read()
+                except ConfigError as e:
+                    if self._data is None:
+                        raise
+                    print(f"Keeping previous configuration: {e}")
+                self._stamp = stamp
+        return self._data
+
+    def section(self, name: str) -> Dict:
+        data = self.get()
+        if name not in data:
+            raise ConfigError(f"{self.path}: missing section '{name}'")
+        return data[name]
+
+
+agents_config = YamlConfig(CONFIG_DIR / "agents.yaml", AGENTS_SCHEMA)
+models_config = YamlConfig(CONFIG_DIR / "models.yaml", MODELS_SCHEMA, validator=_validate_models)
+
+
+def load_agent_config() -> Dict:
+    return agents_config.get()
+
+
+def load_model_config() -> Dict:
+    return models_config.get()
+
+
+def get_prompt(agent: str, key: str) -> str:
+    """Prompt template of an agent, e.g. get_prompt("ErrorSearcher", "system_prompt")"""
+    value = agents_config.section(agent).get(key)
+    if not isinstance(value, str):
+        raise ConfigError(f"{agents_config.path}: {agent}.{key} must be a string")
+    return value
+
+
+def get_agent_setting(agent: str, key: str) -> Any:
+    """Non-prompt setting of an agent, e.g. get_agent_setting("ChatAgent", "retrieval")"""
+    section = agents_config.section(agent)
+    if key not in section:
+        raise ConfigError(f"{agents_config.path}: missing {agent}.{key}")
+    return section[key]
+
+
+def get_model_settings(name: str) -> ModelSettings:
+    section = models_config.section(name)
+    return ModelSettings(
+        model=section["model"],
+        temperature=float(section.get("temperature", 0)),
+        max_tokens=section.get("max_tokens"),
+        provider=section.get("provider", "groq"),
+        fake=dict(section.get("fake", {})),
+        routing=dict(section.get("routing", {})),
+    )
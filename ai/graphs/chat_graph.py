@@ -1,49 +1,71 @@
 import json
-from typing import TypedDict, Dict, Any
+import os
+import re
+import sqlite3
+from functools import lru_cache
+from typing import TypedDict, Dict, Any, Iterator, Annotated, List
 
-from langchain_core.messages import HumanMessage, AIMessage
-from langchain_groq import ChatGroq
+from langchain_core.messages import HumanMessage, AIMessage, AIMessageChunk, ToolMessage, RemoveMessage
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph, END
-from langgraph.checkpoint.memory import MemorySaver
-from ai.utils import load_agent_config
-from ai.agents.Chat import ChatAgent
+from langgraph.graph.message import add_messages
+from langgraph.checkpoint.sqlite import SqliteSaver
+from ai.config import get_agent_setting, get_prompt
+from ai.agents.Chat import get_chat_agent
+from ai.agents.provider import get_llm
+from ai.tools.query_gate import local_code_gate
+from ai.instrumentation import timed_node
 
 
 class ChatState(TypedDict):
     """State for the chat workflow"""
-    messages: list
+    messages: Annotated[list, add_messages]
+    summary: str
     vector_db_path: str
+    is_code_related: bool
+    reasoning: str
+
+
+def make_thread_id(user_id: str, repo_name: str, branch: str) -> str:
+    """One conversation thread per user, repository and branch"""
+    return ":".join(re.sub(r"[^\w.-]", "_", part or "default") for part in (user_id, repo_name, branch))
+
+
+def estimate_tokens(messages: List) -> int:
+    return sum(len(str(message.content)) for message in messages) // 4
     
 
 def is_code_related(state: ChatState):
     """Determine if the user message is related to code or programming"""
-    agent_config = load_agent_config()
-    prompt_template = agent_config['ChatAgent']['is_code_related_prompt']
-    
     last_message = state['messages'][-1].content
     
-    prompt = prompt_template.format(last_message=last_message)
+    # Сначала локальный классификатор на эмбеддингах, LLM - только для неоднозначных запросов
+    try:
+        decision, margin = local_code_gate(last_message)
+    except Exception as e:
+        decision, margin = None, 0.0
+        print(f"Local code gate failed, falling back to LLM: {e}")
     
-    llm = ChatGroq(
-        model="gemma2-9b-it",
-        temperature=0,
-        max_tokens=10
-    )
+    if decision is not None:
+        return {"is_code_related": decision,
+                "reasoning": f"local gate margin {margin:.3f}"}
     
-    response = llm.invoke(prompt)
+    prompt_template = get_prompt('ChatAgent', 'is_code_related_prompt')
+    prompt = prompt_template.format(last_message=last_message)
+    
+    response = get_llm("ChatGate").invoke(prompt)
     
 
     return {"is_code_related": "no" not in response.content, 
             "reasoning": ""}
 
 
-def process_code_related_query(state: ChatState):
+def process_code_related_query(state: ChatState, config: RunnableConfig):
     """Process queries that are related to code"""
-    agent_config = load_agent_config()
-    system_prompt = agent_config['ChatAgent']['system_prompt'].format(
+    system_prompt = get_prompt('ChatAgent', 'system_prompt').format(
         vector_db_path=state["vector_db_path"]
     )
-    context_message = agent_config['ChatAgent']['context_message']
+    context_message = get_prompt('ChatAgent', 'context_message')
     
     # Get the last user message
     last_message = ""
@@ -54,19 +76,26 @@ def process_code_related_query(state: ChatState):
     
     user_prompt = context_message.format(last_message=last_message)
     
-    # Prepare the messages for the agent
-    agent_messages = [
-        {"role": "system", "content": system_prompt},
-        {"role": "user", "content": user_prompt}
-    ]
-    
-    # Invoke the agent
-    result = ChatAgent.invoke({"messages": agent_messages})
+    # Prepare the messages for the agent: summary of old turns, recent turns, new question
+    if state.get("summary"):
+        system_prompt += f"\nКраткое содержание предыдущего диалога:\n{state['summary']}"
+    agent_messages = [{"role": "system", "content": system_prompt}]
+    # Старые реплики уже в summary; суммаризация срабатывает только после ответа,
+    # поэтому окно ограничиваем и здесь
+    keep = get_agent_setting('ChatAgent', 'history')['keep_messages']
+    for message in state["messages"][:-1][-keep:]:
+        if isinstance(message, (HumanMessage, AIMessage)) and message.content:
+            role = "user" if isinstance(message, HumanMessage) else "assistant"
+            agent_messages.append({"role": role, "content": message.content})
+    agent_messages.append({"role": "user", "content": user_prompt})
+    
+    # Invoke the agent; passing config lets graph streaming see its tool calls and tokens
+    result = get_chat_agent().invoke({"messages": agent_messages}, config)
     
     # Extract the response and add it to messages
     ai_message = AIMessage(content=result["messages"][-1].content)
     
-    return {"messages": state["messages"] + [ai_message]}
+    return {"messages": [ai_message]}
 
 
 def handle_non_code_query(state: ChatState):
@@ -78,7 +107,36 @@ def handle_non_code_query(state: ChatState):
                 "к этим темам."
     )
     
-    return {"messages": state["messages"] + [refusal_message]}
+    return {"messages": [refusal_message]}
+
+
+def summarize_history(state: ChatState):
+    """Fold old turns into the summary once the history exceeds its token budget"""
+    history_config = get_agent_setting('ChatAgent', 'history')
+    messages = state["messages"]
+    
+    if estimate_tokens(messages) <= history_config['token_budget']:
+        return {}
+    
+    keep = history_config['keep_messages']
+    old_messages, recent_messages = messages[:-keep], messages[-keep:]
+    if not old_messages:
+        return {}
+    
+    dialog = "\n".join(
+        f"{'Пользователь' if isinstance(m, HumanMessage) else 'Ассистент'}: {m.content}"
+        for m in old_messages
+    )
+    prompt = history_config['summary_prompt'].format(
+        summary=state.get("summary") or "-",
+        dialog=dialog
+    )
+    summary = get_llm("ChatSummarizer").invoke(prompt).content.strip()
+    
+    return {
+        "summary": summary,
+        "messages": [RemoveMessage(id=m.id) for m in old_messages]
+    }
 
 
 def route_query(state: Dict[str, Any]):
@@ -95,9 +153,10 @@ def build_chat_graph():
     workflow = StateGraph(ChatState)
     
     # Add nodes to the graph
-    workflow.add_node("check_code_related", is_code_related)
-    workflow.add_node("process_code_related", process_code_related_query)
-    workflow.add_node("handle_non_code", handle_non_code_query)
+    workflow.add_node("check_code_related", timed_node(is_code_related))
+    workflow.add_node("process_code_related", timed_node(process_code_related_query))
+    workflow.add_node("handle_non_code", timed_node(handle_non_code_query))
+    workflow.add_node("summarize_history", timed_node(summarize_history))
     
     # Set the entry point
     workflow.set_entry_point("check_code_related")
@@ -112,14 +171,84 @@ def build_chat_graph():
         }
     )
     
-    # Both process nodes should end the workflow
-    workflow.add_edge("process_code_related", END)
-    workflow.add_edge("handle_non_code", END)
+    # Both process nodes keep the history bounded before the workflow ends
+    workflow.add_edge("process_code_related", "summarize_history")
+    workflow.add_edge("handle_non_code", "summarize_history")
+    workflow.add_edge("summarize_history", END)
     
-    # Initialize memory saver for persistence
-    memory = MemorySaver()
+    # Persistent checkpoints on disk instead of an ever-growing in-memory saver
+    checkpoint_db = get_agent_setting('ChatAgent', 'history')['checkpoint_db']
+    os.makedirs(os.path.dirname(checkpoint_db) or ".", exist_ok=True)
+    memory = SqliteSaver(sqlite3.connect(checkpoint_db, check_same_thread=False))
     
     # Compile the graph with memory
     return workflow.compile(checkpointer=memory)
 
-chat_graph = build_chat_graph()
+
+@lru_cache(maxsize=1)
+def get_chat_graph():
+    """Chat graph with its checkpoint store, opened on first use rather than at import"""
+    return build_chat_graph()
+
+
+def prune_checkpoints(thread_id: str, keep: int = 2) -> None:
+    """
+    Only the latest checkpoints of a thread are needed to continue the conversation.
+    Checkpoints of subgraphs (the chat agent, checkpoint_ns "<node>:<task id>")
+    are written under a new namespace on every turn and are not needed once the
+    turn is over, so they are removed entirely.
+    """
+    checkpointer = get_chat_graph().checkpointer
+    conn = checkpointer.conn
+    with checkpointer.lock, conn:
+        for table in ("writes", "checkpoints"):
+            conn.execute(
+                f"DELETE FROM {table} WHERE thread_id = ? AND (checkpoint_ns != '' OR checkpoint_id NOT IN ("
+                "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = '' "
+                "ORDER BY checkpoint_id DESC LIMIT ?))",
+                (thread_id, thread_id, keep)
+            )
+
+
+def get_chat_history(config: Dict[str, Any]) -> List[Dict[str, str]]:
+    """Messages of a thread restored from the checkpoint store"""
+    values = get_chat_graph().get_state(config).values
+    return [
+        {"role": "user" if isinstance(m, HumanMessage) else "assistant", "content": m.content}
+        for m in values.get("messages", [])
+        if isinstance(m, (HumanMessage, AIMessage))
+    ]
+
+
+def stream_chat(inputs: Dict[str, Any], config: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """
+    Run one chat turn and yield progress events as they happen.
+
+    Events:
+        {"type": "tool_call", "name": ...}    - the agent decided to call a tool
+        {"type": "tool_result", "name": ...}  - the tool returned
+        {"type": "token", "text": ...}        - next piece of the answer
+        {"type": "final", "content": ...}     - the complete answer stored in the thread
+    """
+    chat_graph = get_chat_graph()
+    streamed_tokens = False
+    for message, metadata in chat_graph.stream(inputs, config, stream_mode="messages"):
+        # Ответы классификатора запроса и суммаризации пользователю не показываем
+        if metadata.get("langgraph_node") in ("check_code_related", "summarize_history"):
+            continue
+        if isinstance(message, AIMessageChunk):
+            for tool_call in message.tool_call_chunks:
+                if tool_call.get("name"):
+                    yield {"type": "tool_call", "name": tool_call["name"]}
+            if message.content:
+                streamed_tokens = True
+                yield {"type": "token", "text": message.content}
+        elif isinstance(message, ToolMessage):
+            yield {"type": "tool_result", "name": message.name}
+        elif isinstance(message, AIMessage) and not streamed_tokens and message.content:
+            # Ответы без LLM (отказ на нерелевантный запрос) приходят целиком
+            yield {"type": "token", "text": message.content}
+
+    final_state = chat_graph.get_state(config).values
+    prune_checkpoints(config["configurable"]["thread_id"])
+    yield {"type": "final", "content": final_state["messages"][-1].content}
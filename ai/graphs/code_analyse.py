@@ -4,59 +4,89 @@ import json
 import re
 import os
 import subprocess
+import time
 import lizard
-import black
 
+from functools import lru_cache
 from pathlib import Path
 from typing import TypedDict, List, Dict, Annotated
-from langchain_groq import ChatGroq
-from langchain.prompts import PromptTemplate
-from langchain.chains import LLMChain
 from langgraph.graph import StateGraph
 import operator
 
-from ai.utils import load_agent_config, run_cpplint, run_pylint, add_module_docstring, convert_to_snake_case
-from ai.agents.ErrorsSearcher import ErrorSearcher
+from ai.config import get_agent_setting, get_prompt
+from ai.utils import run_cpplint, run_pylint, add_module_docstring, convert_to_snake_case
+from ai.agents.ErrorsSearcher import get_error_searcher
+from ai.agents.provider import get_llm
+from ai.agents.routing import needs_large_model, screen, tier_for
+from ai.tools.symbol_index import build_symbol_index, save_symbol_index
+from ai.storage.columnar import build_tables, remove_tables, write_tables
+from ai.storage.metrics_store import MetricsStore
+from ai.progress import report_progress
+from ai.instrumentation import incr, record_span, route, span, timed_node
+from ai.tools.structured_issues import (
+    IssueStreamParser,
+    describe_invalid,
+    normalize_criticality,
+    schema_text,
+    split_valid,
+)
 
-llm = ChatGroq(model="qwen-2.5-coder-32b",
-               temperature=0.3, max_tokens=7000)
 
-agent_config = load_agent_config()
-reason_template = agent_config['ComplexityAnalyzer']['reason_template']
-simplify_template = agent_config['ComplexityAnalyzer']['simplify_template']
+@lru_cache(maxsize=None)
+def get_complexity_chains(entry: str = "ComplexityAnalyzer"):
+    """Reason/simplify chains of the complexity analysis on a models.yaml entry, created on first use"""
+    from langchain.prompts import PromptTemplate
+    from langchain.chains import LLMChain
 
-reason_prompt = PromptTemplate(input_variables=['code'], template=reason_template)
-reason_chain = LLMChain(llm=llm, prompt=reason_prompt)
-simplify_prompt = PromptTemplate(input_variables=['code'], template=simplify_template)
-simplify_chain = LLMChain(llm=llm, prompt=simplify_prompt)
+    llm = get_llm(entry)
+    reason_prompt = PromptTemplate(input_variables=['code'],
+                                   template=get_prompt('ComplexityAnalyzer', 'reason_template'))
+    simplify_prompt = PromptTemplate(input_variables=['code'],
+                                     template=get_prompt('ComplexityAnalyzer', 'simplify_template'))
+    return LLMChain(llm=llm, prompt=reason_prompt), LLMChain(llm=llm, prompt=simplify_prompt)
 
 class IntegratedAnalysisState(TypedDict):
     repo_url: str
     root_path: str
     file_paths: List[str]
     use_llm: bool
+    search_errors: bool
     linter_results: Annotated[List[Dict], operator.add]
     complexity_results: Annotated[List[Dict], operator.add]
     error_results: Annotated[List[Dict], operator.add]
+    symbol_index: Dict
+    commit_sha: str
+    branch: str
 
     output_linter_path: str
     output_complexity_path: str
     output_error_path: str
+    output_symbol_index_path: str
+    output_tables_dir: str
+    output_metrics_db: str
 
 def clone_repo(state: IntegratedAnalysisState):
     try:
         tmp_dir = tempfile.mkdtemp()
-        repo = git.Repo.clone_from(state["repo_url"], tmp_dir)
+        with span("clone"):
+            repo = git.Repo.clone_from(state["repo_url"], tmp_dir)
         root_path = Path(tmp_dir).resolve()
         code_extensions = ['.py', '.cpp', '.h', '.java', '.c']
         file_paths = [
             str(path.resolve().relative_to(root_path)) for path in root_path.rglob("*")
             if path.suffix in code_extensions and path.is_file()
         ]
+        report_progress("files_total", len(file_paths), total=True)
+        try:
+            branch = repo.active_branch.name
+        except TypeError:
+            branch = "HEAD"
 
         return {
             "root_path": str(root_path),
             "file_paths": file_paths,
+            "commit_sha": repo.head.commit.hexsha,
+            "branch": branch,
             "linter_results": [],
             "complexity_results": [],
             "error_results": []
@@ -71,13 +101,26 @@ def read_file_content(root_path: str, file_path: str):
     except Exception as e:
         return f"# Error reading file: {str(e)}"
 
+CLANG_FORMAT = "/Users/ivan/Desktop/HSE/cool_ai/GitMetrics/GitMetrics/ai/linters/clang-format.exe"
+
+def clang_format(code: str, *args: str) -> str:
+    """C/C++/Java code formatted by clang-format (the benchmarks replace it with a no-op)"""
+    formatted_code = subprocess.run(
+        ["sudo", CLANG_FORMAT, *args],
+        input=code.encode(),
+        capture_output=True,
+    )
+    return formatted_code.stdout.decode()
+
 def process_all_files_lint(state: IntegratedAnalysisState):
     root_path = state["root_path"]
     file_paths = state["file_paths"]
     linter_results = []
+    import black
     
     for file_path in file_paths:
         full_path = os.path.join(root_path, file_path)
+        started = time.perf_counter()
         
         try:
             with open(full_path, 'r', encoding="utf-8") as file:
@@ -92,20 +135,10 @@ def process_all_files_lint(state: IntegratedAnalysisState):
                 response = convert_to_snake_case(response)
             elif file_path.endswith(('.cpp', '.h', '.c')):
                 lint_report, error_count = run_cpplint(full_path)
-                formatted_code = subprocess.run(
-                    ["sudo", "/Users/ivan/Desktop/HSE/cool_ai/GitMetrics/GitMetrics/ai/linters/clang-format.exe", "-style=LLVM"],
-                    input=code.encode(),
-                    capture_output=True,
-                )
-                response = formatted_code.stdout.decode()
+                response = clang_format(code, "-style=LLVM")
             elif file_path.endswith('.java'):
                 lint_report = "Java linting coming soon"
-                formatted_code = subprocess.run(
-                    ["sudo", "/Users/ivan/Desktop/HSE/cool_ai/GitMetrics/GitMetrics/ai/linters/clang-format.exe"],
-                    input=code.encode(),
-                    capture_output=True,
-                )
-                response = formatted_code.stdout.decode()
+                response = clang_format(code)
             else:
                 response = "Unsupported language"
 
@@ -116,6 +149,7 @@ def process_all_files_lint(state: IntegratedAnalysisState):
                 "error_count": error_count
             })
         except Exception as e:
+            incr("lint.failed_files")
             linter_results.append({
                 "file": file_path,
                 "error": f"Failed to analyze file {file_path}: {str(e)}",
@@ -123,6 +157,9 @@ def process_all_files_lint(state: IntegratedAnalysisState):
                 "fixed_code": "",
                 "error_count": 0
             })
+        finally:
+            record_span("lint.file", time.perf_counter() - started, file_path)
+            report_progress("files_linted")
     
     return {"linter_results": linter_results}
 
@@ -143,10 +180,12 @@ def process_all_files_complexity(state: IntegratedAnalysisState):
     
     for file_path in file_paths:
         full_path = os.path.join(root_path, file_path)
+        started = time.perf_counter()
         
         try:
             # Analyze file complexity
-            analysis = lizard.analyze_file(full_path)
+            with span("complexity.lizard"):
+                analysis = lizard.analyze_file(full_path)
             functions_data = []
             total_complexity = 0
             num_functions = len(analysis.function_list)
@@ -157,6 +196,7 @@ def process_all_files_complexity(state: IntegratedAnalysisState):
                 total_complexity += function.cyclomatic_complexity
                 function_info = {
                     "function_name": function.name,
+                    "long_name": function.long_name,
                     "complexity": function.cyclomatic_complexity,
                     "lines": function.nloc,
                     "start_line": function.start_line,
@@ -178,8 +218,17 @@ def process_all_files_complexity(state: IntegratedAnalysisState):
                 
                 if use_llm:
                     try:
-                        reason = reason_chain.invoke({"code": func_code})["text"]
-                        simplified_code = simplify_chain.invoke({"code": func_code})["text"]
+                        # Малая модель проверяет функцию; большая - только для сложных случаев (routing в models.yaml)
+                        entry, tier = tier_for("ComplexityAnalyzer", criticality,
+                                               get_prompt('ComplexityAnalyzer', 'screen_template').format(code=func_code))
+                        reason_chain, simplify_chain = get_complexity_chains(entry)
+                        # Один route на вызов модели: счетчики и задержки уровней в отчете совпадают с вызовами
+                        report_progress("llm_calls")
+                        with route("ComplexityAnalyzer", tier):
+                            reason = reason_chain.invoke({"code": func_code})["text"]
+                        report_progress("llm_calls")
+                        with route("ComplexityAnalyzer", tier):
+                            simplified_code = simplify_chain.invoke({"code": func_code})["text"]
                     except Exception as e:
                         reason = f"Ошибка при анализе: {str(e)}"
                         simplified_code = "# Ошибка при упрощении"
@@ -208,6 +257,7 @@ def process_all_files_complexity(state: IntegratedAnalysisState):
             })
             
         except Exception as e:
+            incr("complexity.failed_files")
             complexity_results.append({
                 "file": file_path,
                 "error": f"Failed to analyze file {file_path}: {str(e)}",
@@ -216,9 +266,21 @@ def process_all_files_complexity(state: IntegratedAnalysisState):
                 "total_complexity": 0,
                 "average_complexity": 0
             })
+        finally:
+            record_span("complexity.file", time.perf_counter() - started, file_path)
+            report_progress("files_complexity")
     
     return {"complexity_results": complexity_results}
 
+def process_symbol_index(state: IntegratedAnalysisState):
+    """Build the symbol -> file:line and file -> outline index for chat navigation"""
+    try:
+        symbol_index = build_symbol_index(state["root_path"], state["file_paths"])
+    except Exception as e:
+        symbol_index = {"definitions": {}, "references": {}, "outlines": {},
+                        "errors": {"repo": f"Failed to build symbol index: {str(e)}"}}
+    return {"symbol_index": symbol_index}
+
 def _parse_error_analysis(llm_response):
     """
     Parse LLM error analysis response into structured issues and metrics.
@@ -233,11 +295,6 @@ def _parse_error_analysis(llm_response):
     issue_blocks = re.split(r'\[ISSUE (\d+)\]', llm_response)[1:]
     
     issues = {}
-    priority_counts = {
-        'high': 0,
-        'medium': 0,
-        'low': 0
-    }
     
     # Process blocks in pairs (issue number and content)
     for i in range(0, len(issue_blocks), 2):
@@ -262,16 +319,7 @@ def _parse_error_analysis(llm_response):
         solution_text = solution_match.group(1).strip()
         
         # Normalize criticality
-        criticality_eng = (
-            'low' if 'низк' in criticality else
-            'medium' if 'средн' in criticality else
-            'high' if 'высок' in criticality else
-            'unknown'
-        )
-        
-        # Update priority counts
-        if criticality_eng in priority_counts:
-            priority_counts[criticality_eng] += 1
+        criticality_eng = normalize_criticality(criticality)
         
         # Add code solution if available
         if code_match:
@@ -285,6 +333,19 @@ def _parse_error_analysis(llm_response):
             'solution': solution_text
         }
     
+    return issues, _error_metrics(issues)
+
+def _error_metrics(issues):
+    """Issue counts by criticality and the error score of a file"""
+    priority_counts = {
+        'high': 0,
+        'medium': 0,
+        'low': 0
+    }
+    for issue in issues.values():
+        if issue['criticality'] in priority_counts:
+            priority_counts[issue['criticality']] += 1
+    
     # Calculate error score and metrics
     total_issues = sum(priority_counts.values())
     error_score = (
@@ -301,19 +362,106 @@ def _parse_error_analysis(llm_response):
         'error_score': round(error_score, 2)
     }
     
-    return issues, metrics
+    return metrics
+
+def _stream_answer(searcher, messages, parser):
+    """Stream the ErrorSearcher answer into the incremental parser; returns the full text"""
+    content = ""
+    for chunk, _ in searcher.stream({"messages": messages}, stream_mode="messages"):
+        text = chunk.content if isinstance(chunk.content, str) else ""
+        content += text
+        parser.feed(text)
+    parser.close()
+    return content
+
+def _search_errors_json(messages):
+    """
+    JSON output mode: issues are validated while the answer streams, only the
+    invalid ones are asked again (up to ErrorSearcher.max_reasks times).
+    """
+    searcher = get_error_searcher()
+    parser = IssueStreamParser()
+    content = _stream_answer(searcher, messages, parser)
+    if not parser.found:
+        # Модель ответила не по схеме: разбираем текстовый формат [ISSUE N]
+        incr("errors.json_fallbacks")
+        return _parse_error_analysis(content)
+    
+    valid, invalid = split_valid(parser.items)
+    for _ in range(get_agent_setting("ErrorSearcher", "max_reasks")):
+        if not invalid:
+            break
+        incr("errors.reasks")
+        report_progress("llm_calls")
+        messages = messages + [
+            {"role": "assistant", "content": content},
+            {"role": "user", "content": get_prompt("ErrorSearcher", "reask_template").format(
+                problems=describe_invalid(invalid), schema=schema_text())},
+        ]
+        parser = IssueStreamParser()
+        content = _stream_answer(searcher, messages, parser)
+        if not parser.found:
+            # Ответ без массива: прежние невалидные элементы остаются невалидными
+            break
+        fixed, invalid = split_valid(parser.items)
+        valid.extend(fixed)
+    
+    if invalid:
+        incr("errors.invalid_issues", len(invalid))
+    issues = {f'issue_{number}': issue for number, issue in enumerate(valid, 1)}
+    return issues, _error_metrics(issues)
+
+def search_errors(numbered_code):
+    """
+    Ask the ErrorSearcher about numbered code ("12: ...") and parse the answer.
+    
+    With routing in models.yaml the small model screens the code first and a
+    confident "no issues" verdict ends the analysis without the large model.
+    ErrorSearcher.output_mode in agents.yaml selects the answer format: "json"
+    (schema, streaming validation, re-ask of invalid issues) or "text"
+    ([ISSUE N] blocks).
+    
+    Returns:
+        tuple: A tuple containing (issues dictionary, metrics dictionary)
+    """
+    verdict = screen('ErrorSearcher', get_prompt('ErrorSearcher', 'screen_prompt_template').format(code=numbered_code))
+    if not needs_large_model('ErrorSearcher', verdict):
+        return {}, _error_metrics({})
+    
+    with route('ErrorSearcher', 'large'):
+        return _search_errors_large(numbered_code)
+
+def _search_errors_large(numbered_code):
+    system_prompt = get_prompt('ErrorSearcher', 'system_prompt')
+    report_progress("llm_calls")
+    if get_agent_setting('ErrorSearcher', 'output_mode') == 'json':
+        user_prompt = get_prompt('ErrorSearcher', 'json_prompt_template').format(
+            code=numbered_code, schema=schema_text())
+        return _search_errors_json([
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ])
+    
+    result = get_error_searcher().invoke({
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": get_prompt('ErrorSearcher', 'user_prompt_template').format(code=numbered_code)}
+        ]
+    })
+    return _parse_error_analysis(result['messages'][-1].content)
 
 def process_all_files_errors(state: IntegratedAnalysisState):
     root_path = state["root_path"]
     file_paths = state["file_paths"]
     error_results = []
     
-    agent_config = load_agent_config()
-    user_prompt_template = agent_config['ErrorSearcher']['user_prompt_template']
-    system_prompt = agent_config['ErrorSearcher']['system_prompt']
+    # Поиск ошибок целиком на LLM: запуск без модели его пропускает
+    if not state.get("search_errors", True):
+        return {"error_results": error_results}
     
     for file_path in file_paths:
         full_path = os.path.join(root_path, file_path)
+        started = time.perf_counter()
         
         try:
             with open(full_path, "r", encoding="utf-8", errors="ignore") as f:
@@ -330,16 +478,7 @@ def process_all_files_errors(state: IntegratedAnalysisState):
             # Нумеруем строки кода
             numbered_code = "\n".join(f"{i + 1}: {line.rstrip()}" for i, line in enumerate(code_lines))
             
-            user_prompt = user_prompt_template.format(code=numbered_code)
-            
-            result = ErrorSearcher.invoke({
-                "messages": [
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ]
-            })
-
-            issues, metrics = _parse_error_analysis(result['messages'][-1].content)
+            issues, metrics = search_errors(numbered_code)
             
             error_results.append({
                 "file": file_path,
@@ -348,12 +487,16 @@ def process_all_files_errors(state: IntegratedAnalysisState):
             })
         
         except Exception as e:
+            incr("errors.failed_files")
             error_results.append({
                 "file": file_path, 
                 "error": f"Ошибка анализа: {str(e)}",
                 "metrics": {},
                 "issues": {}
             })
+        finally:
+            record_span("errors.file", time.perf_counter() - started, file_path)
+            report_progress("files_error_searched")
     
     return {"error_results": error_results}
 
@@ -414,6 +557,31 @@ def save_results(state: IntegratedAnalysisState):
     complexity_results = state.get("complexity_results", [])
     error_results = state.get("error_results", [])
     
+    # Columnar copies for the dashboards are built from the per-file results
+    if "output_tables_dir" in state:
+        try:
+            write_tables(build_tables(linter_results, complexity_results, error_results),
+                         state["output_tables_dir"])
+        except Exception as e:
+            print(f"Failed to write report tables: {str(e)}")
+            # Таблицы прошлого анализа иначе перекрыли бы новые JSON-отчеты
+            try:
+                remove_tables(state["output_tables_dir"])
+            except OSError as e:
+                print(f"Failed to remove stale report tables: {str(e)}")
+    
+    # Every run is also kept in the metrics history for trends and diffs
+    if "output_metrics_db" in state:
+        try:
+            MetricsStore(state["output_metrics_db"]).record_run(
+                re.sub(r"\.git$", "", state["repo_url"].rstrip("/").split("/")[-1]),
+                state.get("branch", "HEAD"),
+                state.get("commit_sha"),
+                linter_results, complexity_results, error_results
+            )
+        except Exception as e:
+            print(f"Failed to record metrics history: {str(e)}")
+    
     complexity_results, error_results = compare_analyze(complexity_results, error_results)
     
     # Save linter results
@@ -431,17 +599,22 @@ def save_results(state: IntegratedAnalysisState):
         with open(state["output_error_path"], "w", encoding="utf-8") as f:
             json.dump(error_results, f, ensure_ascii=False, indent=4)
     
+    # Save symbol index for the chat navigation tools
+    if "output_symbol_index_path" in state and "symbol_index" in state:
+        save_symbol_index(state["symbol_index"], state["output_symbol_index_path"])
+    
     return {"final_results": [linter_results, compare_analyze, error_results]}
 
 def build_integrated_code_analysis_workflow():
     builder = StateGraph(IntegratedAnalysisState)
 
     # Add nodes
-    builder.add_node("clone_repo", clone_repo)
-    builder.add_node("process_all_files_lint", process_all_files_lint)
-    builder.add_node("process_all_files_complexity", process_all_files_complexity)
-    builder.add_node("process_all_files_errors", process_all_files_errors)
-    builder.add_node("save_results", save_results)
+    builder.add_node("clone_repo", timed_node(clone_repo))
+    builder.add_node("process_all_files_lint", timed_node(process_all_files_lint))
+    builder.add_node("process_all_files_complexity", timed_node(process_all_files_complexity))
+    builder.add_node("process_all_files_errors", timed_node(process_all_files_errors))
+    builder.add_node("process_symbol_index", timed_node(process_symbol_index))
+    builder.add_node("save_results", timed_node(save_results))
 
     # Set starting point
     builder.set_entry_point("clone_repo")
@@ -450,11 +623,13 @@ def build_integrated_code_analysis_workflow():
     builder.add_edge("clone_repo", "process_all_files_lint")
     builder.add_edge("clone_repo", "process_all_files_complexity")
     builder.add_edge("clone_repo", "process_all_files_errors")
+    builder.add_edge("clone_repo", "process_symbol_index")
     
     # Объединение результатов после параллельной обработки
     builder.add_edge("process_all_files_lint", "save_results")
     builder.add_edge("process_all_files_complexity", "save_results")
     builder.add_edge("process_all_files_errors", "save_results")
+    builder.add_edge("process_symbol_index", "save_results")
 
     # Set finish point
     builder.set_finish_point("save_results")
@@ -6,8 +6,9 @@ import re
 import os
 
 from langgraph.graph import StateGraph, END
-from ai.agents.CustomCriteria import CustomCriteria
-from ai.utils import load_agent_config
+from ai.agents.CustomCriteria import get_custom_criteria_agent
+from ai.config import get_prompt
+from ai.instrumentation import timed_node
 
 
 class FileAnalysisState(TypedDict):
@@ -66,9 +67,8 @@ def read_code(state: FileAnalysisState):
 
 
 def analyze_code(state: FileAnalysisState):
-    agent_config = load_agent_config()
-    user_prompt_template = agent_config['CodeAnalyzer']['user_prompt_template']
-    system_prompt = agent_config['CodeAnalyzer']['system_prompt']
+    user_prompt_template = get_prompt('CodeAnalyzer', 'user_prompt_template')
+    system_prompt = get_prompt('CodeAnalyzer', 'system_prompt')
     
     code = state["current_code"]
     if not code.strip():
@@ -76,7 +76,7 @@ def analyze_code(state: FileAnalysisState):
     
     user_prompt = user_prompt_template.format(code=code, criteria=state['criteria'])
 
-    result = CustomCriteria.invoke({
+    result = get_custom_criteria_agent().invoke({
         "messages": [
             {
                 "role": "system", 
@@ -133,12 +133,12 @@ def summarize(state: FileAnalysisState):
 def build_graph():
     builder = StateGraph(FileAnalysisState)
 
-    builder.add_node("clone_repo", clone_repo)
-    builder.add_node("get_next_file", get_next_file)
-    builder.add_node("read_code", read_code)
-    builder.add_node("analyze_code", analyze_code)
-    builder.add_node("generate_report", generate_report)
-    builder.add_node("summarize", summarize)
+    builder.add_node("clone_repo", timed_node(clone_repo))
+    builder.add_node("get_next_file", timed_node(get_next_file))
+    builder.add_node("read_code", timed_node(read_code))
+    builder.add_node("analyze_code", timed_node(analyze_code))
+    builder.add_node("generate_report", timed_node(generate_report))
+    builder.add_node("summarize", timed_node(summarize))
 
     builder.set_entry_point("clone_repo")
 
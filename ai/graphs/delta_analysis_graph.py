@@ -0,0 +1,288 @@
+"""
+Delta analysis of a commit range (pull request mode).
+
+Only files changed between base and head are analyzed: lint and complexity run
+on both versions of each changed file, the ErrorSearcher only sees the changed
+hunks of the head version plus a few lines of context. The result is a delta
+report of new, fixed and persisting issues.
+"""
+import json
+import os
+import shutil
+import tempfile
+import time
+from typing import TypedDict, List, Dict
+
+import git
+from langgraph.graph import StateGraph
+
+from ai.instrumentation import record_span, timed_node
+from ai.utils import run_cpplint, run_pylint
+from ai.graphs.code_analyse import process_all_files_complexity, search_errors
+from ai.storage.metrics_store import parse_lint_messages
+from ai.tools.delta import compare_counted, number_hunk_windows, summarize_delta, touches_ranges
+from ai.tools.git_diff import changed_files, changed_hunks, expand_ranges, merge_base, resolve_commit, show_file
+
+CODE_EXTENSIONS = ('.py', '.cpp', '.h', '.java', '.c')
+CONTEXT_LINES = 5
+
+
+class DeltaAnalysisState(TypedDict):
+    repo_url: str
+    repo_path: str
+    base_ref: str
+    head_ref: str
+    use_llm: bool
+    context_lines: int
+
+    base_root: str
+    head_root: str
+    # Временные каталоги (клон, версии файлов), удаляются в конце графа
+    temp_dirs: List[str]
+    # Общий предок base и head: с него начинается diff и берется базовая версия файлов
+    fork_point: str
+    # {status, base, head}: paths of the two versions, None for added/deleted files
+    file_pairs: List[Dict]
+    hunks: Dict[str, Dict[str, List]]
+
+    lint_delta: Dict
+    complexity_delta: Dict
+    error_delta: Dict
+    delta_report: Dict
+
+    output_delta_path: str
+
+
+def _write_snapshot(repo_path: str, ref: str, path: str, root: str) -> None:
+    target = os.path.join(root, path)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with open(target, "w", encoding="utf-8") as f:
+        f.write(show_file(repo_path, ref, path))
+
+
+def _remove_dirs(paths: List[str]) -> None:
+    for path in paths:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def prepare_delta(state: DeltaAnalysisState):
+    """Find changed code files and write their fork-point and head versions to temp dirs"""
+    temp_dirs = []
+    try:
+        repo_path = state.get("repo_path")
+        if not repo_path:
+            repo_path = tempfile.mkdtemp()
+            temp_dirs.append(repo_path)
+            # Без чекаута и без блобов: git догрузит только содержимое измененных файлов
+            git.Repo.clone_from(state["repo_url"], repo_path, filter="blob:none", no_checkout=True)
+
+        head = resolve_commit(repo_path, state["head_ref"])
+        # Как в pull request: базовая версия - общий предок, а не текущая вершина base
+        fork_point = merge_base(repo_path, resolve_commit(repo_path, state["base_ref"]), head)
+        base_root, head_root = tempfile.mkdtemp(), tempfile.mkdtemp()
+        temp_dirs += [base_root, head_root]
+
+        file_pairs = []
+        for change in changed_files(repo_path, fork_point, head):
+            paths = [p for p in (change.old_path, change.new_path) if p]
+            if not any(p.endswith(CODE_EXTENSIONS) for p in paths):
+                continue
+            if change.old_path:
+                _write_snapshot(repo_path, fork_point, change.old_path, base_root)
+            if change.new_path:
+                _write_snapshot(repo_path, head, change.new_path, head_root)
+            file_pairs.append({"status": change.status, "base": change.old_path, "head": change.new_path})
+
+        hunks = {
+            path: {"old": file_hunks.old, "new": file_hunks.new}
+            for path, file_hunks in changed_hunks(repo_path, fork_point, head).items()
+        }
+    except Exception:
+        _remove_dirs(temp_dirs)
+        raise
+
+    return {
+        "repo_path": repo_path,
+        "base_root": base_root,
+        "head_root": head_root,
+        "temp_dirs": temp_dirs,
+        "fork_point": fork_point,
+        "file_pairs": file_pairs,
+        "hunks": hunks,
+    }
+
+
+def _report_path(pair: Dict) -> str:
+    return pair["head"] or pair["base"]
+
+
+def _lint_messages(root: str, file_path: str) -> List[tuple]:
+    full_path = os.path.join(root, file_path)
+    if file_path.endswith('.py'):
+        logs, _ = run_pylint(full_path)
+    elif file_path.endswith(('.cpp', '.h', '.c')):
+        logs, _ = run_cpplint(full_path)
+    else:
+        return []
+    return parse_lint_messages(logs)
+
+
+def process_delta_lint(state: DeltaAnalysisState):
+    """Lint both versions of every changed file; messages are matched ignoring line numbers"""
+    delta = {"new": [], "fixed": [], "persisting": []}
+    for pair in state["file_pairs"]:
+        file_path = _report_path(pair)
+        started = time.perf_counter()
+        try:
+            base = _lint_messages(state["base_root"], pair["base"]) if pair["base"] else []
+            head = _lint_messages(state["head_root"], pair["head"]) if pair["head"] else []
+        except Exception as e:
+            delta.setdefault("errors", {})[file_path] = f"Failed to lint {file_path}: {str(e)}"
+            continue
+        finally:
+            record_span("delta.lint.file", time.perf_counter() - started, file_path)
+        new, fixed, persisting = compare_counted(base, head, key=lambda m: (m[1], m[2]))
+        for name, items in (("new", new), ("fixed", fixed), ("persisting", persisting)):
+            delta[name].extend(
+                {"file": file_path, "line": line, "code": code, "message": message}
+                for line, code, message in items
+            )
+    return {"lint_delta": delta}
+
+
+def _complex_functions(root: str, paths: List[str]) -> Dict[str, Dict]:
+    """file -> {(signature, occurrence): function}"""
+    results = process_all_files_complexity({"root_path": root, "file_paths": paths, "use_llm": False})
+    functions = {}
+    for item in results["complexity_results"]:
+        keyed = {}
+        for function in item.get("functions", []):
+            # Перегрузки C++ и одноименные методы разных классов не должны затирать друг друга:
+            # сигнатура + номер вхождения (номера строк между версиями сдвигаются)
+            signature = function.get("long_name") or function["function_name"]
+            occurrence = sum(1 for key in keyed if key[0] == signature)
+            keyed[(signature, occurrence)] = function
+        functions[item["file"]] = keyed
+    return functions
+
+
+def process_delta_complexity(state: DeltaAnalysisState):
+    """Complex functions (medium/high) that appeared, disappeared or stayed in changed files"""
+    pairs = state["file_pairs"]
+    base = _complex_functions(state["base_root"], [p["base"] for p in pairs if p["base"]])
+    head = _complex_functions(state["head_root"], [p["head"] for p in pairs if p["head"]])
+
+    delta = {"new": [], "fixed": [], "persisting": []}
+    for pair in pairs:
+        file_path = _report_path(pair)
+        base_functions = base.get(pair["base"], {}) if pair["base"] else {}
+        head_functions = head.get(pair["head"], {}) if pair["head"] else {}
+        for key, function in head_functions.items():
+            entry = {"file": file_path, "function_name": function["function_name"],
+                     "complexity": function["complexity"],
+                     "start_line": function["start_line"], "end_line": function["end_line"]}
+            if key in base_functions:
+                entry["base_complexity"] = base_functions[key]["complexity"]
+                delta["persisting"].append(entry)
+            else:
+                delta["new"].append(entry)
+        for key, function in base_functions.items():
+            if key not in head_functions:
+                delta["fixed"].append({"file": file_path, "function_name": function["function_name"],
+                                       "complexity": function["complexity"]})
+    return {"complexity_delta": delta}
+
+
+def process_delta_errors(state: DeltaAnalysisState):
+    """
+    Error search on the changed hunks of the head version plus context.
+
+    Issues on changed lines are new; issues only in the surrounding context
+    were already there and are reported as persisting.
+    """
+    delta = {"new": [], "persisting": []}
+    if not state.get("use_llm", True):
+        return {"error_delta": delta}
+
+    context = state.get("context_lines", CONTEXT_LINES)
+
+    for pair in state["file_pairs"]:
+        if not pair["head"]:
+            continue
+        changed = [tuple(r) for r in state["hunks"].get(pair["head"], {}).get("new", [])]
+        if not changed:
+            continue
+        started = time.perf_counter()
+        try:
+            with open(os.path.join(state["head_root"], pair["head"]), "r", encoding="utf-8", errors="ignore") as f:
+                code_lines = f.readlines()
+            windows = expand_ranges(changed, context, len(code_lines))
+            if not windows:
+                continue
+            issues, _ = search_errors(number_hunk_windows(code_lines, windows))
+        except Exception as e:
+            delta.setdefault("errors", {})[pair["head"]] = f"Ошибка анализа: {str(e)}"
+            continue
+        finally:
+            record_span("delta.errors.file", time.perf_counter() - started, pair["head"])
+
+        for issue_id, issue in issues.items():
+            entry = {"file": pair["head"], "issue_id": issue_id, **issue}
+            delta["new" if touches_ranges(issue.get("rows", ""), changed) else "persisting"].append(entry)
+    return {"error_delta": delta}
+
+
+def save_delta_report(state: DeltaAnalysisState):
+    lint_delta = state.get("lint_delta", {})
+    complexity_delta = state.get("complexity_delta", {})
+    error_delta = state.get("error_delta", {})
+    report = {
+        "base_ref": state["base_ref"],
+        "head_ref": state["head_ref"],
+        "fork_point": state.get("fork_point"),
+        "changed_files": state.get("file_pairs", []),
+        "summary": summarize_delta(lint_delta, complexity_delta, error_delta),
+        "lint": lint_delta,
+        "complexity": complexity_delta,
+        "errors": error_delta,
+    }
+    if "output_delta_path" in state:
+        with open(state["output_delta_path"], "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=4)
+    return {"delta_report": report}
+
+
+def cleanup_delta(state: DeltaAnalysisState):
+    """Remove the temporary clone and file versions"""
+    _remove_dirs(state.get("temp_dirs", []))
+    return {"temp_dirs": []}
+
+
+def build_delta_analysis_workflow():
+    builder = StateGraph(DeltaAnalysisState)
+
+    builder.add_node("prepare_delta", timed_node(prepare_delta))
+    builder.add_node("process_delta_lint", timed_node(process_delta_lint))
+    builder.add_node("process_delta_complexity", timed_node(process_delta_complexity))
+    builder.add_node("process_delta_errors", timed_node(process_delta_errors))
+    builder.add_node("save_delta_report", timed_node(save_delta_report))
+    builder.add_node("cleanup_delta", timed_node(cleanup_delta))
+
+    builder.set_entry_point("prepare_delta")
+
+    # Параллельные ветки по измененным файлам
+    builder.add_edge("prepare_delta", "process_delta_lint")
+    builder.add_edge("prepare_delta", "process_delta_complexity")
+    builder.add_edge("prepare_delta", "process_delta_errors")
+
+    builder.add_edge("process_delta_lint", "save_delta_report")
+    builder.add_edge("process_delta_complexity", "save_delta_report")
+    builder.add_edge("process_delta_errors", "save_delta_report")
+
+    builder.add_edge("save_delta_report", "cleanup_delta")
+    builder.set_finish_point("cleanup_delta")
+
+    return builder.compile()
+
+
+delta_analysis_graph = build_delta_analysis_workflow()
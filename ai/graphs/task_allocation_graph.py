@@ -1,13 +1,23 @@
 import json
 import os
 from pathlib import Path
-from typing import TypedDict, List, Dict, Annotated, Optional, Any
+from typing import TypedDict, List, Dict, Annotated, Optional
 import operator
 import re
 
 from langgraph.graph import StateGraph
-from ai.agents.TaskAllocation import TaskAllocationAgent
-from ai.utils import load_agent_config
+from langgraph.types import Send
+from ai.agents.TaskAllocation import get_task_allocation_agent
+from ai.config import get_agent_setting
+from ai.instrumentation import timed_node
+from ai.storage.columnar import parse_rows
+from ai.tools.blame import blame_service
+from ai.tools.ownership import format_owners, get_ownership_index
+from ai.tools.task_batches import plan_batches, render_batch
+
+def merge_processed_tasks(left: List[Dict], right: List[Dict]) -> List[Dict]:
+    """Reducer of the parallel process_task branches: batch order, whichever branch finishes first"""
+    return sorted(left + right, key=lambda task: task.get("_order", (0, 0)))
 
 class TaskAllocationState(TypedDict):
     repo_path: str
@@ -21,11 +31,12 @@ class TaskAllocationState(TypedDict):
     error_tasks: Annotated[List[Dict], operator.add]
     tasks: Annotated[List[Dict], operator.add]
     output_tasks_path: str
-    current_task_index: int
+    batches: List[Dict]
+    # Поля одной ветки process_task (передаются через Send)
     current_task_source: str  # "complexity" or "error"
-    current_task: Optional[Dict]
-    processed_tasks: Annotated[List[Dict], operator.add]
-    is_processing_complete: bool
+    current_batch: Optional[Dict]
+    task_order: int
+    processed_tasks: Annotated[List[Dict], merge_processed_tasks]
 
 def load_complexity_report(state: TaskAllocationState):
     """Load complexity report from JSON file"""
@@ -63,7 +74,8 @@ def extract_tasks_from_reports(state: TaskAllocationState):
     
     # Extract tasks from error report - one per file
     error_tasks = []
-    for file_path, errors in error_data.items():
+    # error_report.json: {"repository_summary": ..., "file_reports": {file: {metrics, issues}}}
+    for file_path, errors in error_data.get("file_reports", error_data).items():
         # Create a task for each file with errors
         task = {
             "file_path": file_path,
@@ -75,98 +87,109 @@ def extract_tasks_from_reports(state: TaskAllocationState):
     # Combine all tasks
     all_tasks = complexity_tasks + error_tasks
     
+    # git blame всех файлов с задачами заранее: OwnershipIndex при разметке задач читает его из кэша
+    if state.get("repo_path"):
+        blame_service.prefetch(state["repo_path"], (task["file_path"] for task in all_tasks))
+    
+    # Мелкие записи отчетов делят один запрос к модели, крупные делятся по фрагментам
+    batching = get_agent_setting("TaskAllocationAgent", "batching")
+    batches = plan_batches(all_tasks, batching["token_budget"], batching["max_entries"])
+    
     return {
         "complexity_tasks": complexity_tasks, 
         "error_tasks": error_tasks,
         "tasks": all_tasks,
-        "current_task_index": 0,
-        "is_processing_complete": False,
+        "batches": batches,
         "processed_tasks": []
     }
 
-def get_next_task(state: TaskAllocationState):
-    """Get the next task to process or signal completion"""
-    tasks = state.get("tasks", [])
-    current_index = state.get("current_task_index", 0)
-    
-    if current_index >= len(tasks):
-        return {"is_processing_complete": True, "current_task": None}
-    
-    current_task = tasks[current_index]
-    current_source = current_task.get("source", "")
-    
-    return {
-        "current_task": current_task,
-        "current_task_source": current_source,
-        "current_task_index": current_index + 1  # Increment for next iteration
-    }
+def dispatch_tasks(state: TaskAllocationState):
+    """One process_task branch per batch; they run in parallel, bounded by max_concurrency"""
+    batches = state.get("batches", [])
+    if not batches:
+        return "save_processed_tasks"
+    return [
+        Send("process_task", {
+            "repo_path": state.get("repo_path", ""),
+            "current_batch": batch,
+            "current_task_source": batch["source"],
+            "task_order": order,
+        })
+        for order, batch in enumerate(batches)
+    ]
 
-def truncate_data(data: Any, max_chars: int = 6000) -> str:
-    """Truncate data to stay within context limits"""
-    data_str = json.dumps(data, indent=2)
-    
-    if len(data_str) <= max_chars:
-        return data_str
-    
-    # For complex data, create a summarized version
-    if isinstance(data, dict):
-        summary = {
-            "summary": f"Full data exceeds {max_chars} chars. Showing key information only.",
-            "keys": list(data.keys()),
-        }
-        
-        # Include some sample items if possible
-        if len(data) > 0:
-            sample_keys = list(data.keys())[:3]  # Take first 3 keys
-            for key in sample_keys:
-                summary[f"sample_{key}"] = data[key]
-        
-        return json.dumps(summary, indent=2)
-    
-    elif isinstance(data, list):
-        summary = {
-            "summary": f"Full data exceeds {max_chars} chars. Showing partial information.",
-            "total_items": len(data),
-            "samples": data[:3] if len(data) > 0 else []  # Take first 3 items
-        }
-        return json.dumps(summary, indent=2)
-    
-    # For simple strings, just truncate
-    return data_str[:max_chars] + "... [truncated]"
+def task_ranges(task: Dict, source: str) -> List[tuple]:
+    """Line ranges of the fragments/issues of a task, in report order, without duplicates"""
+    ranges = []
+    if source == "complexity":
+        for fragment in task.get("complexity_data", {}).get("fragments", []):
+            if fragment.get("start_line"):
+                ranges.append((fragment["start_line"], fragment.get("end_line") or fragment["start_line"]))
+    elif source == "error":
+        for issue in task.get("error_data", {}).get("issues", {}).values():
+            start, end = parse_rows(issue.get("rows", ""))
+            if start is not None:
+                ranges.append((start, end))
+    return list(dict.fromkeys(ranges))
+
+def describe_owners(ownership, file_path: str, ranges: List[tuple]) -> str:
+    """Prompt block: authors of every range, so the agent does not have to look them up"""
+    lines = [f"- whole file: {format_owners(ownership.owners(file_path))}"]
+    for start, end in ranges:
+        lines.append(f"- rows {start}-{end}: {format_owners(ownership.owners(file_path, start, end))}")
+    return "\n".join(lines)
+
+def assign_authors(tasks: List[Dict], ownership, file_path: str) -> None:
+    """Author of a task is the owner of its rows (or of the file), not the LLM's guess"""
+    for task in tasks:
+        start, end = parse_rows(str(task.get("rows", "")))
+        code_file = task.get("code_file") or file_path
+        owner = ownership.owner(code_file, start, end) if start is not None else None
+        owner = owner or ownership.owner(code_file) or ownership.owner(file_path)
+        if owner:
+            task["author"] = owner
 
 def process_task(state: TaskAllocationState):
-    """Process a single task using the appropriate agent based on task source"""
-    current_task = state.get("current_task", {})
+    """Create tasks for one batch of report entries using the TaskAllocationAgent"""
+    current_batch = state.get("current_batch") or {}
     current_source = state.get("current_task_source", "")
     repo_path = state.get("repo_path", "")
+    entries = current_batch.get("entries", [])
     
-    if not current_task or not repo_path:
+    if not entries or not repo_path:
         return {"processed_tasks": []}
     
     try:
-        # Prepare data for the agent based on task source
-        file_path = current_task.get("file_path", "")
-        
-        if current_source == "complexity":
-            complexity_data = current_task.get("complexity_data", {})
-            # Truncate data to avoid context length issues
-            complexity_str = truncate_data(complexity_data)
-            task_type = "complexity"
-            fragments = f"Complexity Report for {file_path}:\n{complexity_str}"
-            
-        elif current_source == "error":
-            error_data = current_task.get("error_data", {})
-            # Truncate data to avoid context length issues
-            error_str = truncate_data(error_data)
-            task_type = "error"
-            fragments = f"Error Report for {file_path}:\n{error_str}"
-            
-        else:
+        if current_source not in ("complexity", "error"):
             return {"processed_tasks": [], "error": f"Unknown task source: {current_source}"}
         
+        # Prepare data for the agent: every entry in full, the batch already fits the token budget
+        task_type = current_source
+        fragments = render_batch(current_batch)
+        file_paths = list(dict.fromkeys(entry["file_path"] for entry in entries))
+        file_path = file_paths[0]
+        files_line = f"file: {file_path}" if len(file_paths) == 1 else f"files: {', '.join(file_paths)}"
+        
+        # Авторы берутся из индекса владения (git blame + давность + CODEOWNERS), без вызовов инструментов
+        ownership = None
+        try:
+            ownership = get_ownership_index(repo_path)
+        except Exception as e:
+            print(f"Failed to build ownership index: {str(e)}")
+        authors = ""
+        if ownership:
+            owners = "\n".join(
+                f"{entry['file_path']}:\n{describe_owners(ownership, entry['file_path'], task_ranges(entry, current_source))}"
+                for entry in entries
+            )
+            authors = f"""
+Authors of the code (git blame weighted by recency and CODEOWNERS), use them for the author field:
+{owners}
+"""
+        
         # Create a concise prompt with essential info only
         concise_prompt = f"""
-Please analyze the following {task_type} report for file: {file_path} in repository: {repo_path}
+Please analyze the following {task_type} report for {files_line} in repository: {repo_path}
 and create appropriate tasks to address the issues.
 
 Key information:
@@ -177,15 +200,13 @@ For each issue identified, create a task with:
 - priority (0-10 scale)
 - problem description
 - specification of work needed
-- affected code file
+- affected code file (one of the files above)
 - line numbers (if available)
-"""
-        
-        # Load agent configuration
-        agents_config = load_agent_config()
+- author
+{authors}"""
         
         # Invoke TaskAllocationAgent for the task
-        result = TaskAllocationAgent.invoke({
+        result = get_task_allocation_agent().invoke({
             "messages": [
                 {"role": "user", "content": concise_prompt},
             ],
@@ -216,8 +237,12 @@ For each issue identified, create a task with:
         # Parse tasks from the response
         tasks = parse_tasks_from_response(response_content)
         
+        if ownership:
+            assign_authors(tasks, ownership, file_path)
+        
         # Add source information and file path to processed tasks
-        for task in tasks:
+        for index, task in enumerate(tasks):
+            task["_order"] = (state.get("task_order", 0), index)
             task["source"] = current_source
             if "code_file" not in task:
                 task["code_file"] = file_path
@@ -283,15 +308,6 @@ def parse_tasks_from_response(response_content: str) -> List[Dict]:
     
     return tasks
 
-def check_processing_status(state: TaskAllocationState) -> str:
-    """Determine next step based on processing status"""
-    is_complete = state.get("is_processing_complete", False)
-    
-    if is_complete:
-        return "complete"
-    else:
-        return "continue"
-
 def save_processed_tasks(state: TaskAllocationState):
     """Sort tasks by priority and save to JSON file"""
     processed_tasks = state.get("processed_tasks", [])
@@ -299,6 +315,9 @@ def save_processed_tasks(state: TaskAllocationState):
     storage_dir = state.get("storage_dir", "")
     repo_name = state.get("repo_name", "")
     
+    # Порядок отчета (из редьюсера) нужен только для стабильной сортировки, в файл он не пишется
+    processed_tasks = [{k: v for k, v in task.items() if k != "_order"} for task in processed_tasks]
+    
     # Sort tasks by priority in descending order
     sorted_tasks = sorted(processed_tasks, key=lambda x: x.get("priority", 0), reverse=True)
     
@@ -327,40 +346,38 @@ def save_processed_tasks(state: TaskAllocationState):
     
     return {"final_tasks": sorted_tasks}
 
-def build_task_allocation_workflow():
-    """Build the task allocation workflow graph with task-by-task processing"""
+def build_task_allocation_workflow(max_concurrency: Optional[int] = None):
+    """
+    Build the task allocation workflow graph: one parallel branch per batch of report entries.
+
+    max_concurrency bounds the branches running at once (the TaskAllocationAgent
+    calls); by default TaskAllocationAgent.concurrency from agents.yaml.
+    """
     builder = StateGraph(TaskAllocationState)
     
     # Add nodes
-    builder.add_node("load_complexity_report", load_complexity_report)
-    builder.add_node("load_error_report", load_error_report)
-    builder.add_node("extract_tasks", extract_tasks_from_reports)
-    builder.add_node("get_next_task", get_next_task)
-    builder.add_node("process_task", process_task)
-    builder.add_node("save_processed_tasks", save_processed_tasks)
+    builder.add_node("load_complexity_report", timed_node(load_complexity_report))
+    builder.add_node("load_error_report", timed_node(load_error_report))
+    builder.add_node("extract_tasks", timed_node(extract_tasks_from_reports))
+    builder.add_node("process_task", timed_node(process_task))
+    builder.add_node("save_processed_tasks", timed_node(save_processed_tasks))
     
     # Set entry points and initial flow
     builder.set_entry_point("load_complexity_report")
     builder.add_edge("load_complexity_report", "load_error_report")
     builder.add_edge("load_error_report", "extract_tasks")
-    builder.add_edge("extract_tasks", "get_next_task")
     
-    # Add conditional branch based on processing status
-    builder.add_conditional_edges(
-        "get_next_task",
-        check_processing_status,
-        {
-            "continue": "process_task",
-            "complete": "save_processed_tasks"
-        }
-    )
+    # Fan-out: Send на каждую пачку записей отчетов, все ветки выполняются в одном шаге графа
+    builder.add_conditional_edges("extract_tasks", dispatch_tasks, ["process_task", "save_processed_tasks"])
     
-    # Create loop for task processing
-    builder.add_edge("process_task", "get_next_task")
+    # Fan-in: сохранение запускается один раз, после всех веток
+    builder.add_edge("process_task", "save_processed_tasks")
     
     # Set finish point
     builder.set_finish_point("save_processed_tasks")
     
-    return builder.compile()
+    if max_concurrency is None:
+        max_concurrency = get_agent_setting("TaskAllocationAgent", "concurrency")
+    return builder.compile().with_config(max_concurrency=max_concurrency)
 
 task_allocation_graph = build_task_allocation_workflow()
\ No newline at end of file
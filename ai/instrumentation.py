@@ -0,0 +1,334 @@
+"""
+Lightweight instrumentation of the analysis graphs.
+
+    with span("clone_repo"):                 # wall time of a block
+        ...
+    with span("lint.file", file=file_path):  # per-file timing, slowest kept
+        ...
+    @timed_node                              # graph node: "node.<function name>"
+    def process_all_files_lint(state): ...
+
+LLM clients created by ai.agents.provider report latency, tokens in/out,
+retries and errors through a LangChain callback; `route(agent, tier)` times
+the calls of a model tier (small screening model / large model) of a routed
+agent; registered LRU caches report
+hits and misses (counted from the start of the recorder). Everything goes into the current Recorder: a process-wide
+default one, or a fresh one for a block of code with `recording()` (values are
+propagated to the graph's worker threads through contextvars).
+
+A snapshot of the recorder can be written by pluggable sinks: LogSink,
+JsonSink (the run report) and PrometheusSink (text exposition format).
+"""
+import contextvars
+import functools
+import heapq
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger("gitmetrics.instrumentation")
+
+# Сколько самых медленных файлов хранить для каждой стадии
+SLOWEST_FILES = 20
+
+
+# --- Caches -----------------------------------------------------------------
+
+_caches: Dict[str, object] = {}
+
+
+def register_cache(name: str, cache) -> None:
+    """Report hits/misses of an object with `hits` and `misses` attributes (e.g. LRUCache)"""
+    _caches[name] = cache
+
+
+def cache_stats() -> Dict[str, Dict[str, int]]:
+    return {name: {"hits": cache.hits, "misses": cache.misses} for name, cache in _caches.items()}
+
+
+class Recorder:
+    """Thread-safe store of spans, counters and LLM call statistics"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self.spans: Dict[str, Dict[str, float]] = {}
+        self.slowest_files: Dict[str, List[Tuple[float, str]]] = {}
+        self.counters: Dict[str, float] = {}
+        self.llm: Dict[str, Dict[str, float]] = {}
+        # agent -> tier ("small"/"large") -> calls, total_seconds, max_seconds
+        self.routing: Dict[str, Dict[str, Dict[str, float]]] = {}
+        self._cache_baseline = cache_stats()
+
+    def record_span(self, name: str, seconds: float, file: Optional[str] = None) -> None:
+        with self._lock:
+            stats = self.spans.setdefault(name, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+            stats["count"] += 1
+            stats["total_seconds"] += seconds
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+            if file is not None:
+                slowest = self.slowest_files.setdefault(name, [])
+                item = (seconds, file)
+                if len(slowest) < SLOWEST_FILES:
+                    heapq.heappush(slowest, item)
+                elif item > slowest[0]:
+                    heapq.heapreplace(slowest, item)
+
+    def incr(self, name: str, amount: float = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def record_llm_call(self, model: str, seconds: float, tokens_in: int = 0, tokens_out: int = 0,
+                        error: bool = False) -> None:
+        with self._lock:
+            stats = self.llm.setdefault(model, {
+                "calls": 0, "errors": 0, "retries": 0, "total_seconds": 0.0, "max_seconds": 0.0,
+                "tokens_in": 0, "tokens_out": 0,
+            })
+            stats["calls"] += 1
+            stats["errors"] += int(error)
+            stats["total_seconds"] += seconds
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+            stats["tokens_in"] += tokens_in
+            stats["tokens_out"] += tokens_out
+
+    def record_llm_retry(self, model: str) -> None:
+        with self._lock:
+            stats = self.llm.setdefault(model, {
+                "calls": 0, "errors": 0, "retries": 0, "total_seconds": 0.0, "max_seconds": 0.0,
+                "tokens_in": 0, "tokens_out": 0,
+            })
+            stats["retries"] += 1
+
+    def record_route(self, agent: str, tier: str, seconds: float) -> None:
+        with self._lock:
+            stats = self.routing.setdefault(agent, {}).setdefault(
+                tier, {"calls": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+            stats["calls"] += 1
+            stats["total_seconds"] += seconds
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "started_at": self.started_at,
+                "duration_seconds": round(time.time() - self.started_at, 3),
+                "spans": {name: dict(stats) for name, stats in self.spans.items()},
+                "slowest_files": {
+                    name: [{"file": file, "seconds": round(seconds, 4)}
+                           for seconds, file in sorted(items, reverse=True)]
+                    for name, items in self.slowest_files.items()
+                },
+                "counters": dict(self.counters),
+                "llm": {model: dict(stats) for model, stats in self.llm.items()},
+                "routing": {agent: {tier: dict(stats) for tier, stats in tiers.items()}
+                            for agent, tiers in self.routing.items()},
+                "caches": {
+                    name: {key: value - self._cache_baseline.get(name, {}).get(key, 0)
+                           for key, value in stats.items()}
+                    for name, stats in cache_stats().items()
+                },
+            }
+
+
+_default_recorder = Recorder()
+_current: contextvars.ContextVar[Optional[Recorder]] = contextvars.ContextVar("gitmetrics_recorder", default=None)
+
+
+def get_recorder() -> Recorder:
+    return _current.get() or _default_recorder
+
+
+@contextmanager
+def recording(recorder: Optional[Recorder] = None):
+    """Collect everything inside the block into a separate recorder (e.g. one analysis run)"""
+    recorder = recorder or Recorder()
+    token = _current.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def span(name: str, file: Optional[str] = None):
+    """Record the wall time of a block; with `file` the slowest files of the span are kept"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        get_recorder().record_span(name, time.perf_counter() - started, file)
+
+
+def record_span(name: str, seconds: float, file: Optional[str] = None) -> None:
+    """For loops where a `with` block would not fit, e.g. timing started before a `try`"""
+    get_recorder().record_span(name, seconds, file)
+
+
+@contextmanager
+def route(agent: str, tier: str):
+    """Time one call of a model tier of a routed agent, e.g. route("ErrorSearcher", "small")"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        get_recorder().record_route(agent, tier, time.perf_counter() - started)
+
+
+def timed(name: str):
+    """Decorator form of span()"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def timed_node(func):
+    """Time a graph node as "node.<function name>"; the signature is kept for LangGraph"""
+    return timed(f"node.{func.__name__}")(func)
+
+
+def incr(name: str, amount: float = 1) -> None:
+    get_recorder().incr(name, amount)
+
+
+# --- LLM calls ----------------------------------------------------------------
+
+def token_usage(response) -> Tuple[int, int]:
+    """(tokens in, tokens out) from a LangChain LLMResult, 0 if the provider did not report them"""
+    usage = (getattr(response, "llm_output", None) or {}).get("token_usage") or {}
+    tokens_in, tokens_out = usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+    if not tokens_in and not tokens_out:
+        for generations in getattr(response, "generations", []) or []:
+            for generation in generations:
+                metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                tokens_in += metadata.get("input_tokens", 0)
+                tokens_out += metadata.get("output_tokens", 0)
+    return tokens_in, tokens_out
+
+
+@functools.lru_cache(maxsize=1)
+def _llm_handler_class():
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class LLMMetricsHandler(BaseCallbackHandler):
+        """Reports latency, tokens, retries and errors of every call of one model"""
+
+        def __init__(self, model: str):
+            self.model = model
+            self._started: Dict = {}
+
+        def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+            self._started[run_id] = time.perf_counter()
+
+        def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+            self._started[run_id] = time.perf_counter()
+
+        def on_llm_end(self, response, *, run_id, **kwargs):
+            started = self._started.pop(run_id, None)
+            tokens_in, tokens_out = token_usage(response)
+            get_recorder().record_llm_call(self.model, time.perf_counter() - started if started else 0.0,
+                                           tokens_in, tokens_out)
+
+        def on_llm_error(self, error, *, run_id, **kwargs):
+            started = self._started.pop(run_id, None)
+            get_recorder().record_llm_call(self.model, time.perf_counter() - started if started else 0.0,
+                                           error=True)
+
+        def on_retry(self, retry_state, *, run_id, **kwargs):
+            get_recorder().record_llm_retry(self.model)
+
+    return LLMMetricsHandler
+
+
+def llm_callback(model: str):
+    """LangChain callback handler recording the calls of `model`"""
+    return _llm_handler_class()(model)
+
+
+# --- Sinks --------------------------------------------------------------------
+
+class LogSink:
+    def write(self, snapshot: Dict) -> None:
+        for name, stats in sorted(snapshot["spans"].items(), key=lambda item: -item[1]["total_seconds"]):
+            logger.info("%s: %d x, %.2fs total, %.2fs max", name, stats["count"],
+                        stats["total_seconds"], stats["max_seconds"])
+        for model, stats in snapshot["llm"].items():
+            logger.info("LLM %s: %d calls, %.2fs, %d tokens in, %d out, %d retries, %d errors", model,
+                        stats["calls"], stats["total_seconds"], stats["tokens_in"], stats["tokens_out"],
+                        stats["retries"], stats["errors"])
+        for agent, tiers in snapshot.get("routing", {}).items():
+            logger.info("Routing %s: %s", agent, ", ".join(
+                f"{tier} {stats['calls']} calls, {stats['total_seconds']:.2f}s" for tier, stats in tiers.items()))
+
+
+class JsonSink:
+    def __init__(self, path: str, extra: Optional[Dict] = None):
+        self.path = path
+        self.extra = extra or {}
+
+    def write(self, snapshot: Dict) -> None:
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump({**self.extra, **snapshot}, f, ensure_ascii=False, indent=4)
+
+
+class PrometheusSink:
+    """Text exposition format (node_exporter textfile collector, pushgateway)"""
+
+    def __init__(self, path: str, labels: Optional[Dict[str, str]] = None):
+        self.path = path
+        self.labels = labels or {}
+
+    def write(self, snapshot: Dict) -> None:
+        from prometheus_client import CollectorRegistry, Gauge, write_to_textfile
+
+        registry = CollectorRegistry()
+        base = list(self.labels)
+
+        def gauge(name, documentation, extra_labels=()):
+            return Gauge(name, documentation, base + list(extra_labels), registry=registry)
+
+        span_seconds = gauge("gitmetrics_span_seconds_total", "Wall time spent in a span", ["span"])
+        span_count = gauge("gitmetrics_span_count", "Number of times a span ran", ["span"])
+        for name, stats in snapshot["spans"].items():
+            span_seconds.labels(*self.labels.values(), name).set(stats["total_seconds"])
+            span_count.labels(*self.labels.values(), name).set(stats["count"])
+
+        counters = gauge("gitmetrics_counter", "Counters reported by the graphs", ["name"])
+        for name, value in snapshot["counters"].items():
+            counters.labels(*self.labels.values(), name).set(value)
+
+        llm = gauge("gitmetrics_llm", "LLM call statistics per model", ["model", "stat"])
+        for model, stats in snapshot["llm"].items():
+            for stat, value in stats.items():
+                llm.labels(*self.labels.values(), model, stat).set(value)
+
+        routing = gauge("gitmetrics_routing", "Calls and latency per model tier", ["agent", "tier", "stat"])
+        for agent, tiers in snapshot.get("routing", {}).items():
+            for tier, stats in tiers.items():
+                for stat, value in stats.items():
+                    routing.labels(*self.labels.values(), agent, tier, stat).set(value)
+
+        caches = gauge("gitmetrics_cache", "Cache hits and misses", ["cache", "result"])
+        for name, stats in snapshot["caches"].items():
+            for result, value in stats.items():
+                caches.labels(*self.labels.values(), name, result).set(value)
+
+        write_to_textfile(self.path, registry)
+
+
+def write_report(sinks: Iterable, recorder: Optional[Recorder] = None) -> Dict:
+    """Write a snapshot of the recorder to every sink; a failing sink does not stop the others"""
+    snapshot = (recorder or get_recorder()).snapshot()
+    for sink in sinks:
+        try:
+            sink.write(snapshot)
+        except Exception as e:
+            logger.warning("Instrumentation sink %s failed: %s", type(sink).__name__, e)
+    return snapshot
@@ -0,0 +1,383 @@
+"""
+Background analysis jobs.
+
+Jobs are persisted in SQLite (storage/jobs.sqlite), so a browser refresh or a
+restart of the web server does not lose them. A JobRunner claims queued jobs
+and runs each one in a separate process; only one active job per repository
+is allowed. Workers report the current stage and progress counters (files
+linted, LLM calls, ...) back into the job record, which the UI polls.
+
+Several runners may share one database (Streamlit sessions, `python -m
+ai.jobs`): every runner has an id and renews a lease on the jobs it runs.
+Only running jobs whose lease has expired (their runner is gone) are queued
+again.
+
+The runner can live inside the Streamlit server or in its own process:
+
+    python -m ai.jobs --workers 2
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import closing
+from typing import Callable, Dict, List, Optional
+
+from ai.pipeline import repo_storage_name
+
+JOBS_DB = os.path.join("storage", "jobs.sqlite")
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+# Не чаще, чем раз в столько секунд, счетчики пишутся в базу
+PROGRESS_FLUSH_SECONDS = 0.5
+# Раннер продлевает аренду своих задач раз в HEARTBEAT_SECONDS; задача без продления
+# дольше LEASE_SECONDS считается брошенной и возвращается в очередь
+HEARTBEAT_SECONDS = 10.0
+LEASE_SECONDS = 60.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    repo_url TEXT NOT NULL,
+    repo_key TEXT NOT NULL,
+    status TEXT NOT NULL,
+    force INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    stage TEXT,
+    progress TEXT NOT NULL DEFAULT '{}',
+    timings TEXT NOT NULL DEFAULT '{}',
+    message TEXT,
+    error TEXT,
+    runner_id TEXT,
+    heartbeat_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+CREATE INDEX IF NOT EXISTS jobs_repo ON jobs (repo_key, status);
+"""
+# Колонки, добавленные после первой версии схемы (для существующих баз)
+MIGRATIONS = {"runner_id": "TEXT", "heartbeat_at": "REAL"}
+
+
+class JobStore:
+    """Persistent job records; every method opens its own connection (safe across threads/processes)"""
+
+    def __init__(self, path: str = JOBS_DB):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, column_type in MIGRATIONS.items():
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {column_type}")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @staticmethod
+    def _to_dict(row: Optional[sqlite3.Row]) -> Optional[Dict]:
+        if row is None:
+            return None
+        job = dict(row)
+        job["progress"] = json.loads(job["progress"])
+        job["timings"] = json.loads(job["timings"])
+        job["force"] = bool(job["force"])
+        return job
+
+    def submit(self, repo_url: str, force: bool = False) -> str:
+        """
+        Queue an analysis; if the repository already has a queued or running job,
+        return that job's id instead of creating a duplicate.
+        """
+        repo_key = repo_storage_name(repo_url)
+        with closing(self._connect()) as conn:
+            # IMMEDIATE: проверка и вставка под одной блокировкой записи
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT id FROM jobs WHERE repo_key = ? AND status IN (?, ?) ORDER BY created_at LIMIT 1",
+                    (repo_key, *ACTIVE_STATUSES),
+                ).fetchone()
+                if row:
+                    job_id = row["id"]
+                else:
+                    job_id = uuid.uuid4().hex
+                    conn.execute(
+                        "INSERT INTO jobs (id, repo_url, repo_key, status, force, created_at)"
+                        " VALUES (?, ?, ?, ?, ?, ?)",
+                        (job_id, repo_url, repo_key, QUEUED, int(force), time.time()),
+                    )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return job_id
+
+    def claim_next(self, runner_id: Optional[str] = None) -> Optional[Dict]:
+        """Atomically move the oldest queued job to running (leased to `runner_id`) and return it"""
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+                ).fetchone()
+                if row:
+                    now = time.time()
+                    conn.execute(
+                        "UPDATE jobs SET status = ?, started_at = ?, stage = ?, runner_id = ?, heartbeat_at = ?"
+                        " WHERE id = ?",
+                        (RUNNING, now, "starting", runner_id, now, row["id"]),
+                    )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return self.get(row["id"]) if row else None
+
+    def update(self, job_id: str, stage: Optional[str] = None, progress: Optional[Dict] = None,
+               timings: Optional[Dict] = None) -> None:
+        assignments, params = [], []
+        for column, value in (("stage", stage),
+                              ("progress", None if progress is None else json.dumps(progress)),
+                              ("timings", None if timings is None else json.dumps(timings))):
+            if value is not None:
+                assignments.append(f"{column} = ?")
+                params.append(value)
+        if not assignments:
+            return
+        with closing(self._connect()) as conn:
+            conn.execute(f"UPDATE jobs SET {', '.join(assignments)} WHERE id = ?", (*params, job_id))
+
+    def finish(self, job_id: str, ok: bool, message: Optional[str] = None, error: Optional[str] = None,
+               timings: Optional[Dict] = None) -> None:
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, stage = ?, message = ?, error = ?,"
+                " timings = COALESCE(?, timings) WHERE id = ?",
+                (DONE if ok else FAILED, time.time(), None, message, error,
+                 None if timings is None else json.dumps(timings), job_id),
+            )
+
+    def heartbeat(self, runner_id: str) -> None:
+        """Renew the lease on every job the runner is running"""
+        with closing(self._connect()) as conn:
+            conn.execute("UPDATE jobs SET heartbeat_at = ? WHERE runner_id = ? AND status = ?",
+                         (time.time(), runner_id, RUNNING))
+
+    def requeue_interrupted(self, lease_seconds: float = LEASE_SECONDS, now: Optional[float] = None) -> int:
+        """Running jobs whose lease expired (their runner stopped or crashed) go back to the queue"""
+        expired = (now or time.time()) - lease_seconds
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, started_at = NULL, stage = NULL, runner_id = NULL, heartbeat_at = NULL"
+                " WHERE status = ? AND (heartbeat_at IS NULL OR heartbeat_at < ?)",
+                (QUEUED, RUNNING, expired),
+            )
+            return cursor.rowcount
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with closing(self._connect()) as conn:
+            return self._to_dict(conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def active_job(self, repo_url: str) -> Optional[Dict]:
+        with closing(self._connect()) as conn:
+            return self._to_dict(conn.execute(
+                "SELECT * FROM jobs WHERE repo_key = ? AND status IN (?, ?) ORDER BY created_at LIMIT 1",
+                (repo_storage_name(repo_url), *ACTIVE_STATUSES),
+            ).fetchone())
+
+    def list_jobs(self, limit: int = 20) -> List[Dict]:
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+
+class ProgressWriter:
+    """Progress sink that writes counters into the job record, throttled"""
+
+    def __init__(self, store: JobStore, job_id: str, flush_seconds: float = PROGRESS_FLUSH_SECONDS):
+        self.store = store
+        self.job_id = job_id
+        self.flush_seconds = flush_seconds
+        self._last_flush = 0.0
+        self._pending: Optional[Dict] = None
+        self._lock = threading.Lock()
+
+    def __call__(self, counters: Dict[str, int]) -> None:
+        with self._lock:
+            self._pending = counters
+            if time.monotonic() - self._last_flush < self.flush_seconds:
+                return
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        if self._pending is not None:
+            self.store.update(self.job_id, progress=self._pending)
+            self._pending = None
+        self._last_flush = time.monotonic()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+
+def execute_job(job: Dict, db_path: str, storage: str = "storage") -> None:
+    """Run one claimed job (in a worker process) and record its outcome"""
+    from ai.pipeline import run_all_analyses
+    from ai.progress import set_progress_sink
+
+    store = JobStore(db_path)
+    writer = ProgressWriter(store, job["id"])
+    timings: Dict[str, float] = {}
+
+    def on_stage(stage: str, seconds: float) -> None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+        writer.flush()
+        store.update(job["id"], stage=stage, timings=timings)
+
+    set_progress_sink(writer)
+    try:
+        outcome = run_all_analyses(job["repo_url"], storage_base=storage, force=job["force"], on_stage=on_stage)
+        writer.flush()
+        result = outcome["result"]
+        ok = not isinstance(result, str) or result == "Анализ не требуется"
+        store.finish(job["id"], ok, message=result if isinstance(result, str) else None,
+                     error=None if ok else result, timings=outcome.get("timings", timings))
+    except Exception as e:
+        writer.flush()
+        store.finish(job["id"], False, error="".join(traceback.format_exception_only(e)).strip(),
+                     timings=timings)
+    finally:
+        set_progress_sink(None)
+
+
+class JobRunner:
+    """Dispatcher thread that claims queued jobs and runs up to `workers` of them at once"""
+
+    def __init__(self, store: JobStore, workers: int = 2, storage: str = "storage",
+                 executor: Optional[Executor] = None,
+                 executor_factory: Optional[Callable[[], Executor]] = None,
+                 execute: Callable[[Dict, str, str], None] = execute_job,
+                 poll_seconds: float = 1.0, heartbeat_seconds: float = HEARTBEAT_SECONDS,
+                 lease_seconds: float = LEASE_SECONDS):
+        self.store = store
+        self.workers = workers
+        self.storage = storage
+        self.runner_id = uuid.uuid4().hex
+        self._executor_factory = executor_factory or self._new_pool
+        # Переданный готовый executor не пересоздается
+        self._external_executor = executor is not None
+        self.executor = executor or self._executor_factory()
+        self.execute = execute
+        self.poll_seconds = poll_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.lease_seconds = lease_seconds
+        self._last_heartbeat = 0.0
+        self._pool_broken = threading.Event()
+        self._slots = threading.Semaphore(workers)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _new_pool(self) -> Executor:
+        # spawn: рабочие процессы не наследуют потоки веб-сервера
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def _rebuild_pool(self) -> None:
+        """After a worker crash the pool refuses every submit; replace it"""
+        self._pool_broken.clear()
+        if self._external_executor:
+            return
+        self.executor.shutdown(wait=False)
+        self.executor = self._executor_factory()
+
+    def _maintain_leases(self) -> None:
+        if time.monotonic() - self._last_heartbeat < self.heartbeat_seconds:
+            return
+        self._last_heartbeat = time.monotonic()
+        self.store.heartbeat(self.runner_id)
+        self.store.requeue_interrupted(self.lease_seconds)
+
+    def start(self) -> "JobRunner":
+        self._thread = threading.Thread(target=self._dispatch, name="analysis-jobs", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, wait: bool = True) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.executor.shutdown(wait=wait)
+
+    def _submit(self, job: Dict):
+        try:
+            return self.executor.submit(self.execute, job, self.store.path, self.storage)
+        except BrokenProcessPool:
+            # Пул сломался до того, как мы узнали об этом из future: пересоздаем и пробуем снова
+            self._rebuild_pool()
+            return self.executor.submit(self.execute, job, self.store.path, self.storage)
+
+    def _dispatch(self) -> None:
+        while not self._stop.is_set():
+            self._maintain_leases()
+            if self._pool_broken.is_set():
+                self._rebuild_pool()
+            if not self._slots.acquire(timeout=self.poll_seconds):
+                continue
+            job = self.store.claim_next(self.runner_id)
+            if job is None:
+                self._slots.release()
+                self._stop.wait(self.poll_seconds)
+                continue
+            try:
+                future = self._submit(job)
+            except Exception as e:
+                self._slots.release()
+                self.store.finish(job["id"], False, error=f"Failed to start job: {e}")
+                continue
+            future.add_done_callback(lambda f, job_id=job["id"]: self._on_done(job_id, f))
+
+    def _on_done(self, job_id: str, future) -> None:
+        self._slots.release()
+        error = future.exception()
+        if error is not None:
+            if isinstance(error, BrokenProcessPool):
+                self._pool_broken.set()
+            # Процесс упал, не успев записать результат
+            self.store.finish(job_id, False, error=str(error) or type(error).__name__)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m ai.jobs", description="Run queued analysis jobs")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--db", default=JOBS_DB)
+    parser.add_argument("--storage", default="storage")
+    args = parser.parse_args(argv)
+
+    runner = JobRunner(JobStore(args.db), workers=args.workers, storage=args.storage).start()
+    print(f"Waiting for analysis jobs in {args.db} ({args.workers} workers)", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        runner.stop(wait=False)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,168 @@
+"""
+Full analysis of one repository: clone into storage/<repo>/, build the vector
+store and run integrated_code_analysis_graph, writing all reports.
+
+Shared by the Streamlit "Анализ" button and the headless CLI (ai/cli.py).
+Every run writes its instrumentation (per-stage and per-file times, LLM
+latency and tokens, cache hits) to storage/<repo>/run_report.json and, in the
+Prometheus text format, to storage/<repo>/run_metrics.prom.
+"""
+import os
+import re
+import shutil
+import time
+from typing import Callable, Dict, Optional
+
+from ai.instrumentation import JsonSink, LogSink, PrometheusSink, recording, record_span, write_report
+from ai.storage.metrics_store import METRICS_DB
+
+RUN_REPORT_FILE = "run_report.json"
+RUN_METRICS_FILE = "run_metrics.prom"
+
+StageCallback = Callable[[str, float], None]
+
+
+def repo_storage_name(repo_url: str) -> str:
+    return re.sub(r"\.git$", "", repo_url.rstrip("/").split("/")[-1])
+
+
+def report_paths(storage_dir: str) -> Dict[str, str]:
+    return {
+        "output_linter_path": os.path.join(storage_dir, "linters_report.json"),
+        "output_complexity_path": os.path.join(storage_dir, "complexity_report.json"),
+        "output_error_path": os.path.join(storage_dir, "error_report.json"),
+        "output_symbol_index_path": os.path.join(storage_dir, "symbol_index.json"),
+        "output_tables_dir": os.path.join(storage_dir, "tables"),
+    }
+
+
+def get_latest_commit(storage_repo_path):
+    """Возвращает хеш последнего коммита в локальном репозитории."""
+    import git
+
+    try:
+        repo = git.Repo(storage_repo_path)
+        return repo.head.commit.hexsha
+    except (git.exc.InvalidGitRepositoryError, git.exc.NoSuchPathError, ValueError):
+        return None
+
+
+def get_remote_commit(repo_url):
+    """Хеш HEAD удаленного репозитория без клонирования (git ls-remote)."""
+    import git
+
+    try:
+        output = git.cmd.Git().ls_remote(repo_url, "HEAD")
+    except git.exc.GitCommandError:
+        return None
+    return output.split()[0] if output else None
+
+
+def run_graph_with_timings(graph, input_state: Dict, on_stage: Optional[StageCallback] = None):
+    """
+    Run a compiled graph in streaming mode, timing every node.
+
+    The time of a node is measured from the previous update, so nodes running
+    in parallel in one step share the wall time of that step.
+
+    Returns:
+        tuple: (final state, {node: seconds})
+    """
+    state = dict(input_state)
+    timings: Dict[str, float] = {}
+    last = time.perf_counter()
+    for mode, chunk in graph.stream(input_state, stream_mode=["updates", "values"]):
+        if mode == "values":
+            state = chunk
+            continue
+        now = time.perf_counter()
+        for node in chunk:
+            timings[node] = timings.get(node, 0.0) + now - last
+            if on_stage:
+                on_stage(node, now - last)
+        last = now
+    return state, timings
+
+
+def write_run_report(storage_dir: str, repo_url: str, recorder, timings: Dict[str, float],
+                     status: str) -> Dict:
+    """Run report (JSON and Prometheus text) of one analysis from its recorder"""
+    sinks = [
+        LogSink(),
+        JsonSink(os.path.join(storage_dir, RUN_REPORT_FILE),
+                 extra={"repo_url": repo_url, "status": status, "stages": timings}),
+        PrometheusSink(os.path.join(storage_dir, RUN_METRICS_FILE),
+                       labels={"repo": repo_storage_name(repo_url)}),
+    ]
+    return write_report(sinks, recorder)
+
+
+def run_all_analyses(repo_url, storage_base: str = "storage", force: bool = False,
+                     use_llm: bool = True, on_stage: Optional[StageCallback] = None,
+                     search_errors: bool = True):
+    """
+    Запускает все анализы для репозитория при необходимости.
+
+    use_llm включает объяснения сложного кода, search_errors - поиск ошибок;
+    без обоих анализ не обращается к LLM.
+    """
+    import git
+
+    storage_dir = os.path.join(storage_base, repo_storage_name(repo_url))
+    repo_path = os.path.join(storage_dir, "repo")
+    paths = report_paths(storage_dir)
+    timings: Dict[str, float] = {}
+
+    # Анализ не нужен, если локальная копия на последнем коммите и все отчеты на месте
+    if not force and os.path.exists(repo_path):
+        started = time.perf_counter()
+        up_to_date = get_latest_commit(repo_path) == get_remote_commit(repo_url)
+        timings["check_remote"] = time.perf_counter() - started
+        reports = [paths["output_error_path"], paths["output_complexity_path"], paths["output_linter_path"]]
+        if up_to_date and all(os.path.exists(p) for p in reports):
+            return {"result": "Анализ не требуется", "storage_dir": storage_dir, "timings": timings}
+
+    os.makedirs(storage_dir, exist_ok=True)
+    if os.path.exists(repo_path):
+        shutil.rmtree(repo_path)  # Удаление старого репозитория перед клонированием
+
+    def stage_done(stage: str, started: float) -> None:
+        timings[stage] = time.perf_counter() - started
+        record_span(stage, timings[stage])
+        if on_stage:
+            on_stage(stage, timings[stage])
+
+    with recording() as recorder:
+        status = "failed"
+        try:
+            started = time.perf_counter()
+            try:
+                git.Repo.clone_from(repo_url, repo_path)
+            except git.exc.GitCommandError:
+                return {"result": "Ошибка при клонировании репозитория", "storage_dir": storage_dir,
+                        "timings": timings}
+            stage_done("clone_storage", started)
+
+            # Тяжелые зависимости (torch, chromadb, LLM-клиенты) нужны только при запуске анализа
+            from ai.tools.rag_tool import initialize_vector_db_from_github
+            from ai.graphs.code_analyse import integrated_code_analysis_graph
+
+            started = time.perf_counter()
+            initialize_vector_db_from_github(repo_url, storage_base)
+            stage_done("vector_store", started)
+
+            input_state = {
+                "repo_url": repo_url,
+                "use_llm": use_llm,
+                "search_errors": search_errors,
+                **paths,
+                "output_metrics_db": os.path.join(storage_base, os.path.basename(METRICS_DB)),
+            }
+            result, graph_timings = run_graph_with_timings(integrated_code_analysis_graph, input_state, on_stage)
+            timings.update(graph_timings)
+            status = "done"
+        finally:
+            # Отчет пишется и для упавшего запуска: по нему видно, на какой стадии он застрял
+            write_run_report(storage_dir, repo_url, recorder, timings, status)
+
+    return {"result": result, "storage_dir": storage_dir, "timings": timings}
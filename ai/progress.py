@@ -0,0 +1,46 @@
+"""
+Process-wide progress counters of the running analysis.
+
+Graph nodes call report_progress("files_linted") and similar; whoever runs
+the analysis (a background job, the CLI) installs a sink with
+set_progress_sink() to receive the counters. Without a sink the calls are
+no-ops, so the nodes do not depend on who runs them.
+"""
+import threading
+from typing import Callable, Dict, Optional
+
+ProgressSink = Callable[[Dict[str, int]], None]
+
+_lock = threading.Lock()
+_sink: Optional[ProgressSink] = None
+_counters: Dict[str, int] = {}
+
+
+def set_progress_sink(sink: Optional[ProgressSink]) -> None:
+    """Install (or with None remove) the receiver of counter updates and reset the counters"""
+    global _sink
+    with _lock:
+        _sink = sink
+        _counters.clear()
+
+
+def report_progress(counter: str, amount: int = 1, total: bool = False) -> None:
+    """
+    Increase a counter (or, with total=True, set it, e.g. files_total).
+
+    The sink gets a snapshot of all counters; it is called outside the lock.
+    """
+    with _lock:
+        if _sink is None:
+            return
+        if total:
+            _counters[counter] = amount
+        else:
+            _counters[counter] = _counters.get(counter, 0) + amount
+        sink, snapshot = _sink, dict(_counters)
+    sink(snapshot)
+
+
+def get_progress() -> Dict[str, int]:
+    with _lock:
+        return dict(_counters)
@@ -0,0 +1,161 @@
+"""
+Startup profiling: per-module import times of the app and graph entry points.
+
+Every entry point is imported in a fresh interpreter started with
+`-X importtime`, so the numbers are cold-import times and are not affected by
+modules already loaded in the current process.
+
+    python -m ai.startup_profile                         # all entry points
+    python -m ai.startup_profile ai.graphs.code_analyse --top 30
+    python -m ai.startup_profile --json storage/startup_profile.json
+"""
+import argparse
+import json
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+ENTRY_POINTS = [
+    "main_app",
+    "ui.pages.add_repository",
+    "ui.pages.chat",
+    "ui.pages.custom",
+    "ai.graphs.code_analyse",
+    "ai.graphs.chat_graph",
+    "ai.graphs.custom_criteria_graph",
+    "ai.graphs.task_allocation_graph",
+]
+
+# Пакеты, которые обычно определяют время холодного старта
+HEAVY_PACKAGES = ("torch", "chromadb", "langchain_community", "transformers",
+                  "pylint", "libcst", "black", "lizard", "streamlit")
+
+_LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+
+class ImportRecord(NamedTuple):
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+class ImportProfile(NamedTuple):
+    entry_point: str
+    wall_seconds: float
+    records: List[ImportRecord]
+    error: Optional[str] = None
+
+    @property
+    def cumulative_us(self) -> Optional[int]:
+        """Cumulative import time of the entry point module itself"""
+        for record in reversed(self.records):
+            if record.module == self.entry_point:
+                return record.cumulative_us
+        return None
+
+
+def parse_importtime(output: str) -> List[ImportRecord]:
+    """
+    Parse the stderr of `python -X importtime`.
+
+    Lines that are not import records (header, tracebacks, warnings) are skipped.
+    Depth is the nesting level of the import: 0 for modules imported directly.
+    """
+    records = []
+    for line in output.splitlines():
+        match = _LINE_RE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, module = match.groups()
+        # Python отступает на два пробела на уровень после разделителя "| "
+        records.append(ImportRecord(module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return records
+
+
+def package_totals(records: List[ImportRecord]) -> Dict[str, int]:
+    """Self time aggregated by top-level package, in microseconds, largest first"""
+    totals: Dict[str, int] = {}
+    for record in records:
+        package = record.module.split(".", 1)[0]
+        totals[package] = totals.get(package, 0) + record.self_us
+    return dict(sorted(totals.items(), key=lambda item: item[1], reverse=True))
+
+
+def profile_import(module: str, python: str = sys.executable, timeout: int = 600) -> ImportProfile:
+    """Import `module` in a fresh interpreter and collect its import-time records"""
+    started = time.perf_counter()
+    process = subprocess.run(
+        [python, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        timeout=timeout,
+    )
+    wall_seconds = time.perf_counter() - started
+    error = None
+    if process.returncode != 0:
+        # Последняя строка трейсбека достаточно объясняет, чего не хватает
+        lines = [line for line in process.stderr.splitlines() if not line.startswith("import time:")]
+        error = lines[-1] if lines else f"exit code {process.returncode}"
+    return ImportProfile(module, wall_seconds, parse_importtime(process.stderr), error)
+
+
+def format_profile(profile: ImportProfile, top: int = 15) -> str:
+    lines = [f"{profile.entry_point}: {profile.wall_seconds:.2f}s wall"]
+    if profile.error:
+        lines.append(f"  import failed: {profile.error}")
+    if profile.cumulative_us is not None:
+        lines.append(f"  cumulative import: {profile.cumulative_us / 1e6:.2f}s")
+
+    totals = package_totals(profile.records)
+    heavy = [f"{name} {totals[name] / 1e6:.2f}s" for name in HEAVY_PACKAGES if name in totals]
+    if heavy:
+        lines.append("  heavy packages: " + ", ".join(heavy))
+
+    lines.append(f"  top {top} packages by self time:")
+    for name, us in list(totals.items())[:top]:
+        lines.append(f"    {us / 1e6:8.3f}s  {name}")
+    return "\n".join(lines)
+
+
+def profile_to_dict(profile: ImportProfile, top: int = 15) -> Dict:
+    return {
+        "entry_point": profile.entry_point,
+        "wall_seconds": round(profile.wall_seconds, 3),
+        "cumulative_seconds": None if profile.cumulative_us is None else profile.cumulative_us / 1e6,
+        "error": profile.error,
+        "packages": {name: us / 1e6 for name, us in list(package_totals(profile.records).items())[:top]},
+        "modules": [
+            record._asdict()
+            for record in sorted(profile.records, key=lambda r: r.cumulative_us, reverse=True)[:top]
+        ],
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Per-module cold import times of the app entry points")
+    parser.add_argument("modules", nargs="*", default=ENTRY_POINTS, help="modules to profile")
+    parser.add_argument("--top", type=int, default=15, help="number of packages/modules to show")
+    parser.add_argument("--json", dest="json_path", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    profiles = [profile_import(module) for module in args.modules]
+    for profile in profiles:
+        print(format_profile(profile, args.top))
+        print()
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump([profile_to_dict(p, args.top) for p in profiles], f, ensure_ascii=False, indent=2)
+
+    return 1 if any(profile.error for profile in profiles) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
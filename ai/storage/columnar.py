@@ -0,0 +1,176 @@
+"""
+Columnar copies of the analysis reports for the dashboards.
+
+Next to the JSON reports the analysis writes storage/<repo>/tables/:
+    files.parquet      one row per file: complexity, lint and error metrics
+    functions.parquet  one row per complex function (lizard)
+    issues.parquet     one row per issue found by the ErrorSearcher
+
+Logs, fixed code and suggested solutions stay in JSON only, so the tables are
+small and can be memory-mapped and read column by column. pyarrow is imported
+lazily; building the columns is pure Python.
+"""
+import os
+import re
+from typing import Dict, List, Optional, Sequence
+
+TABLES_DIR = "tables"
+
+# Table -> ordered (column, arrow type name); types are resolved in _schema
+TABLE_COLUMNS = {
+    "files": [
+        ("file", "string"),
+        ("language", "string"),
+        ("total_complexity", "int64"),
+        ("average_complexity", "float64"),
+        ("complex_functions", "int64"),
+        ("lint_errors", "int64"),
+        ("has_fixed_code", "bool"),
+        ("total_issues", "int64"),
+        ("high_priority", "int64"),
+        ("medium_priority", "int64"),
+        ("low_priority", "int64"),
+        ("error_score", "float64"),
+        ("error_summary", "string"),
+    ],
+    "functions": [
+        ("file", "string"),
+        ("function_name", "string"),
+        ("complexity", "int64"),
+        ("lines", "int64"),
+        ("start_line", "int64"),
+        ("end_line", "int64"),
+    ],
+    "issues": [
+        ("file", "string"),
+        ("issue_id", "string"),
+        ("start_line", "int64"),
+        ("end_line", "int64"),
+        ("criticality", "string"),
+        ("error", "string"),
+    ],
+}
+
+
+def table_path(tables_dir: str, name: str) -> str:
+    return os.path.join(tables_dir, f"{name}.parquet")
+
+
+def parse_rows(rows: str):
+    """"34-37" -> (34, 37), "34" -> (34, 34), anything else -> (None, None)"""
+    match = re.match(r"\s*(\d+)\s*-\s*(\d+)", rows or "")
+    if match:
+        return int(match.group(1)), int(match.group(2))
+    match = re.match(r"\s*(\d+)", rows or "")
+    if match:
+        return int(match.group(1)), int(match.group(1))
+    return None, None
+
+
+def _summarize_errors(issues: Dict) -> str:
+    # Та же короткая строка, что показывает страница ошибок
+    descriptions = [issue.get("error", "") for issue in issues.values()]
+    summary = ", ".join(descriptions[:2])
+    if len(descriptions) > 2:
+        summary += f" и еще {len(descriptions) - 2} ошибок"
+    return summary
+
+
+def build_tables(linter_results: List[Dict],
+                 complexity_results: List[Dict],
+                 error_results: List[Dict]) -> Dict[str, Dict[str, list]]:
+    """
+    Turn the per-file results of the analysis nodes into column lists.
+
+    Args:
+        linter_results: items of process_all_files_lint
+        complexity_results: items of process_all_files_complexity (with "functions")
+        error_results: items of process_all_files_errors
+
+    Returns:
+        dict: table name -> column name -> values
+    """
+    tables = {name: {column: [] for column, _ in columns} for name, columns in TABLE_COLUMNS.items()}
+
+    linters = {item.get("file", ""): item for item in linter_results}
+    complexity = {item.get("file", ""): item for item in complexity_results}
+    errors = {item.get("file", ""): item for item in error_results}
+
+    files = tables["files"]
+    for file_path in sorted(set(linters) | set(complexity) | set(errors)):
+        lint = linters.get(file_path, {})
+        comp = complexity.get(file_path, {})
+        error = errors.get(file_path, {})
+        metrics = error.get("metrics") or {}
+        issues = error.get("issues") or {}
+
+        files["file"].append(file_path)
+        files["language"].append(os.path.splitext(file_path)[1].lstrip(".").lower())
+        files["total_complexity"].append(int(comp.get("total_complexity", 0)))
+        files["average_complexity"].append(float(comp.get("average_complexity", 0)))
+        files["complex_functions"].append(len(comp.get("functions", [])))
+        files["lint_errors"].append(int(lint.get("error_count", 0) or 0))
+        files["has_fixed_code"].append(bool(lint.get("fixed_code")))
+        files["total_issues"].append(int(metrics.get("total_issues", 0)))
+        files["high_priority"].append(int(metrics.get("high_priority", 0)))
+        files["medium_priority"].append(int(metrics.get("medium_priority", 0)))
+        files["low_priority"].append(int(metrics.get("low_priority", 0)))
+        files["error_score"].append(float(metrics.get("error_score", 0)))
+        files["error_summary"].append(_summarize_errors(issues))
+
+        for function in comp.get("functions", []):
+            row = tables["functions"]
+            row["file"].append(file_path)
+            row["function_name"].append(function.get("function_name", ""))
+            row["complexity"].append(int(function.get("complexity", 0)))
+            row["lines"].append(int(function.get("lines", 0)))
+            row["start_line"].append(int(function.get("start_line", 0)))
+            row["end_line"].append(int(function.get("end_line", 0)))
+
+        for issue_id, issue in issues.items():
+            start_line, end_line = parse_rows(str(issue.get("rows", "")))
+            row = tables["issues"]
+            row["file"].append(file_path)
+            row["issue_id"].append(issue_id)
+            row["start_line"].append(start_line)
+            row["end_line"].append(end_line)
+            row["criticality"].append(issue.get("criticality", "medium"))
+            row["error"].append(issue.get("error", ""))
+
+    return tables
+
+
+def _schema(name: str):
+    import pyarrow as pa
+
+    return pa.schema([(column, getattr(pa, type_name)()) for column, type_name in TABLE_COLUMNS[name]])
+
+
+def write_tables(tables: Dict[str, Dict[str, list]], tables_dir: str) -> None:
+    """Write the tables as zstd-compressed Parquet files (atomically replaced)"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    os.makedirs(tables_dir, exist_ok=True)
+    for name, columns in tables.items():
+        table = pa.Table.from_pydict(columns, schema=_schema(name))
+        path = table_path(tables_dir, name)
+        # Запись во временный файл: страницы могут читать таблицу в этот момент
+        pq.write_table(table, path + ".tmp", compression="zstd")
+        os.replace(path + ".tmp", path)
+
+
+def remove_tables(tables_dir: str) -> None:
+    """Delete the tables, so the dashboards fall back to the JSON reports"""
+    for name in TABLE_COLUMNS:
+        for path in (table_path(tables_dir, name), table_path(tables_dir, name) + ".tmp"):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def read_table(path: str, columns: Optional[Sequence[str]] = None, filters=None):
+    """Memory-mapped read of selected columns (and row filters) of one table"""
+    import pyarrow.parquet as pq
+
+    return pq.read_table(path, columns=list(columns) if columns else None,
+                         filters=filters, memory_map=True)
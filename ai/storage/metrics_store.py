@@ -0,0 +1,253 @@
+"""
+SQLite history of analysis runs.
+
+JSON reports in storage/<repo>/ are overwritten by every analysis; this store
+keeps every run keyed by repo/branch/commit, so the dashboards can show trends
+and per-file diffs with indexed queries. One run is written in a single
+transaction with executemany per table.
+"""
+import os
+import re
+import sqlite3
+import time
+from contextlib import closing
+from typing import Dict, List, Optional
+
+from ai.storage.columnar import build_tables
+
+METRICS_DB = os.path.join("storage", "metrics.sqlite")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    repo TEXT NOT NULL,
+    branch TEXT NOT NULL,
+    commit_sha TEXT,
+    created_at REAL NOT NULL,
+    total_files INTEGER NOT NULL,
+    total_complexity INTEGER NOT NULL,
+    average_complexity REAL NOT NULL,
+    lint_errors INTEGER NOT NULL,
+    total_issues INTEGER NOT NULL,
+    high_priority INTEGER NOT NULL,
+    error_score REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_repo_branch ON runs (repo, branch, created_at);
+CREATE INDEX IF NOT EXISTS runs_commit ON runs (repo, commit_sha);
+
+CREATE TABLE IF NOT EXISTS files (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    file TEXT NOT NULL,
+    language TEXT,
+    total_complexity INTEGER,
+    average_complexity REAL,
+    complex_functions INTEGER,
+    lint_errors INTEGER,
+    total_issues INTEGER,
+    high_priority INTEGER,
+    medium_priority INTEGER,
+    low_priority INTEGER,
+    error_score REAL,
+    PRIMARY KEY (run_id, file)
+);
+
+CREATE TABLE IF NOT EXISTS functions (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    file TEXT NOT NULL,
+    function_name TEXT,
+    complexity INTEGER,
+    lines INTEGER,
+    start_line INTEGER,
+    end_line INTEGER
+);
+CREATE INDEX IF NOT EXISTS functions_run_file ON functions (run_id, file);
+
+CREATE TABLE IF NOT EXISTS issues (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    file TEXT NOT NULL,
+    issue_id TEXT,
+    start_line INTEGER,
+    end_line INTEGER,
+    criticality TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS issues_run_file ON issues (run_id, file);
+
+CREATE TABLE IF NOT EXISTS lint_messages (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    file TEXT NOT NULL,
+    line INTEGER,
+    code TEXT,
+    message TEXT
+);
+CREATE INDEX IF NOT EXISTS lint_messages_run_file ON lint_messages (run_id, file);
+"""
+
+FILE_COLUMNS = ("file", "language", "total_complexity", "average_complexity", "complex_functions",
+                "lint_errors", "total_issues", "high_priority", "medium_priority", "low_priority",
+                "error_score")
+FUNCTION_COLUMNS = ("file", "function_name", "complexity", "lines", "start_line", "end_line")
+ISSUE_COLUMNS = ("file", "issue_id", "start_line", "end_line", "criticality", "error")
+
+# path:line[:col]: текст — формат и pylint, и cpplint
+_LINT_LINE_RE = re.compile(r"^.+?:(\d+):(?:\d+:)?\s*(.+)$")
+_PYLINT_CODE_RE = re.compile(r"^([A-Z]\d{4}):\s*(.*)$")
+_CPPLINT_CODE_RE = re.compile(r"^(.*?)\s+\[([\w/+-]+)\]\s+\[\d\]$")
+
+
+def parse_lint_messages(logs: Optional[str]) -> List[tuple]:
+    """(line, code, message) tuples from pylint or cpplint output"""
+    messages = []
+    for raw_line in (logs or "").splitlines():
+        match = _LINT_LINE_RE.match(raw_line.strip())
+        if not match:
+            continue
+        line, text = int(match.group(1)), match.group(2)
+        code = None
+        pylint_match = _PYLINT_CODE_RE.match(text)
+        cpplint_match = _CPPLINT_CODE_RE.match(text)
+        if pylint_match:
+            code, text = pylint_match.groups()
+        elif cpplint_match:
+            text, code = cpplint_match.groups()
+        messages.append((line, code, text))
+    return messages
+
+
+def _rows(table: Dict[str, list], columns) -> List[tuple]:
+    return list(zip(*(table[column] for column in columns)))
+
+
+class MetricsStore:
+    """Runs, files, functions, issues and lint messages of every analysis"""
+
+    def __init__(self, path: str = METRICS_DB):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as conn:
+            # WAL: дашборды читают, пока анализ пишет новый прогон
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    def record_run(self, repo: str, branch: str, commit_sha: Optional[str],
+                   linter_results: List[Dict], complexity_results: List[Dict],
+                   error_results: List[Dict], created_at: Optional[float] = None) -> int:
+        """Store the per-file results of one analysis; returns the run id"""
+        tables = build_tables(linter_results, complexity_results, error_results)
+        files = tables["files"]
+        averages = files["average_complexity"]
+        scores = files["error_score"]
+        lint_rows = [
+            (item.get("file", ""), line, code, message)
+            for item in linter_results
+            for line, code, message in parse_lint_messages(item.get("logs"))
+        ]
+
+        with closing(self._connect()) as conn, conn:
+            cursor = conn.execute(
+                "INSERT INTO runs (repo, branch, commit_sha, created_at, total_files, total_complexity,"
+                " average_complexity, lint_errors, total_issues, high_priority, error_score)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    repo, branch, commit_sha, created_at if created_at is not None else time.time(),
+                    len(files["file"]),
+                    sum(files["total_complexity"]),
+                    sum(averages) / len(averages) if averages else 0.0,
+                    sum(files["lint_errors"]),
+                    sum(files["total_issues"]),
+                    sum(files["high_priority"]),
+                    sum(scores) / len(scores) if scores else 0.0,
+                ),
+            )
+            run_id = cursor.lastrowid
+            conn.executemany(
+                f"INSERT INTO files (run_id, {', '.join(FILE_COLUMNS)})"
+                f" VALUES (?{', ?' * len(FILE_COLUMNS)})",
+                [(run_id, *row) for row in _rows(files, FILE_COLUMNS)],
+            )
+            conn.executemany(
+                f"INSERT INTO functions (run_id, {', '.join(FUNCTION_COLUMNS)})"
+                f" VALUES (?{', ?' * len(FUNCTION_COLUMNS)})",
+                [(run_id, *row) for row in _rows(tables["functions"], FUNCTION_COLUMNS)],
+            )
+            conn.executemany(
+                f"INSERT INTO issues (run_id, {', '.join(ISSUE_COLUMNS)})"
+                f" VALUES (?{', ?' * len(ISSUE_COLUMNS)})",
+                [(run_id, *row) for row in _rows(tables["issues"], ISSUE_COLUMNS)],
+            )
+            conn.executemany(
+                "INSERT INTO lint_messages (run_id, file, line, code, message) VALUES (?, ?, ?, ?, ?)",
+                [(run_id, *row) for row in lint_rows],
+            )
+        return run_id
+
+    def history(self, repo: str, branch: Optional[str] = None, limit: int = 50) -> List[Dict]:
+        """Repository-level totals of the last runs, oldest first (for trend charts)"""
+        query = "SELECT * FROM runs WHERE repo = ?"
+        params: list = [repo]
+        if branch is not None:
+            query += " AND branch = ?"
+            params.append(branch)
+        query += " ORDER BY created_at DESC, id DESC LIMIT ?"
+        params.append(limit)
+        with closing(self._connect()) as conn:
+            rows = [dict(row) for row in conn.execute(query, params)]
+        return rows[::-1]
+
+    def latest_runs(self, repo: str, branch: Optional[str] = None, count: int = 2) -> List[int]:
+        """Ids of the newest runs, newest first"""
+        return [run["id"] for run in reversed(self.history(repo, branch, count))]
+
+    def diff_runs(self, base_run_id: int, head_run_id: int) -> List[Dict]:
+        """
+        Per-file metric changes between two runs.
+
+        Returns:
+            list: dicts with file, status (added/removed/changed) and base_/head_ values
+            of total_complexity, lint_errors and total_issues; unchanged files are omitted
+        """
+        metrics = ("total_complexity", "lint_errors", "total_issues")
+        select = ", ".join(f"b.{m} AS base_{m}, h.{m} AS head_{m}" for m in metrics)
+        changed = " OR ".join(f"b.{m} IS NOT h.{m}" for m in metrics)
+        query = f"""
+            SELECT h.file AS file, {select} FROM files h
+            LEFT JOIN files b ON b.run_id = :base AND b.file = h.file
+            WHERE h.run_id = :head AND (b.file IS NULL OR {changed})
+            UNION ALL
+            SELECT b.file AS file, {select} FROM files b
+            LEFT JOIN files h ON h.run_id = :head AND h.file = b.file
+            WHERE b.run_id = :base AND h.file IS NULL
+            ORDER BY file
+        """
+        with closing(self._connect()) as conn:
+            rows = [dict(row) for row in conn.execute(query, {"base": base_run_id, "head": head_run_id})]
+        for row in rows:
+            if row["base_total_complexity"] is None:
+                row["status"] = "added"
+            elif row["head_total_complexity"] is None:
+                row["status"] = "removed"
+            else:
+                row["status"] = "changed"
+        return rows
+
+    def file_history(self, repo: str, file: str, branch: Optional[str] = None, limit: int = 50) -> List[Dict]:
+        """Metrics of one file across the last runs, oldest first"""
+        query = ("SELECT r.id AS run_id, r.commit_sha, r.created_at, f.* FROM files f"
+                 " JOIN runs r ON r.id = f.run_id WHERE r.repo = ? AND f.file = ?")
+        params: list = [repo, file]
+        if branch is not None:
+            query += " AND r.branch = ?"
+            params.append(branch)
+        query += " ORDER BY r.created_at DESC, r.id DESC LIMIT ?"
+        params.append(limit)
+        with closing(self._connect()) as conn:
+            rows = [dict(row) for row in conn.execute(query, params)]
+        return rows[::-1]
@@ -0,0 +1,89 @@
+import re
+
+import pytest
+
+from ai.benchmarks.runner import append_result, compare_runs, find_baseline, load_results, run_benchmark
+from ai.benchmarks.stub_llm import StubErrorSearcher, error_report
+from ai.benchmarks.synthetic import generate_repo, parse_mix, split_counts
+
+
+def test_synthetic_repo_is_deterministic(tmp_path):
+    first = generate_repo(str(tmp_path / "a"), files=10, mix={"py": 2, "cpp": 1, "java": 1}, seed=3)
+    second = generate_repo(str(tmp_path / "b"), files=10, mix={"py": 2, "cpp": 1, "java": 1}, seed=3)
+
+    assert first == second
+    assert sum(p.endswith(".py") for p in first) == 5
+    for path in first:
+        assert (tmp_path / "a" / path).read_text(encoding="utf-8") == (tmp_path / "b" / path).read_text(encoding="utf-8")
+    compile((tmp_path / "a" / first[0]).read_text(encoding="utf-8"), first[0], "exec")
+
+
+def test_language_mix():
+    assert parse_mix("py=6, cpp=3,java") == {"py": 6, "cpp": 3, "java": 1}
+    assert split_counts(10, {"py": 6, "cpp": 3, "java": 1}) == {"py": 6, "cpp": 3, "java": 1}
+    assert sum(split_counts(7, {"py": 1, "cpp": 1, "java": 1}).values()) == 7
+    with pytest.raises(ValueError):
+        parse_mix("go=1")
+    with pytest.raises(ValueError):
+        parse_mix("py=0")
+
+
+def test_stub_error_searcher_answers_in_issue_format():
+    code = "\n".join(f"{i + 1}: x = {i}" for i in range(30))
+    answer = StubErrorSearcher().invoke({"messages": [{"role": "user", "content": code}]})["messages"][-1].content
+
+    assert answer == error_report(code)
+    for start, end in re.findall(r"rows: (\d+)-(\d+)", answer):
+        assert 1 <= int(start) <= int(end) <= 30
+    assert len(re.findall(r"\[ISSUE \d+\]", answer)) == len(re.findall(r"criticality: ", answer))
+
+
+def _result(timestamp, seconds, rss=100.0, failed=0, files=10):
+    return {"timestamp": timestamp, "version": f"v{timestamp}", "config": {"files": files},
+            "stages": {"lint": {"seconds": seconds, "failed_files": failed}}, "peak_rss_mb": rss}
+
+
+def test_history_and_regressions(tmp_path):
+    path = str(tmp_path / "bench.jsonl")
+    for result in (_result(1, 1.0), _result(2, 5.0, files=99), _result(3, 1.5, rss=200.0, failed=2)):
+        append_result(result, path)
+    history = load_results(path)
+
+    current = history[-1]
+    baseline = find_baseline(history, current)
+    assert baseline["version"] == "v1"
+    regressions = compare_runs(baseline, current)
+    assert any(r.startswith("lint: 1.000s -> 1.500s") for r in regressions)
+    assert any("failed files 0 -> 2" in r for r in regressions)
+    assert any(r.startswith("peak RSS") for r in regressions)
+
+    assert compare_runs(baseline, _result(4, 1.1)) == []
+    assert find_baseline(history, history[0]) is None
+
+
+def test_complexity_stage_runs_offline():
+    pytest.importorskip("lizard")
+    pytest.importorskip("langgraph")
+    result = run_benchmark(files=6, functions_per_file=3, stages=["complexity", "triage"])
+
+    for stage in ("complexity", "triage"):
+        assert result["stages"][stage]["failed_files"] == 0
+        assert result["stages"][stage]["files_per_second"] > 0
+        assert "peak_rss_mb" not in result["stages"][stage]
+        assert result["stages"][stage]["rss_growth_mb"] is None or result["stages"][stage]["rss_growth_mb"] >= 0
+    assert result["llm"]["stub"]["calls"] > 0
+
+
+def test_clang_format_is_skipped_during_runs(monkeypatch):
+    pytest.importorskip("lizard")
+    pytest.importorskip("langgraph")
+    from ai.benchmarks.runner import _skip_clang_format
+    from ai.graphs import code_analyse
+
+    def fail(*args, **kwargs):
+        raise AssertionError("clang-format must not run in benchmarks")
+
+    monkeypatch.setattr(code_analyse.subprocess, "run", fail)
+    with _skip_clang_format():
+        assert code_analyse.clang_format("int main(){}", "-style=LLVM") == "int main(){}"
+    assert code_analyse.clang_format.__name__ == "clang_format"
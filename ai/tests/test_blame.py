@@ -0,0 +1,71 @@
+import os
+import subprocess
+
+from ai.tools.blame import BlameIndex, BlameService, CommitInfo, parse_incremental_blame
+
+SHA_A = "a" * 40
+SHA_B = "b" * 40
+
+INCREMENTAL = f"""{SHA_A} 1 1 3
+author Alice
+author-mail <alice@example.com>
+author-time 100
+summary first
+filename a.py
+{SHA_B} 4 4 2
+author Bob
+author-time 200
+previous {SHA_A} a.py
+filename a.py
+{SHA_A} 6 6 1
+filename a.py
+"""
+
+
+def test_parse_incremental_blame():
+    ranges, commits = parse_incremental_blame(INCREMENTAL)
+
+    assert [(r.start, r.end, r.commit) for r in ranges] == [(1, 3, SHA_A), (4, 5, SHA_B), (6, 6, SHA_A)]
+    assert commits == {SHA_A: CommitInfo("Alice", 100, "alice@example.com"), SHA_B: CommitInfo("Bob", 200)}
+
+
+def test_range_queries():
+    index = BlameIndex(*parse_incremental_blame(INCREMENTAL))
+
+    assert index.authors(2, 5) == {"Alice": 2, "Bob": 2}
+    # Ничья по строкам: побеждает автор более свежего изменения
+    assert index.majority_author(2, 5) == "Bob"
+    assert index.majority_author(1, 6) == "Alice"
+    assert index.last_author(1, 3) == "Alice"
+    assert index.last_author(3, 4) == "Bob"
+    assert index.majority_author(50, 60) is None
+
+
+def test_service_blames_each_file_once(tmp_path):
+    def git(*args, name="t", date="2024-01-01T00:00:00"):
+        subprocess.run(["git", "-C", str(tmp_path), "-c", f"user.name={name}", "-c", "user.email=t@example.com",
+                        *args], check=True, capture_output=True, env={**os.environ, "GIT_AUTHOR_DATE": date})
+
+    git("init", "-q")
+    (tmp_path / "a.py").write_text("a = 1\nb = 2\nc = 3\n")
+    git("add", ".")
+    git("commit", "-q", "-m", "first", name="Alice")
+    (tmp_path / "a.py").write_text("a = 1\nb = 20\nc = 3\n")
+    git("commit", "-q", "-am", "second", name="Bob", date="2024-02-01T00:00:00")
+
+    service = BlameService()
+    service.prefetch(str(tmp_path), ["a.py", str(tmp_path / "a.py")])
+
+    assert service.majority_author(str(tmp_path), "a.py", 1, 3) == "Alice"
+    assert service.last_author(str(tmp_path), str(tmp_path / "a.py"), 1, 3) == "Bob"
+    assert service.majority_author(str(tmp_path), "a.py", 0, 2) in ("Alice", "Bob")
+    assert service.cache.misses == 1 and len(service.cache) == 1
+    commit = service.head(str(tmp_path))
+    assert service.last_author(str(tmp_path), "a.py", 2, 2, commit=commit) == "Bob"
+    assert service.cache.misses == 1
+    assert service.majority_author(str(tmp_path), "missing.py", 1, 2) is None
+
+    # Новый коммит виден без сброса кэша
+    (tmp_path / "a.py").write_text("a = 10\nb = 20\nc = 30\n")
+    git("commit", "-q", "-am", "third", name="Carol", date="2024-03-01T00:00:00")
+    assert service.majority_author(str(tmp_path), "a.py", 1, 3) == "Carol"
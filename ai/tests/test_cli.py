@@ -0,0 +1,50 @@
+from ai.cli import EXIT_FAILED, EXIT_OK, EXIT_USAGE, format_summary, load_repo_list, main
+import ai.cli as cli
+
+
+def test_load_repo_list_merges_file_and_arguments(tmp_path):
+    repos_file = tmp_path / "repos.txt"
+    repos_file.write_text("# nightly\nhttps://github.com/a/x\n\nhttps://github.com/b/y  # flaky\n")
+
+    assert load_repo_list(["https://github.com/b/y"], str(repos_file)) == [
+        "https://github.com/b/y",
+        "https://github.com/a/x",
+    ]
+
+
+def test_exit_codes(monkeypatch):
+    assert main(["analyze"]) == EXIT_USAGE
+    assert main(["analyze", "--workers", "0", "https://github.com/a/x"]) == EXIT_USAGE
+
+    outcomes = {"https://github.com/a/x": True, "https://github.com/b/y": False}
+    monkeypatch.setattr(cli, "run_batch", lambda repos, *args: [
+        {"repo": repo, "ok": outcomes[repo], "seconds": 1.0, "timings": {"clone_repo": 0.5}} for repo in repos
+    ])
+
+    assert main(["analyze", "https://github.com/a/x"]) == EXIT_OK
+    assert main(["analyze", "https://github.com/a/x", "https://github.com/b/y"]) == EXIT_FAILED
+
+
+def test_no_llm_skips_error_search_too(monkeypatch):
+    import ai.pipeline
+
+    calls = []
+
+    def fake_run(repo_url, **kwargs):
+        calls.append(kwargs)
+        return {"result": "Анализ не требуется", "storage_dir": "storage/x", "timings": {}}
+
+    monkeypatch.setattr(ai.pipeline, "run_all_analyses", fake_run)
+
+    assert main(["analyze", "--no-llm", "https://github.com/a/x"]) == EXIT_OK
+    assert main(["analyze", "https://github.com/a/x"]) == EXIT_OK
+    assert [(call["use_llm"], call["search_errors"]) for call in calls] == [(False, False), (True, True)]
+
+
+def test_format_summary_lists_stages_slowest_first():
+    text = format_summary([{"repo": "r", "ok": True, "seconds": 3.0,
+                            "timings": {"clone_repo": 1.0, "process_all_files_errors": 2.0}}])
+
+    lines = text.splitlines()
+    assert lines[0] == "OK   r (3.0s)"
+    assert lines[1].split()[0] == "process_all_files_errors"
@@ -0,0 +1,58 @@
+import pytest
+
+from ai.storage.columnar import build_tables, parse_rows, read_table, remove_tables, table_path, write_tables
+
+LINTER_RESULTS = [{"file": "a.py", "logs": "...", "fixed_code": "x = 1\n", "error_count": 3}]
+COMPLEXITY_RESULTS = [{
+    "file": "a.py",
+    "functions": [{"function_name": "f", "complexity": 9, "lines": 20, "start_line": 1, "end_line": 25}],
+    "fragments": [],
+    "total_complexity": 12,
+    "average_complexity": 6.0,
+}]
+ERROR_RESULTS = [
+    {"file": "a.py", "metrics": {"total_issues": 1, "high_priority": 1, "error_score": 3.0},
+     "issues": {"issue_1": {"rows": "4-6", "error": "off by one", "criticality": "high"}}},
+    {"file": "b.cpp", "metrics": {}, "issues": {}},
+]
+
+
+def test_parse_rows():
+    assert parse_rows("34-37") == (34, 37)
+    assert parse_rows("12") == (12, 12)
+    assert parse_rows("n/a") == (None, None)
+
+
+def test_build_tables_joins_results_per_file():
+    tables = build_tables(LINTER_RESULTS, COMPLEXITY_RESULTS, ERROR_RESULTS)
+
+    files = tables["files"]
+    assert files["file"] == ["a.py", "b.cpp"]
+    assert files["language"] == ["py", "cpp"]
+    assert files["lint_errors"] == [3, 0]
+    assert files["total_complexity"] == [12, 0]
+    assert files["error_summary"] == ["off by one", ""]
+    assert tables["functions"]["function_name"] == ["f"]
+    assert tables["issues"]["start_line"] == [4]
+    assert tables["issues"]["end_line"] == [6]
+
+
+def test_tables_roundtrip_through_parquet(tmp_path):
+    pytest.importorskip("pyarrow")
+    write_tables(build_tables(LINTER_RESULTS, COMPLEXITY_RESULTS, ERROR_RESULTS), str(tmp_path))
+
+    table = read_table(table_path(str(tmp_path), "files"), ["file", "lint_errors"])
+
+    assert table.column_names == ["file", "lint_errors"]
+    assert table.to_pydict() == {"file": ["a.py", "b.cpp"], "lint_errors": [3, 0]}
+
+
+def test_remove_tables_leaves_other_files(tmp_path):
+    for name in ("files", "issues"):
+        (tmp_path / f"{name}.parquet").write_bytes(b"stale")
+    (tmp_path / "notes.txt").write_text("keep")
+
+    remove_tables(str(tmp_path))
+    remove_tables(str(tmp_path / "missing"))
+
+    assert [path.name for path in tmp_path.iterdir()] == ["notes.txt"]
@@ -0,0 +1,41 @@
+import os
+
+import pytest
+
+from ai.config import ConfigError, YamlConfig, agents_config, get_model_settings, get_prompt
+
+
+def write(path, text, mtime):
+    path.write_text(text, encoding="utf-8")
+    os.utime(path, ns=(mtime, mtime))
+
+
+def test_packaged_config_is_valid_and_cached():
+    assert "[ISSUE N]" in get_prompt("ErrorSearcher", "user_prompt_template")
+    assert get_model_settings("TaskAllocationAgent").model
+    assert agents_config.get() is agents_config.get()
+
+
+def test_reload_only_when_file_changes(tmp_path):
+    path = tmp_path / "agents.yaml"
+    write(path, "A:\n  prompt: one\n", 1_000_000_000)
+    config = YamlConfig(path, {"A": ("prompt",)})
+
+    first = config.get()
+    assert config.get() is first
+
+    write(path, "A:\n  prompt: two\n", 2_000_000_000)
+    assert config.get()["A"]["prompt"] == "two"
+
+
+def test_invalid_edit_keeps_last_valid_version(tmp_path):
+    path = tmp_path / "agents.yaml"
+    write(path, "A:\n  prompt: one\n", 1_000_000_000)
+    config = YamlConfig(path, {"A": ("prompt",)})
+    config.get()
+
+    write(path, "A:\n  other: x\n", 2_000_000_000)
+    assert config.get()["A"]["prompt"] == "one"
+
+    with pytest.raises(ConfigError):
+        YamlConfig(path, {"A": ("prompt",)}).get()
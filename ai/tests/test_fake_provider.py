@@ -0,0 +1,88 @@
+import re
+
+import pytest
+
+from ai.agents.fake_provider import (
+    FakeBackend,
+    FakeRateLimitError,
+    canned_answer,
+    fake_options,
+    issue_blocks,
+    task_blocks,
+)
+from ai.config import ConfigError, ModelSettings
+from ai.config.loader import _validate_models
+
+
+def test_canned_answers_follow_the_agent_formats():
+    code = "\n".join(f"{i + 1}: line {i}" for i in range(40))
+    issues = issue_blocks(code)
+    assert issues == canned_answer("ErrorSearcher", code)
+    for block in re.split(r"\[ISSUE \d+\]", issues)[1:]:
+        assert all(re.search(rf"{key}:\s*\S", block) for key in ("rows", "error", "criticality", "solution"))
+
+    prompt = 'Please analyze the following error report for file: app/main.py in repository: /r\n"rows": "3-7"'
+    tasks = re.findall(r"\[Task \d+\](.*?)(?=\[Task \d+\]|$)", task_blocks(prompt), re.DOTALL)
+    assert 1 <= len(tasks) <= 3
+    for task in tasks:
+        assert "code_file: app/main.py" in task and "rows: 3-7" in task
+        assert 1.0 <= float(re.search(r"priority: ([\d.]+)", task).group(1)) <= 10.0
+
+    batch = 'Complexity Report for a.py:\n{}\n\nComplexity Report for b.py (part 1/2):\n{}'
+    assert {"code_file: a.py", "code_file: b.py"} <= set(re.findall(r"code_file: \S+", task_blocks(batch)))
+
+    assert canned_answer("ChatGate", "hello") in ("yes", "no")
+
+
+def test_backend_latency_jitter_and_rate_limits_are_reproducible():
+    def run(seed):
+        delays = []
+        backend = FakeBackend("ErrorSearcher", latency=0.5, jitter=0.2, rate_limit=0.3, seed=seed,
+                              sleep=delays.append)
+        outcomes = []
+        for _ in range(50):
+            try:
+                backend.respond("1: x = 1")
+                outcomes.append("ok")
+            except FakeRateLimitError as e:
+                assert e.status_code == 429
+                outcomes.append("429")
+        return backend, delays, outcomes
+
+    backend, delays, outcomes = run(seed=7)
+    assert run(seed=7)[1:] == (delays, outcomes)
+    assert all(0.3 <= delay <= 0.7 for delay in delays)
+    assert backend.calls == 50 and backend.rate_limited == outcomes.count("429") > 0
+
+
+def test_fake_options_from_config_and_environment(monkeypatch):
+    settings = ModelSettings("m", 0.0, provider="fake", fake={"latency": 0.5, "seed": 3})
+    monkeypatch.setenv("GITMETRICS_FAKE_RATE_LIMIT", "0.1")
+    assert fake_options(settings) == {"latency": 0.5, "jitter": 0.0, "rate_limit": 0.1, "seed": 3}
+
+
+def test_provider_settings_are_validated(tmp_path):
+    _validate_models({"A": {"model": "m", "provider": "fake", "fake": {"latency": 1}}}, tmp_path)
+    with pytest.raises(ConfigError):
+        _validate_models({"A": {"model": "m", "provider": "openai"}}, tmp_path)
+    with pytest.raises(ConfigError):
+        _validate_models({"A": {"model": "m", "fake": {"delay": 1}}}, tmp_path)
+
+
+def test_get_llm_with_the_fake_provider(monkeypatch):
+    pytest.importorskip("langchain_core")
+    from ai.agents.provider import get_llm
+    from ai.instrumentation import recording
+
+    monkeypatch.setenv("GITMETRICS_LLM_PROVIDER", "fake")
+    get_llm.cache_clear()
+    try:
+        llm = get_llm("ErrorSearcher")
+        with recording() as recorder:
+            answer = llm.invoke("1: import os\n2: print(os)")
+    finally:
+        get_llm.cache_clear()
+
+    assert answer.content == issue_blocks("1: import os\n2: print(os)")
+    assert llm.bind_tools([]) is llm
+    assert recorder.snapshot()["llm"]["ErrorSearcher"]["calls"] == 1
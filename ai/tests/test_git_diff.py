@@ -0,0 +1,149 @@
+import subprocess
+
+from ai.tools.delta import compare_counted, number_hunk_windows, touches_ranges
+from ai.tools.git_diff import (
+    ChangedFile,
+    changed_files,
+    changed_hunks,
+    expand_ranges,
+    merge_base,
+    parse_name_status,
+    parse_unified_hunks,
+    resolve_commit,
+    show_file,
+    unquote_path,
+)
+
+DIFF = """diff --git a/a.py b/a.py
+index 1..2 100644
+--- a/a.py
++++ b/a.py
+@@ -3 +3,2 @@ def f():
+-    return 1
++    x = 2
++    return x
+@@ -10,2 +11,0 @@ def g():
+-    pass
+-    pass
+diff --git a/new.cpp b/new.cpp
+new file mode 100644
+--- /dev/null
++++ b/new.cpp
+@@ -0,0 +1,4 @@
++int main() {
+"""
+
+
+def test_parse_name_status_with_rename():
+    output = "M\ta.py\nA\tnew.cpp\nD\told.py\nR087\tsrc/x.py\tsrc/y.py\n"
+
+    assert parse_name_status(output) == [
+        ChangedFile("M", "a.py", "a.py"),
+        ChangedFile("A", None, "new.cpp"),
+        ChangedFile("D", "old.py", None),
+        ChangedFile("R", "src/x.py", "src/y.py"),
+    ]
+
+
+def test_parse_unified_hunks_both_sides():
+    hunks = parse_unified_hunks(DIFF)
+
+    assert hunks["a.py"].old == [(3, 3), (10, 11)]
+    assert hunks["a.py"].new == [(3, 4), (11, 11)]
+    assert hunks["new.cpp"].old == []
+    assert hunks["new.cpp"].new == [(1, 4)]
+
+
+def test_expand_ranges_merges_and_clamps():
+    assert expand_ranges([(3, 4), (9, 9), (30, 31)], context=2, max_line=32) == [(1, 11), (28, 32)]
+
+
+def test_changed_files_and_hunks_in_real_repo(tmp_path):
+    def git(*args):
+        subprocess.run(["git", "-C", str(tmp_path), *args], check=True, capture_output=True)
+
+    git("init", "-q", "-b", "main")
+    git("config", "user.email", "t@example.com")
+    git("config", "user.name", "t")
+    (tmp_path / "a.py").write_text("a = 1\nb = 2\nc = 3\n")
+    git("add", ".")
+    git("commit", "-q", "-m", "base")
+    git("checkout", "-q", "-b", "feature")
+    (tmp_path / "a.py").write_text("a = 1\nb = 20\nc = 3\n")
+    git("commit", "-q", "-am", "head")
+
+    assert changed_files(str(tmp_path), "main", "feature") == [ChangedFile("M", "a.py", "a.py")]
+    assert changed_hunks(str(tmp_path), "main", "feature")["a.py"].new == [(2, 2)]
+
+
+def test_unusual_file_names(tmp_path):
+    def git(*args):
+        subprocess.run(["git", "-C", str(tmp_path), "-c", "core.quotepath=on", *args], check=True, capture_output=True)
+
+    names = ["модуль.py", "with space.py", 'tab\tand "quote".py']
+    git("init", "-q", "-b", "main")
+    git("config", "user.email", "t@example.com")
+    git("config", "user.name", "t")
+    for name in names:
+        (tmp_path / name).write_text("a = 1\n")
+    git("add", ".")
+    git("commit", "-q", "-m", "base")
+    git("checkout", "-q", "-b", "feature")
+    for name in names:
+        (tmp_path / name).write_text("a = 1\nb = 2\n")
+    git("commit", "-q", "-am", "head")
+
+    assert sorted(f.new_path for f in changed_files(str(tmp_path), "main", "feature")) == sorted(names)
+    hunks = changed_hunks(str(tmp_path), "main", "feature")
+    assert sorted(hunks) == sorted(names) and all(hunks[name].new == [(2, 2)] for name in names)
+    assert show_file(str(tmp_path), "feature", "модуль.py") == "a = 1\nb = 2\n"
+    assert unquote_path('"\\320\\274.py"') == "м.py" and unquote_path("plain.py") == "plain.py"
+
+
+def test_fork_point_of_a_partial_clone(tmp_path):
+    origin, clone = tmp_path / "origin", tmp_path / "clone"
+    origin.mkdir()
+
+    def git(*args, cwd=origin):
+        subprocess.run(["git", "-C", str(cwd), "-c", "user.email=t@example.com", "-c", "user.name=t", *args],
+                       check=True, capture_output=True)
+
+    git("init", "-q", "-b", "main")
+    (origin / "a.py").write_text("a = 1\n")
+    git("add", ".")
+    git("commit", "-q", "-m", "base")
+    git("checkout", "-q", "-b", "feature")
+    (origin / "b.py").write_text("b = 1\n")
+    git("add", ".")
+    git("commit", "-q", "-m", "feature")
+    # main ушел вперед после ответвления: эти изменения не относятся к feature
+    git("checkout", "-q", "main")
+    (origin / "a.py").write_text("a = 2\n")
+    git("commit", "-q", "-am", "main moved on")
+    subprocess.run(["git", "clone", "-q", "--filter=blob:none", "--no-checkout", f"file://{origin}", str(clone)],
+                   check=True, capture_output=True)
+
+    head = resolve_commit(str(clone), "feature")
+    fork_point = merge_base(str(clone), resolve_commit(str(clone), "main"), head)
+
+    assert changed_files(str(clone), fork_point, head) == [ChangedFile("A", None, "b.py")]
+    assert show_file(str(clone), fork_point, "a.py") == "a = 1\n"
+
+
+def test_compare_counted_splits_new_fixed_persisting():
+    base = [(1, "C0114", "doc"), (5, "W0612", "unused"), (6, "W0612", "unused")]
+    head = [(1, "C0114", "doc"), (8, "W0612", "unused"), (9, "E0602", "undefined")]
+
+    new, fixed, persisting = compare_counted(base, head, key=lambda m: (m[1], m[2]))
+
+    assert new == [(9, "E0602", "undefined")]
+    assert fixed == [(6, "W0612", "unused")]
+    assert persisting == [(1, "C0114", "doc"), (8, "W0612", "unused")]
+
+
+def test_hunk_windows_keep_original_numbers():
+    code = [f"line{i}\n" for i in range(1, 11)]
+
+    assert number_hunk_windows(code, [(2, 3), (8, 8)]) == "2: line2\n3: line3\n...\n8: line8"
+    assert touches_ranges("3-5", [(5, 6)])
+    assert not touches_ranges("1", [(5, 6)])
@@ -0,0 +1,44 @@
+"""
+Cold-import budget of the app entry points.
+
+Each module is imported in a fresh interpreter, so the test needs the full
+dependency set and is skipped otherwise. The budget can be adjusted for slow
+machines with GITMETRICS_IMPORT_BUDGET (seconds).
+"""
+import os
+
+import pytest
+
+from ai.startup_profile import package_totals, profile_import
+
+IMPORT_BUDGET_SECONDS = float(os.getenv("GITMETRICS_IMPORT_BUDGET", "2.0"))
+
+# Эти пакеты должны загружаться только при первом анализе или поиске
+DEFERRED_PACKAGES = ("torch", "chromadb", "transformers", "sentence_transformers", "pylint", "black")
+
+ENTRY_POINTS = [
+    "ai.graphs.code_analyse",
+    "ui.pages.add_repository",
+    "ui.pages.chat",
+    "ui.pages.custom",
+    "ui.pages.metrics",
+    "ui.pages.complexity",
+    "ui.pages.mistakes",
+    "ui.pages.code_smells",
+    "ui.pages.problem_mistakes",
+]
+
+
+@pytest.mark.parametrize("module", ENTRY_POINTS)
+def test_cold_import_within_budget(module):
+    pytest.importorskip("langgraph")
+    pytest.importorskip("langchain_groq")
+    if module.startswith("ui."):
+        pytest.importorskip("streamlit")
+
+    profile = profile_import(module)
+
+    assert profile.error is None, profile.error
+    deferred = set(DEFERRED_PACKAGES) & set(package_totals(profile.records))
+    assert not deferred, f"{module} imports {sorted(deferred)} eagerly"
+    assert profile.cumulative_us / 1e6 <= IMPORT_BUDGET_SECONDS
@@ -0,0 +1,131 @@
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from types import SimpleNamespace
+
+import pytest
+
+from ai.instrumentation import (
+    SLOWEST_FILES,
+    JsonSink,
+    PrometheusSink,
+    Recorder,
+    get_recorder,
+    incr,
+    record_span,
+    recording,
+    register_cache,
+    span,
+    timed_node,
+    token_usage,
+    write_report,
+)
+from ai.tools.retrieval_cache import LRUCache
+
+
+def test_spans_and_counters_go_to_the_current_recorder():
+    with recording() as recorder:
+        with span("clone"):
+            pass
+        with span("clone"):
+            pass
+        incr("lint.failed_files")
+        incr("lint.failed_files", 2)
+    outside = get_recorder()
+
+    snapshot = recorder.snapshot()
+    assert snapshot["spans"]["clone"]["count"] == 2
+    assert snapshot["counters"] == {"lint.failed_files": 3}
+    assert outside is not recorder
+
+
+def test_only_the_slowest_files_are_kept():
+    recorder = Recorder()
+    for i in range(SLOWEST_FILES + 5):
+        recorder.record_span("lint.file", float(i), f"f{i}.py")
+
+    slowest = recorder.snapshot()["slowest_files"]["lint.file"]
+    assert len(slowest) == SLOWEST_FILES
+    assert slowest[0] == {"file": f"f{SLOWEST_FILES + 4}.py", "seconds": SLOWEST_FILES + 4}
+    assert recorder.snapshot()["spans"]["lint.file"]["count"] == SLOWEST_FILES + 5
+
+
+def test_timed_node_keeps_the_signature_and_records_in_worker_threads():
+    def process_task(state, config):
+        record_span("task.file", 0.5, "a.py")
+        return {"seen": config}
+
+    node = timed_node(process_task)
+    assert node.__name__ == "process_task"
+
+    with recording() as recorder, ThreadPoolExecutor(max_workers=1) as pool:
+        # LangGraph runs nodes in a copy of the caller's context, like here
+        result = pool.submit(copy_context().run, node, {}, config={"k": 1}).result()
+
+    assert result == {"seen": {"k": 1}}
+    snapshot = recorder.snapshot()
+    assert snapshot["spans"]["node.process_task"]["count"] == 1
+    assert snapshot["slowest_files"]["task.file"] == [{"file": "a.py", "seconds": 0.5}]
+
+
+def test_llm_calls_and_cache_hits_per_run():
+    cache = LRUCache()
+    register_cache("test_cache", cache)
+    cache.get("missing")
+
+    with recording() as recorder:
+        cache.put("key", 1)
+        cache.get("key")
+        recorder.record_llm_call("ErrorSearcher", 1.5, tokens_in=100, tokens_out=20)
+        recorder.record_llm_call("ErrorSearcher", 0.5, error=True)
+        recorder.record_llm_retry("ErrorSearcher")
+
+    snapshot = recorder.snapshot()
+    assert snapshot["caches"]["test_cache"] == {"hits": 1, "misses": 0}
+    llm = snapshot["llm"]["ErrorSearcher"]
+    assert (llm["calls"], llm["errors"], llm["retries"]) == (2, 1, 1)
+    assert (llm["tokens_in"], llm["tokens_out"], llm["total_seconds"]) == (100, 20, 2.0)
+
+
+def test_token_usage_from_llm_output_or_message_metadata():
+    groq = SimpleNamespace(llm_output={"token_usage": {"prompt_tokens": 12, "completion_tokens": 3}},
+                           generations=[])
+    assert token_usage(groq) == (12, 3)
+
+    message = SimpleNamespace(usage_metadata={"input_tokens": 7, "output_tokens": 2})
+    streamed = SimpleNamespace(llm_output=None, generations=[[SimpleNamespace(message=message)]])
+    assert token_usage(streamed) == (7, 2)
+    assert token_usage(SimpleNamespace()) == (0, 0)
+
+
+def test_json_sink_and_failing_sinks(tmp_path, caplog):
+    recorder = Recorder()
+    recorder.record_span("vector_store", 2.0)
+
+    class BrokenSink:
+        def write(self, snapshot):
+            raise OSError("disk full")
+
+    path = tmp_path / "run_report.json"
+    with caplog.at_level(logging.WARNING):
+        write_report([BrokenSink(), JsonSink(str(path), extra={"status": "done"})], recorder)
+
+    report = json.loads(path.read_text(encoding="utf-8"))
+    assert report["status"] == "done"
+    assert report["spans"]["vector_store"]["total_seconds"] == 2.0
+    assert "BrokenSink" in caplog.text
+
+
+def test_prometheus_text(tmp_path):
+    pytest.importorskip("prometheus_client")
+    recorder = Recorder()
+    recorder.record_span("node.clone_repo", 1.25)
+    recorder.record_llm_call("ChatGate", 0.1, tokens_in=5)
+
+    path = tmp_path / "run_metrics.prom"
+    PrometheusSink(str(path), labels={"repo": "demo"}).write(recorder.snapshot())
+
+    text = path.read_text(encoding="utf-8")
+    assert 'gitmetrics_span_seconds_total{repo="demo",span="node.clone_repo"} 1.25' in text
+    assert 'gitmetrics_llm{repo="demo",model="ChatGate",stat="tokens_in"} 5.0' in text
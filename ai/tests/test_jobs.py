@@ -0,0 +1,125 @@
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from ai.jobs import DONE, FAILED, LEASE_SECONDS, QUEUED, RUNNING, JobRunner, JobStore, ProgressWriter
+from ai.progress import report_progress, set_progress_sink
+
+
+def test_submit_deduplicates_active_jobs_per_repo(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite"))
+
+    first = store.submit("https://github.com/a/repo")
+    assert store.submit("https://github.com/a/repo.git") == first
+    other = store.submit("https://github.com/b/other")
+    assert other != first
+
+    claimed = store.claim_next()
+    assert claimed["id"] == first and claimed["status"] == RUNNING
+    store.finish(first, ok=True, message="ok")
+
+    assert store.get(first)["status"] == DONE
+    assert store.submit("https://github.com/a/repo") != first
+    assert store.get(other)["status"] == QUEUED
+
+
+def test_only_jobs_with_an_expired_lease_are_requeued(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite"))
+    job_id = store.submit("https://github.com/a/repo")
+    store.claim_next("runner-a")
+
+    # Раннер жив (аренда свежая): другой раннер или сессия не перезапускает задачу
+    assert store.requeue_interrupted() == 0
+    assert store.get(job_id)["status"] == RUNNING
+
+    later = time.time() + LEASE_SECONDS / 2
+    store.heartbeat("runner-a")
+    assert store.requeue_interrupted(now=later) == 0
+
+    assert store.requeue_interrupted(now=time.time() + LEASE_SECONDS + 1) == 1
+    job = store.get(job_id)
+    assert job["status"] == QUEUED and job["runner_id"] is None
+
+
+def test_progress_counters_reach_the_job_record(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite"))
+    job_id = store.submit("https://github.com/a/repo")
+    writer = ProgressWriter(store, job_id, flush_seconds=60)
+
+    set_progress_sink(writer)
+    try:
+        report_progress("files_total", 10, total=True)
+        report_progress("files_linted")
+        report_progress("files_linted")
+    finally:
+        set_progress_sink(None)
+    writer.flush()
+
+    assert store.get(job_id)["progress"] == {"files_total": 10, "files_linted": 2}
+    # Без приемника вызовы ничего не делают
+    report_progress("files_linted")
+
+
+def test_runner_executes_queued_jobs(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite"))
+    ok_job = store.submit("https://github.com/a/good")
+    bad_job = store.submit("https://github.com/b/bad")
+
+    def execute(job, db_path, storage):
+        if job["repo_key"] == "bad":
+            raise RuntimeError("boom")
+        JobStore(db_path).finish(job["id"], ok=True)
+
+    runner = JobRunner(store, workers=2, executor=ThreadPoolExecutor(2), execute=execute,
+                       poll_seconds=0.01).start()
+    try:
+        deadline = time.time() + 5
+        while time.time() < deadline and {store.get(ok_job)["status"], store.get(bad_job)["status"]} & {QUEUED, RUNNING}:
+            time.sleep(0.01)
+    finally:
+        runner.stop()
+
+    assert store.get(ok_job)["status"] == DONE
+    assert store.get(bad_job)["status"] == FAILED
+    assert store.get(bad_job)["error"] == "boom"
+
+
+class CrashedPool:
+    """Process pool after a worker crash: the running job fails, every later submit is refused"""
+
+    def __init__(self):
+        self.submitted = 0
+
+    def submit(self, *args):
+        self.submitted += 1
+        if self.submitted > 1:
+            raise BrokenProcessPool("A child process terminated abruptly")
+        future = Future()
+        future.set_exception(BrokenProcessPool("A child process terminated abruptly"))
+        return future
+
+    def shutdown(self, wait=True):
+        pass
+
+
+def test_runner_replaces_a_broken_pool(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite"))
+    crashed = store.submit("https://github.com/a/crash")
+    later = store.submit("https://github.com/b/later")
+    pools = [CrashedPool(), ThreadPoolExecutor(1)]
+
+    def execute(job, db_path, storage):
+        JobStore(db_path).finish(job["id"], ok=True)
+
+    runner = JobRunner(store, workers=1, executor_factory=lambda: pools.pop(0), execute=execute,
+                       poll_seconds=0.01).start()
+    try:
+        deadline = time.time() + 5
+        while time.time() < deadline and store.get(later)["status"] != DONE:
+            time.sleep(0.01)
+    finally:
+        runner.stop()
+
+    assert store.get(crashed)["status"] == FAILED
+    assert "terminated abruptly" in store.get(crashed)["error"]
+    assert store.get(later)["status"] == DONE
@@ -0,0 +1,34 @@
+from ai.tools.lexical_index import RRF_K, LexicalIndex, reciprocal_rank_fusion, tokenize
+
+
+def test_tokenize_splits_identifiers():
+    terms = tokenize("class _CppLintState: process_all_files_lint()")
+
+    assert "cpplintstate" in terms
+    assert {"cpp", "lint", "state"} <= set(terms)
+    assert "process_all_files_lint" in terms
+    assert {"process", "files"} <= set(terms)
+
+
+def test_exact_identifier_ranks_first(tmp_path):
+    index = LexicalIndex()
+    index.add("def process_all_files_errors(state): ...", {"source": "a.py"})
+    index.add("def process_all_files_lint(state): ...", {"source": "b.py"})
+    index.add("lint results are saved to json", {"source": "c.md"})
+    index.save(str(tmp_path))
+
+    hits = LexicalIndex.load(str(tmp_path)).search("process_all_files_lint", k=3)
+
+    assert hits[0][0]["metadata"]["source"] == "b.py"
+
+
+def test_missing_index_loads_empty(tmp_path):
+    assert LexicalIndex.load(str(tmp_path)).search("anything") == []
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "d"]])
+
+    assert [key for key, _ in fused][:1] == ["b"]
+    # Первое место во всех ранжированиях - максимальный балл, которым rag_tool нормирует результаты
+    assert reciprocal_rank_fusion([["a"], ["a"]]) == [("a", 2 / (RRF_K + 1))]
@@ -0,0 +1,44 @@
+from ai.storage.metrics_store import MetricsStore, parse_lint_messages
+
+PYLINT_LOGS = """************* Module a
+/tmp/x/a.py:1:0: C0114: Missing module docstring (missing-module-docstring)
+/tmp/x/a.py:7:4: W0612: Unused variable 'y' (unused-variable)
+"""
+CPPLINT_LOGS = "/tmp/x/b.cpp:3:  Missing space before {  [whitespace/braces] [5]\n"
+
+
+def results(complexity, issues):
+    linters = [{"file": "a.py", "logs": PYLINT_LOGS, "fixed_code": "", "error_count": 2}]
+    complexity_results = [{"file": "a.py", "functions": [], "total_complexity": complexity,
+                           "average_complexity": complexity / 2}]
+    errors = [{"file": "a.py", "metrics": {"total_issues": issues}, "issues": {}}]
+    return linters, complexity_results, errors
+
+
+def test_parse_lint_messages_reads_pylint_and_cpplint():
+    assert parse_lint_messages(PYLINT_LOGS) == [
+        (1, "C0114", "Missing module docstring (missing-module-docstring)"),
+        (7, "W0612", "Unused variable 'y' (unused-variable)"),
+    ]
+    assert parse_lint_messages(CPPLINT_LOGS) == [(3, "whitespace/braces", "Missing space before {")]
+
+
+def test_history_and_diff_between_runs(tmp_path):
+    store = MetricsStore(str(tmp_path / "metrics.sqlite"))
+    first = store.record_run("repo", "main", "aaa", *results(10, 1), created_at=1.0)
+    linters, complexity, errors = results(14, 1)
+    complexity.append({"file": "b.py", "functions": [], "total_complexity": 3, "average_complexity": 3})
+    second = store.record_run("repo", "main", "bbb", linters, complexity, errors, created_at=2.0)
+    store.record_run("other", "main", "ccc", *results(1, 0), created_at=3.0)
+
+    history = store.history("repo")
+    assert [run["commit_sha"] for run in history] == ["aaa", "bbb"]
+    assert history[0]["lint_errors"] == 2
+    assert store.latest_runs("repo") == [second, first]
+
+    diff = {row["file"]: row for row in store.diff_runs(first, second)}
+    assert diff["a.py"]["status"] == "changed"
+    assert (diff["a.py"]["base_total_complexity"], diff["a.py"]["head_total_complexity"]) == (10, 14)
+    assert diff["b.py"]["status"] == "added"
+
+    assert [row["total_complexity"] for row in store.file_history("repo", "a.py")] == [10, 14]
@@ -0,0 +1,94 @@
+import os
+import subprocess
+
+from ai.tools.blame import BlameService, CommitInfo
+from ai.tools.ownership import (
+    OwnershipIndex,
+    codeowners_for,
+    format_owners,
+    get_ownership_index,
+    is_code_owner,
+    ownership_cache,
+    parse_codeowners,
+)
+
+CODEOWNERS = """
+# default owners
+*           @core
+*.js        @frontend
+/build/     ops@example.com
+docs/*      @writers
+apps/       @apps @org/team
+"""
+
+
+def test_codeowners_last_matching_rule_wins():
+    rules = parse_codeowners(CODEOWNERS)
+
+    assert codeowners_for(rules, "main.py") == ["@core"]
+    assert codeowners_for(rules, "web/app.js") == ["@frontend"]
+    assert codeowners_for(rules, "build/out/a.o") == ["ops@example.com"]
+    assert codeowners_for(rules, "docs/readme.md") == ["@writers"]
+    assert codeowners_for(rules, "docs/api/readme.md") == ["@core"]
+    assert codeowners_for(rules, "src/apps/x.py") == ["@apps", "@org/team"]
+
+
+def test_code_owner_matching():
+    info = CommitInfo("Jane Doe", 0, "jdoe@example.com")
+
+    assert is_code_owner(info, ["@jdoe"])
+    assert is_code_owner(info, ["@JaneDoe"])
+    assert is_code_owner(info, ["JDOE@example.com"])
+    assert not is_code_owner(info, ["@org/team", "@someone"])
+
+
+def test_recency_and_codeowners_weighting(tmp_path):
+    def git(*args, name="t", date="2020-01-01T00:00:00"):
+        subprocess.run(["git", "-C", str(tmp_path), "-c", f"user.name={name}", "-c",
+                        f"user.email={name.lower()}@example.com", *args],
+                       check=True, capture_output=True,
+                       env={**os.environ, "GIT_AUTHOR_DATE": date, "GIT_COMMITTER_DATE": date})
+
+    git("init", "-q")
+    (tmp_path / "a.py").write_text("".join(f"old_{i} = {i}\n" for i in range(6)))
+    git("add", ".")
+    git("commit", "-q", "-m", "old", name="Alice", date="2020-01-01T00:00:00")
+    (tmp_path / "a.py").write_text("".join(f"old_{i} = {i}\n" for i in range(6)) + "new_0 = 0\nnew_1 = 1\n")
+    git("commit", "-q", "-am", "new", name="Bob", date="2022-01-01T00:00:00")
+
+    # Два года давности с полураспадом 180 дней: 6 строк Алисы весят меньше 2 строк Боба
+    index = OwnershipIndex(str(tmp_path), blame=BlameService())
+    owners = index.owners("a.py")
+    assert owners[0][0] == "Bob"
+    assert abs(sum(share for _, share in owners) - 1) < 1e-9
+    assert index.owner("a.py", 1, 6) == "Alice"
+    assert index.owner("missing.py") is None
+
+    # Без затухания Алиса — автор большинства строк
+    assert OwnershipIndex(str(tmp_path), half_life_days=1e9, blame=BlameService()).owner("a.py") == "Alice"
+
+    (tmp_path / "CODEOWNERS").write_text("*.py @alice\n")
+    weighted = OwnershipIndex(str(tmp_path), half_life_days=1e9, owner_weight=1.0, blame=BlameService())
+    assert dict(weighted.owners("a.py"))["Alice"] > dict(index.owners("a.py")).get("Alice", 0)
+    assert format_owners(weighted.owners("a.py")).startswith("Alice (")
+
+
+def test_index_of_an_older_head_is_dropped(tmp_path):
+    def git(*args):
+        subprocess.run(["git", "-C", str(tmp_path), "-c", "user.name=t", "-c", "user.email=t@example.com", *args],
+                       check=True, capture_output=True)
+
+    git("init", "-q")
+    (tmp_path / "a.py").write_text("a = 1\n")
+    git("add", ".")
+    git("commit", "-q", "-m", "first")
+    first = get_ownership_index(str(tmp_path))
+    assert get_ownership_index(str(tmp_path)) is first
+
+    (tmp_path / "a.py").write_text("a = 2\n")
+    git("commit", "-q", "-am", "second")
+    second = get_ownership_index(str(tmp_path))
+
+    assert second is not first and second.commit != first.commit
+    assert ownership_cache.get((os.path.abspath(str(tmp_path)), first.commit)) is None
+    assert get_ownership_index(str(tmp_path / "missing")) is None
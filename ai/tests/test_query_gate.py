@@ -0,0 +1,16 @@
+from ai.tools.query_gate import classify
+
+CODE = [[1.0, 0.0, 0.0]]
+NON_CODE = [[0.0, 1.0, 0.0]]
+
+
+def test_confident_decisions_skip_llm():
+    assert classify([0.9, 0.1, 0.0], CODE, NON_CODE, threshold=0.1)[0] is True
+    assert classify([0.1, 0.9, 0.0], CODE, NON_CODE, threshold=0.1)[0] is False
+
+
+def test_ambiguous_message_falls_back():
+    decision, margin = classify([0.5, 0.45, 0.7], CODE, NON_CODE, threshold=0.1)
+
+    assert decision is None
+    assert abs(margin - 0.05) < 1e-9
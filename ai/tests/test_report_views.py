@@ -0,0 +1,41 @@
+from ui.report_views import error_rows, issue_tooltips, problem_files
+
+ERROR_REPORT = {
+    "repository_summary": {"total_issues": 4},
+    "file_reports": {
+        "a.py": {
+            "metrics": {"total_issues": 1, "high_priority": 1},
+            "issues": {"1": {"error": "e1", "rows": "3-4", "criticality": "high"}},
+        },
+        "b.py": {
+            "metrics": {"total_issues": 3},
+            "issues": {str(i): {"error": f"b{i}", "rows": str(i)} for i in range(1, 4)},
+        },
+    },
+}
+
+
+def test_error_rows_sorted_with_short_descriptions():
+    summary = error_rows(ERROR_REPORT)
+
+    assert summary["total"] == 4
+    assert [row["file"] for row in summary["files"]] == ["b.py", "a.py"]
+    assert summary["files"][0]["errors"] == "b1, b2 и еще 1 ошибок"
+
+
+def test_problem_files_for_complexity_skip_files_without_fragments():
+    report = {
+        "src/x.py": {"fragments": [{}, {}], "total_complexity": 9},
+        "src/y.py": {"fragments": [], "total_complexity": 30},
+    }
+
+    assert problem_files(report, "Сложность кода") == [
+        {"file_name": "x.py", "file_path": "src/x.py", "issues": 2, "complexity": 9}
+    ]
+
+
+def test_issue_tooltips_cover_row_ranges():
+    tooltips = issue_tooltips(ERROR_REPORT, "Ошибки", "a.py")
+
+    assert sorted(tooltips) == [3, 4]
+    assert tooltips[3] == {"text": "e1", "solution": "", "criticality": "high"}
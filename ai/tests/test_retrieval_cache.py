@@ -0,0 +1,37 @@
+from ai.tools.retrieval_cache import (
+    LRUCache,
+    bump_index_version,
+    get_index_version,
+    search_key,
+    search_result_cache,
+)
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+def test_rephrased_query_shares_key(tmp_path):
+    path = str(tmp_path)
+    assert search_key(path + "/", "  Where is \n MAIN? ", 20) == search_key(path, "Where is MAIN?", 20)
+    assert search_key(path, "Where is MAIN?", 20) != search_key(path, "where is main?", 20)
+
+
+def test_rebuild_invalidates_results(tmp_path):
+    path = str(tmp_path)
+    key = search_key(path, "query", 20)
+    search_result_cache.put(key, ["old"])
+
+    version = bump_index_version(path)
+
+    assert get_index_version(path) == version
+    assert search_result_cache.get(key) is None
+    assert search_key(path, "query", 20) != key
@@ -0,0 +1,94 @@
+from dataclasses import dataclass
+
+import pytest
+
+from ai.agents import routing
+from ai.agents.routing import ScreenVerdict, needs_large_model, parse_verdict, screen, tier_for
+from ai.config import ConfigError
+from ai.config.loader import _validate_models
+from ai.instrumentation import recording, route
+
+
+@dataclass
+class Answer:
+    content: str
+
+
+class ScriptedModel:
+    def __init__(self, answer):
+        self.answer = answer
+        self.prompts = []
+
+    def invoke(self, prompt):
+        self.prompts.append(prompt)
+        if isinstance(self.answer, Exception):
+            raise self.answer
+        return Answer(self.answer)
+
+
+def test_parse_verdict():
+    assert parse_verdict('```json\n{"has_issues": false, "confidence": 0.9}\n```') == ScreenVerdict(False, 0.9)
+    assert parse_verdict('{"has_issues": true, "confidence": 3}') == ScreenVerdict(True, 1.0)
+    assert parse_verdict('{"has_issues": "no", "confidence": 0.9}') is None
+    assert parse_verdict("Проблем не найдено") is None
+
+
+def test_escalation_rules(monkeypatch):
+    monkeypatch.delenv("GITMETRICS_ROUTING", raising=False)
+    with recording() as recorder:
+        assert not needs_large_model("ErrorSearcher", ScreenVerdict(False, 0.9))
+        assert needs_large_model("ErrorSearcher", ScreenVerdict(False, 0.5))
+        assert needs_large_model("ErrorSearcher", ScreenVerdict(True, 0.99))
+        assert needs_large_model("ErrorSearcher", None)
+
+    counters = recorder.snapshot()["counters"]
+    assert counters["routing.ErrorSearcher.escalated"] == 2
+    assert counters["routing.ErrorSearcher.resolved_small"] == 1
+
+
+def test_complexity_fragments_are_screened_and_escalated(monkeypatch):
+    monkeypatch.delenv("GITMETRICS_ROUTING", raising=False)
+    clean = ScriptedModel('{"has_issues": false, "confidence": 0.9}')
+    monkeypatch.setattr(routing, "get_llm", lambda entry: clean)
+    assert tier_for("ComplexityAnalyzer", "medium", "def f(): ...") == ("ComplexityAnalyzerSmall", "small")
+    # Высокая критичность идет к большой модели без проверки
+    assert tier_for("ComplexityAnalyzer", "high", "def g(): ...") == ("ComplexityAnalyzer", "large")
+    assert clean.prompts == ["def f(): ..."]
+
+    for answer in ('{"has_issues": true, "confidence": 0.9}', '{"has_issues": false, "confidence": 0.4}',
+                   "не знаю", RuntimeError("429")):
+        monkeypatch.setattr(routing, "get_llm", lambda entry, answer=answer: ScriptedModel(answer))
+        assert tier_for("ComplexityAnalyzer", "medium", "def f(): ...") == ("ComplexityAnalyzer", "large")
+
+    monkeypatch.setenv("GITMETRICS_ROUTING", "off")
+    assert tier_for("ComplexityAnalyzer", "medium", "def f(): ...") == ("ComplexityAnalyzer", "large")
+
+
+def test_screen_records_the_small_tier(monkeypatch):
+    monkeypatch.delenv("GITMETRICS_ROUTING", raising=False)
+    model = ScriptedModel('{"has_issues": false, "confidence": 0.95}')
+    monkeypatch.setattr(routing, "get_llm", lambda entry: model)
+
+    with recording() as recorder:
+        assert screen("ErrorSearcher", "1: x = 1") == ScreenVerdict(False, 0.95)
+        with route("ErrorSearcher", "large"):
+            pass
+        monkeypatch.setattr(routing, "get_llm", lambda entry: ScriptedModel(RuntimeError("429")))
+        assert screen("ErrorSearcher", "1: x = 1") is None
+        # Без маршрутизации малая модель не вызывается
+        assert screen("ChatAgent", "hello") is None
+
+    snapshot = recorder.snapshot()
+    assert model.prompts == ["1: x = 1"]
+    assert snapshot["routing"]["ErrorSearcher"]["small"]["calls"] == 2
+    assert snapshot["routing"]["ErrorSearcher"]["large"]["calls"] == 1
+    assert snapshot["counters"]["routing.ErrorSearcher.screen_failed"] == 1
+
+
+def test_routing_settings_are_validated(tmp_path):
+    _validate_models({"A": {"model": "m", "routing": {"small": "B", "min_confidence": 0.6}},
+                      "B": {"model": "s"}}, tmp_path)
+    with pytest.raises(ConfigError):
+        _validate_models({"A": {"model": "m", "routing": {"small": "missing"}}}, tmp_path)
+    with pytest.raises(ConfigError):
+        _validate_models({"A": {"model": "m", "routing": {"threshold": 0.5}}}, tmp_path)
@@ -0,0 +1,42 @@
+from ai.tools.snippets import merge_adjacent, render_snippets
+
+
+def hit(source, start, text, score):
+    return {
+        "source": source,
+        "start_line": start,
+        "end_line": start + text.count("\n"),
+        "score": score,
+        "text": text,
+    }
+
+
+def test_overlapping_chunks_are_merged_without_duplicate_lines():
+    snippets = merge_adjacent([
+        hit("a.py", 3, "line3\nline4", 0.4),
+        hit("a.py", 1, "line1\nline2\nline3", 0.9),
+        hit("b.py", 10, "other", 0.5),
+    ])
+
+    assert snippets[0] == {
+        "source": "a.py", "start_line": 1, "end_line": 4, "score": 0.9,
+        "text": "line1\nline2\nline3\nline4",
+    }
+    assert snippets[1]["source"] == "b.py"
+
+
+def test_distant_chunks_stay_separate():
+    snippets = merge_adjacent([hit("a.py", 1, "a", 0.2), hit("a.py", 50, "b", 0.3)])
+
+    assert [(s["start_line"], s["end_line"]) for s in snippets] == [(50, 50), (1, 1)]
+
+
+def test_render_respects_token_budget():
+    snippets = [hit("a.py", 1, "x = 1\n" * 200, 0.9), hit("b.py", 1, "y = 2", 0.5)]
+
+    rendered = render_snippets(snippets, token_budget=100)
+
+    assert rendered.startswith("a.py:1-201 (score 0.90)")
+    assert rendered.rstrip().endswith("...\n```")
+    assert "b.py" not in rendered
+    assert len(rendered) <= 100 * 4
@@ -0,0 +1,30 @@
+from ai.startup_profile import ImportProfile, package_totals, parse_importtime
+
+OUTPUT = """\
+import time: self [us] | cumulative | imported package
+import time:       231 |        231 |       _json
+import time:       490 |        721 |     json.scanner
+import time:       452 |       1173 |   json.decoder
+import time:       247 |       1420 | json
+Traceback (most recent call last):
+ModuleNotFoundError: No module named 'torch'
+"""
+
+
+def test_parse_importtime_reads_times_and_depth():
+    records = parse_importtime(OUTPUT)
+
+    assert [(r.module, r.self_us, r.cumulative_us, r.depth) for r in records] == [
+        ("_json", 231, 231, 3),
+        ("json.scanner", 490, 721, 2),
+        ("json.decoder", 452, 1173, 1),
+        ("json", 247, 1420, 0),
+    ]
+
+
+def test_package_totals_and_entry_point_cumulative():
+    records = parse_importtime(OUTPUT)
+    profile = ImportProfile("json", 0.1, records)
+
+    assert package_totals(records) == {"json": 1189, "_json": 231}
+    assert profile.cumulative_us == 1420
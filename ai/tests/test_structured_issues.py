@@ -0,0 +1,116 @@
+import json
+from dataclasses import dataclass
+
+import pytest
+
+from ai.tools.structured_issues import IssueStreamParser, describe_invalid, split_valid, validate_issue
+
+GOOD = {"rows": "3-5", "error": "Деление на ноль в {x / y}", "criticality": "высокий",
+        "solution": "Проверить y:\n```python\nif y: x / y\n```"}
+
+
+def feed_by(parser, text, size):
+    completed = []
+    for start in range(0, len(text), size):
+        completed.extend(parser.feed(text[start:start + size]))
+    return completed
+
+
+def test_items_are_parsed_as_their_objects_close():
+    answer = "```json\n" + json.dumps({"issues": [GOOD, {**GOOD, "rows": "7", "criticality": "low"}]},
+                                       ensure_ascii=False) + "\n```"
+    parser = IssueStreamParser()
+
+    first = feed_by(parser, answer[:answer.index("}, {") + 1], 7)
+    assert [item.issue["rows"] for item in first] == ["3-5"]
+    assert first[0].issue["criticality"] == "high" and "```python" in first[0].issue["solution"]
+
+    rest = feed_by(parser, answer[answer.index("}, {") + 1:], 3)
+    assert parser.done and [item.issue["rows"] for item in rest] == ["7"]
+    assert len(parser.close()) == 2
+
+
+def test_invalid_and_truncated_items_are_reported_for_the_reask():
+    answer = ('{"issues": [' + json.dumps(GOOD) + ', {"rows": "ten", "error": "x", "solution": "y"}, '
+              '{"rows": "1-2" "error": "no comma"}, {"rows": "4-4", "error": "cut')
+    parser = IssueStreamParser()
+    feed_by(parser, answer, 11)
+
+    valid, invalid = split_valid(parser.close())
+
+    assert valid == [validate_issue(GOOD)[0]]
+    assert [item.index for item in invalid] == [1, 2, 3]
+    assert "missing field 'criticality'" in invalid[0].problems
+    assert any(problem.startswith("rows must") for problem in invalid[0].problems)
+    assert invalid[1].problems[0].startswith("not valid JSON")
+    assert invalid[2].problems == ["object is truncated"]
+    assert describe_invalid(invalid).startswith("- item 2: ")
+
+
+def test_text_answers_are_not_mistaken_for_json():
+    parser = IssueStreamParser()
+    feed_by(parser, "[ISSUE 1]\nrows: 1-2\nerror: x\n", 4)
+    assert not parser.found and parser.close() == []
+
+    empty = IssueStreamParser()
+    empty.feed('{"issues": []}')
+    assert empty.found and empty.done and empty.close() == []
+
+
+@dataclass
+class Chunk:
+    content: str
+
+
+class ScriptedSearcher:
+    """Streams prepared answers in small chunks and keeps the prompts it got"""
+
+    def __init__(self, answers):
+        self.answers = list(answers)
+        self.prompts = []
+
+    def stream(self, inputs, stream_mode="messages"):
+        self.prompts.append(inputs["messages"][-1]["content"])
+        answer = self.answers.pop(0)
+        for start in range(0, len(answer), 5):
+            yield Chunk(answer[start:start + 5]), {}
+
+
+def test_only_invalid_issues_are_asked_again(monkeypatch):
+    pytest.importorskip("lizard")
+    pytest.importorskip("langgraph")
+    from ai.graphs import code_analyse
+
+    broken = {"rows": "9-9", "error": "Утечка файла", "solution": "with open(...)"}
+    searcher = ScriptedSearcher([
+        json.dumps({"issues": [GOOD, broken]}, ensure_ascii=False),
+        json.dumps({"issues": [{**broken, "criticality": "medium"}]}, ensure_ascii=False),
+    ])
+    monkeypatch.setattr(code_analyse, "get_error_searcher", lambda: searcher)
+
+    issues, metrics = code_analyse.search_errors("1: x = 1")
+
+    assert len(searcher.prompts) == 2
+    assert "missing field 'criticality'" in searcher.prompts[1] and "Деление" not in searcher.prompts[1]
+    assert [issue["rows"] for issue in issues.values()] == ["3-5", "9-9"]
+    assert metrics["high_priority"] == 1 and metrics["medium_priority"] == 1
+
+
+def test_items_stay_invalid_when_the_reask_has_no_array(monkeypatch):
+    pytest.importorskip("lizard")
+    pytest.importorskip("langgraph")
+    from ai.graphs import code_analyse
+    from ai.instrumentation import recording
+
+    broken = {"rows": "9-9", "error": "Утечка файла", "solution": "with open(...)"}
+    searcher = ScriptedSearcher([
+        json.dumps({"issues": [GOOD, broken]}, ensure_ascii=False),
+        "Исправить элемент не удалось.",
+    ])
+    monkeypatch.setattr(code_analyse, "get_error_searcher", lambda: searcher)
+
+    with recording() as recorder:
+        issues, _ = code_analyse._search_errors_json([{"role": "user", "content": "1: x = 1"}])
+
+    assert [issue["rows"] for issue in issues.values()] == ["3-5"]
+    assert recorder.snapshot()["counters"]["errors.invalid_issues"] == 1
@@ -0,0 +1,50 @@
+from ai.tools.symbol_index import (
+    _cpplint_classes,
+    build_symbol_index,
+    file_outline,
+    find_definitions,
+    find_references,
+)
+
+PYTHON_CODE = '''class Runner:
+    def run(self):
+        return helper()
+
+
+def helper():
+    return 1
+'''
+
+CPP_CODE = '''namespace app {
+class Outer {
+ public:
+  struct Inner {
+    int x;
+  };
+};
+}
+'''
+
+
+def test_python_definitions_references_and_outline(tmp_path):
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "runner.py").write_text(PYTHON_CODE, encoding="utf-8")
+
+    index = build_symbol_index(str(tmp_path), ["pkg/runner.py"])
+
+    assert find_definitions(index, "helper") == [
+        {"file": "pkg/runner.py", "name": "helper", "kind": "function", "start_line": 6, "end_line": 7}
+    ]
+    assert [e["name"] for e in find_definitions(index, "Runner.run")] == ["Runner.run"]
+    assert find_definitions(index, "Other.run") == []
+    assert find_references(index, "helper") == ["pkg/runner.py:3"]
+    assert [s["name"] for s in file_outline(index, "./runner.py")] == ["Runner", "Runner.run", "helper"]
+
+
+def test_cpplint_class_tracking():
+    classes = _cpplint_classes("outer.h", CPP_CODE)
+
+    assert [(c["name"], c["kind"], c["start_line"], c["end_line"]) for c in classes] == [
+        ("Outer", "class", 2, 7),
+        ("Outer::Inner", "struct", 4, 6),
+    ]
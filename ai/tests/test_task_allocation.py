@@ -0,0 +1,44 @@
+import json
+
+import pytest
+
+
+def test_parallel_task_generation_with_the_fake_provider(tmp_path, monkeypatch):
+    pytest.importorskip("langgraph")
+    monkeypatch.setenv("GITMETRICS_LLM_PROVIDER", "fake")
+    from ai.agents.TaskAllocation import get_task_allocation_agent
+    from ai.agents.provider import get_llm
+    from ai.graphs.task_allocation_graph import build_task_allocation_workflow
+    from ai.instrumentation import recording
+
+    get_llm.cache_clear()
+    get_task_allocation_agent.cache_clear()
+    complexity = {f"m{i}.py": {"file_path": f"m{i}.py", "fragments": [{"start_line": 1, "end_line": 5}]}
+                  for i in range(6)}
+    errors = {"repository_summary": {}, "file_reports": {
+        "e.py": {"metrics": {}, "issues": {"issue_1": {"rows": "3-4", "error": "x"}}}}}
+    (tmp_path / "complexity.json").write_text(json.dumps(complexity), encoding="utf-8")
+    (tmp_path / "errors.json").write_text(json.dumps(errors), encoding="utf-8")
+
+    try:
+        with recording() as recorder:
+            build_task_allocation_workflow(max_concurrency=3).invoke({
+                "repo_path": str(tmp_path),
+                "storage_dir": str(tmp_path),
+                "repo_name": "demo",
+                "complexity_report_path": str(tmp_path / "complexity.json"),
+                "error_report_path": str(tmp_path / "errors.json"),
+                "output_tasks_path": str(tmp_path / "tasks.json"),
+            })
+    finally:
+        get_llm.cache_clear()
+        get_task_allocation_agent.cache_clear()
+
+    saved = json.loads((tmp_path / "tasks.json").read_text(encoding="utf-8"))
+    # Шесть мелких файлов сложности - один запрос, файл с ошибками - второй
+    assert recorder.snapshot()["llm"]["TaskAllocationAgent"]["calls"] == 2
+    assert len(saved) >= 7
+    assert {task["code_file"] for task in saved} >= {"e.py", "m0.py", "m5.py"}
+    assert all("_order" not in task for task in saved)
+    priorities = [task["priority"] for task in saved]
+    assert priorities == sorted(priorities, reverse=True)
@@ -0,0 +1,59 @@
+from ai.tools.task_batches import entry_tokens, plan_batches, render_batch, split_entry
+
+
+def complexity_entry(path, fragments=1, description="причина"):
+    return {"file_path": path, "source": "complexity", "complexity_data": {
+        "file_path": path, "total_complexity": 12,
+        "fragments": [{"function_name": f"f{i}", "start_line": i * 10 + 1, "end_line": i * 10 + 9,
+                       "description": description} for i in range(fragments)]}}
+
+
+def error_entry(path, issues=1):
+    return {"file_path": path, "source": "error", "error_data": {
+        "metrics": {"total_issues": issues},
+        "issues": {f"issue_{i + 1}": {"rows": f"{i + 1}-{i + 2}", "error": "x"} for i in range(issues)}}}
+
+
+def test_small_entries_share_a_prompt_per_source():
+    entries = [complexity_entry(f"m{i}.py") for i in range(5)] + [error_entry("e.py"), error_entry("f.py")]
+
+    batches = plan_batches(entries, token_budget=2000, max_entries=4)
+
+    assert [(batch["source"], len(batch["entries"])) for batch in batches] == [
+        ("complexity", 4), ("complexity", 1), ("error", 2)]
+    assert [entry["file_path"] for batch in batches for entry in batch["entries"]] == [
+        entry["file_path"] for entry in entries]
+    assert all(batch["tokens"] <= 2000 for batch in batches)
+
+
+def test_large_entries_are_split_without_losing_fragments():
+    big = complexity_entry("big.py", fragments=30, description="очень длинная причина " * 5)
+    issues = error_entry("errors.py", issues=40)
+
+    parts = split_entry(big, token_budget=400)
+    assert len(parts) > 1
+    assert all(entry_tokens(part) <= 400 for part in parts)
+    assert [f for part in parts for f in part["complexity_data"]["fragments"]] == big["complexity_data"]["fragments"]
+    assert all(part["complexity_data"]["total_complexity"] == 12 for part in parts)
+    assert parts[0]["part"] == f"1/{len(parts)}"
+
+    merged = {}
+    for part in split_entry(issues, token_budget=200):
+        assert part["error_data"]["metrics"] == {"total_issues": 40}
+        merged.update(part["error_data"]["issues"])
+    assert merged == issues["error_data"]["issues"]
+
+
+def test_oversized_single_fragment_gets_its_own_prompt():
+    huge = complexity_entry("huge.py", description="x" * 5000)
+    batches = plan_batches([complexity_entry("a.py"), huge, complexity_entry("b.py")], token_budget=500,
+                           max_entries=8)
+
+    assert [[entry["file_path"] for entry in batch["entries"]] for batch in batches] == [
+        ["a.py"], ["huge.py"], ["b.py"]]
+    assert "x" * 5000 in render_batch(batches[1])
+
+
+def test_prompt_keeps_cyrillic_readable():
+    text = render_batch({"entries": [complexity_entry("a.py")]})
+    assert text.startswith("Complexity Report for a.py:\n") and "причина" in text
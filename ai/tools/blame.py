@@ -0,0 +1,171 @@
+"""
+Batched git blame for the task allocation.
+
+One `git blame --incremental` per (commit, file) is parsed into an interval
+index, cached, and answers any number of line-range queries: authors by
+number of lines, the majority author and the author of the most recent change.
+"""
+import bisect
+import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from ai.instrumentation import register_cache, span
+from ai.tools.git_diff import run_git
+from ai.tools.retrieval_cache import LRUCache
+
+
+class BlameRange(NamedTuple):
+    start: int  # first line in the blamed version, 1-based
+    end: int  # last line, inclusive
+    commit: str
+
+
+class CommitInfo(NamedTuple):
+    author: str
+    author_time: int
+    email: str = ""
+
+
+def parse_incremental_blame(output: str) -> Tuple[List[BlameRange], Dict[str, CommitInfo]]:
+    """
+    Parse `git blame --incremental` output.
+
+    Every group starts with "<sha> <orig line> <final line> <lines>"; commit
+    headers (author, author-time, ...) follow only the first time a commit is
+    seen; the group ends with a "filename" line.
+    """
+    ranges, commits = [], {}
+    current, fields = None, {}
+    for line in output.splitlines():
+        if current is None:
+            parts = line.split()
+            if len(parts) == 4 and len(parts[0]) >= 40:
+                current = (parts[0], int(parts[2]), int(parts[3]))
+                fields = {}
+            continue
+        if line.startswith("filename "):
+            sha, start, count = current
+            if sha not in commits:
+                commits[sha] = CommitInfo(fields.get("author", "Unknown"), int(fields.get("author-time", 0)),
+                                          fields.get("author-mail", "").strip("<>"))
+            ranges.append(BlameRange(start, start + count - 1, sha))
+            current = None
+            continue
+        key, _, value = line.partition(" ")
+        fields[key] = value
+    ranges.sort()
+    return ranges, commits
+
+
+class BlameIndex:
+    """Blame of one file version, queried by line ranges in O(log n + k)"""
+
+    def __init__(self, ranges: List[BlameRange], commits: Dict[str, CommitInfo]):
+        self.ranges = ranges
+        self.commits = commits
+        self._starts = [r.start for r in ranges]
+
+    def overlapping(self, start: int, end: int) -> Iterable[Tuple[BlameRange, int]]:
+        """(range, number of its lines inside [start, end]) for every range touching the query"""
+        index = max(bisect.bisect_right(self._starts, start) - 1, 0)
+        for blame_range in self.ranges[index:]:
+            if blame_range.start > end:
+                break
+            lines = min(end, blame_range.end) - max(start, blame_range.start) + 1
+            if lines > 0:
+                yield blame_range, lines
+
+    def authors(self, start: int, end: int) -> Counter:
+        """Author -> number of lines in [start, end]"""
+        counts = Counter()
+        for blame_range, lines in self.overlapping(start, end):
+            counts[self.commits[blame_range.commit].author] += lines
+        return counts
+
+    def majority_author(self, start: int, end: int) -> Optional[str]:
+        """Author of most lines; a tie goes to the one who changed the range more recently"""
+        latest: Dict[str, int] = {}
+        counts = Counter()
+        for blame_range, lines in self.overlapping(start, end):
+            info = self.commits[blame_range.commit]
+            counts[info.author] += lines
+            latest[info.author] = max(latest.get(info.author, 0), info.author_time)
+        if not counts:
+            return None
+        return max(counts, key=lambda author: (counts[author], latest[author]))
+
+    def last_author(self, start: int, end: int) -> Optional[str]:
+        """Author of the most recent commit touching [start, end]"""
+        infos = [self.commits[blame_range.commit] for blame_range, _ in self.overlapping(start, end)]
+        return max(infos, key=lambda info: info.author_time).author if infos else None
+
+
+class BlameService:
+    """
+    Blame indexes cached by (repo, commit, path). Without an explicit commit a
+    query resolves HEAD (one rev-parse); callers with several queries resolve
+    it once with head() and pass commit=
+    """
+
+    def __init__(self, maxsize: int = 512):
+        self.cache = LRUCache(maxsize=maxsize)
+
+    @staticmethod
+    def head(repo_path: str) -> str:
+        # Один rev-parse на запрос: после нового коммита блейм не устаревает
+        return run_git(os.path.abspath(repo_path), "rev-parse", "HEAD").strip()
+
+    @staticmethod
+    def relative_path(repo_path: str, file_path: str) -> str:
+        """Paths may come relative to the repository or joined with it"""
+        if os.path.isabs(file_path) or file_path.startswith(repo_path):
+            file_path = os.path.relpath(os.path.abspath(file_path), os.path.abspath(repo_path))
+        return file_path.replace(os.sep, "/")
+
+    def index(self, repo_path: str, file_path: str, commit: Optional[str] = None) -> Optional[BlameIndex]:
+        """Blame index of the file, None if git cannot blame it (not tracked, no repository)"""
+        try:
+            commit = commit or self.head(repo_path)
+        except RuntimeError:
+            return None
+        path = self.relative_path(repo_path, file_path)
+        key = (os.path.abspath(repo_path), commit, path)
+
+        def compute():
+            try:
+                with span("blame.file"):
+                    output = run_git(repo_path, "blame", "--incremental", commit, "--", path)
+            except RuntimeError:
+                return None
+            return BlameIndex(*parse_incremental_blame(output))
+
+        return self.cache.get_or_compute(key, compute)
+
+    def prefetch(self, repo_path: str, file_paths: Iterable[str], workers: int = 4) -> None:
+        """Blame many files concurrently before the queries (e.g. every file with tasks)"""
+        paths = list(dict.fromkeys(self.relative_path(repo_path, path) for path in file_paths))
+        try:
+            commit = self.head(repo_path)
+        except RuntimeError:
+            return
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(lambda path: self.index(repo_path, path, commit), paths))
+
+    def majority_author(self, repo_path: str, file_path: str, start: int, end: int,
+                        commit: Optional[str] = None) -> Optional[str]:
+        index = self.index(repo_path, file_path, commit)
+        return index.majority_author(max(start, 1), end) if index else None
+
+    def last_author(self, repo_path: str, file_path: str, start: int, end: int,
+                    commit: Optional[str] = None) -> Optional[str]:
+        index = self.index(repo_path, file_path, commit)
+        return index.last_author(max(start, 1), end) if index else None
+
+    def clear(self) -> None:
+        self.cache.clear()
+
+
+blame_service = BlameService()
+register_cache("blame", blame_service.cache)
@@ -0,0 +1,96 @@
+import json
+import os
+
+from langchain_core.tools import tool
+
+from ai.instrumentation import register_cache
+from ai.tools.retrieval_cache import LRUCache
+from ai.tools.symbol_index import (
+    SYMBOL_INDEX_FILE,
+    file_outline,
+    find_definitions,
+    find_references,
+    load_symbol_index,
+)
+
+# (path, mtime) -> loaded symbol index
+symbol_index_cache = LRUCache(maxsize=16)
+register_cache("symbol_index", symbol_index_cache)
+
+
+def symbol_index_path(vector_db_path: str) -> str:
+    """storage/<repo>/vectore_store/ -> storage/<repo>/symbol_index.json"""
+    return os.path.join(os.path.dirname(os.path.normpath(vector_db_path)), SYMBOL_INDEX_FILE)
+
+
+def get_symbol_index(vector_db_path: str):
+    path = symbol_index_path(vector_db_path)
+    if not os.path.exists(path):
+        return None
+    key = (path, os.stat(path).st_mtime_ns)
+    return symbol_index_cache.get_or_compute(key, lambda: load_symbol_index(path))
+
+
+@tool
+def find_symbol_definition(symbol: str, vector_db_path: str) -> str:
+    """
+    Находит определения функции, класса или метода в репозитории (файл и строки)
+
+    Args:
+        symbol: Имя символа, можно с классом: "helper", "Outer.method", "Outer::method"
+        vector_db_path: Путь к векторной БД
+
+    Returns:
+        Список определений в формате "файл:начало-конец kind name"
+    """
+    index = get_symbol_index(vector_db_path)
+    if index is None:
+        return "Индекс символов не построен для этого репозитория"
+    entries = find_definitions(index, symbol)
+    if not entries:
+        return f"Определение {symbol} не найдено"
+    return "\n".join(
+        f"{e['file']}:{e['start_line']}-{e['end_line']} {e['kind']} {e['name']}" for e in entries
+    )
+
+
+@tool
+def find_symbol_references(symbol: str, vector_db_path: str) -> str:
+    """
+    Находит места использования функции, класса или метода в репозитории
+
+    Args:
+        symbol: Имя символа
+        vector_db_path: Путь к векторной БД
+
+    Returns:
+        Список мест использования в формате "файл:строка"
+    """
+    index = get_symbol_index(vector_db_path)
+    if index is None:
+        return "Индекс символов не построен для этого репозитория"
+    references = find_references(index, symbol)
+    if not references:
+        return f"Использования {symbol} не найдены"
+    return "\n".join(references)
+
+
+@tool
+def get_file_outline(file_path: str, vector_db_path: str) -> str:
+    """
+    Возвращает структуру файла: классы, функции и методы с номерами строк
+
+    Args:
+        file_path: Путь к файлу относительно корня репозитория
+        vector_db_path: Путь к векторной БД
+
+    Returns:
+        Структура файла в формате JSON
+    """
+    index = get_symbol_index(vector_db_path)
+    if index is None:
+        return "Индекс символов не построен для этого репозитория"
+    outline = file_outline(index, file_path)
+    if outline is None:
+        return f"Файл {file_path} не найден в индексе"
+    return json.dumps(outline, ensure_ascii=False)
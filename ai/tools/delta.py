@@ -0,0 +1,63 @@
+"""
+Matching of issues between the base and head versions of changed files.
+
+Pure helpers of the delta (pull request) analysis in ai/graphs/delta_analysis_graph.py.
+"""
+from collections import Counter
+from typing import Dict, List
+
+from ai.storage.columnar import parse_rows
+
+
+def compare_counted(base_items: List[tuple], head_items: List[tuple], key):
+    """
+    Split issues into new / fixed / persisting by `key`, counting duplicates.
+
+    Returns:
+        tuple: (new head items, fixed base items, persisting head items)
+    """
+    base_counts = Counter(key(item) for item in base_items)
+    head_counts = Counter(key(item) for item in head_items)
+    new, fixed, persisting = [], [], []
+    seen_head: Counter = Counter()
+    for item in head_items:
+        item_key = key(item)
+        seen_head[item_key] += 1
+        (persisting if seen_head[item_key] <= base_counts[item_key] else new).append(item)
+    seen_base: Counter = Counter()
+    for item in base_items:
+        item_key = key(item)
+        seen_base[item_key] += 1
+        if seen_base[item_key] > head_counts[item_key]:
+            fixed.append(item)
+    return new, fixed, persisting
+
+
+def number_hunk_windows(code_lines: List[str], windows: List[tuple]) -> str:
+    """Numbered code of the given line windows, separated by '...'"""
+    blocks = []
+    for start, end in windows:
+        blocks.append("\n".join(f"{i}: {code_lines[i - 1].rstrip()}" for i in range(start, end + 1)))
+    return "\n...\n".join(blocks)
+
+
+def touches_ranges(rows: str, ranges: List[tuple]) -> bool:
+    """Whether an issue's rows ("12" or "12-15") overlap any of the ranges; unknown rows count as touching"""
+    start, end = parse_rows(rows)
+    if start is None:
+        return True
+    return any(start <= range_end and end >= range_start for range_start, range_end in ranges)
+
+
+def summarize_delta(lint_delta: Dict, complexity_delta: Dict, error_delta: Dict) -> Dict:
+    def counts(delta):
+        return {name: len(delta.get(name, [])) for name in ("new", "fixed", "persisting")}
+
+    lint, complexity, errors = counts(lint_delta), counts(complexity_delta), counts(error_delta)
+    return {
+        "lint": lint,
+        "complexity": complexity,
+        "errors": errors,
+        "new_total": lint["new"] + complexity["new"] + errors["new"],
+        "fixed_total": lint["fixed"] + complexity["fixed"] + errors["fixed"],
+    }
@@ -0,0 +1,185 @@
+"""
+Changed files and line ranges between two refs, for the delta (pull request) analysis.
+
+Uses the git CLI directly: `--name-status -M` for the file list and `-U0`
+hunks for the exact changed lines of each file, on both sides of the diff.
+Diffs run with core.quotepath=off, so non-ASCII names come out as is; names
+with control characters or quotes are still C-quoted and decoded by
+unquote_path.
+"""
+import re
+import subprocess
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+_HUNK_RE = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+LineRange = Tuple[int, int]
+
+_ESCAPES = {"a": "\a", "b": "\b", "t": "\t", "n": "\n", "v": "\v", "f": "\f", "r": "\r"}
+# Пути как есть, без восьмеричных escape-последовательностей для не-ASCII
+_DIFF_OPTIONS = ("-c", "core.quotepath=off")
+
+
+class ChangedFile(NamedTuple):
+    status: str  # A, M, D or R (rename)
+    old_path: Optional[str]
+    new_path: Optional[str]
+
+
+class FileHunks(NamedTuple):
+    old: List[LineRange]  # changed line ranges in the base version
+    new: List[LineRange]  # changed line ranges in the head version
+
+
+def run_git(repo_path: str, *args: str) -> str:
+    result = subprocess.run(
+        ["git", "-C", repo_path, *args],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        encoding="utf-8",
+        errors="replace",
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"git {' '.join(args)} failed: {result.stderr.strip()}")
+    return result.stdout
+
+
+def diff_spec(base: str, head: str) -> str:
+    # Три точки: изменения head относительно общего предка, как в pull request
+    return f"{base}...{head}"
+
+
+def unquote_path(path: str) -> str:
+    """Path as git printed it; C-quoted names (control characters, quotes, octal bytes) are decoded"""
+    if len(path) < 2 or not (path.startswith('"') and path.endswith('"')):
+        return path
+    body, decoded, i = path[1:-1], bytearray(), 0
+    while i < len(body):
+        char = body[i]
+        if char == "\\" and i + 1 < len(body):
+            escaped = body[i + 1]
+            if escaped in "01234567":
+                # Байты UTF-8 имени в восьмеричном виде
+                decoded.append(int(body[i + 1:i + 4], 8))
+                i += 4
+                continue
+            decoded.extend(_ESCAPES.get(escaped, escaped).encode("utf-8"))
+            i += 2
+            continue
+        decoded.extend(char.encode("utf-8"))
+        i += 1
+    return decoded.decode("utf-8", errors="replace")
+
+
+def parse_name_status(output: str) -> List[ChangedFile]:
+    """Parse `git diff --name-status -M` output"""
+    changed = []
+    for line in output.splitlines():
+        if not line.strip():
+            continue
+        status, *paths = line.split("\t")
+        parts = [status, *map(unquote_path, paths)]
+        status = parts[0][:1]
+        if status == "R" and len(parts) >= 3:
+            changed.append(ChangedFile("R", parts[1], parts[2]))
+        elif status == "A":
+            changed.append(ChangedFile("A", None, parts[1]))
+        elif status == "D":
+            changed.append(ChangedFile("D", parts[1], None))
+        else:
+            changed.append(ChangedFile("M", parts[1], parts[-1]))
+    return changed
+
+
+def _hunk_range(start: int, count: Optional[str]) -> Optional[LineRange]:
+    length = 1 if count is None else int(count)
+    if length == 0:
+        # Только удаление/вставка на другой стороне: отмечаем соседнюю строку
+        return (max(start, 1), max(start, 1))
+    return (start, start + length - 1)
+
+
+def _header_path(line: str, prefix: str) -> Optional[str]:
+    # Имена с пробелами git завершает табуляцией
+    path = line[4:].rstrip("\t")
+    return None if path == "/dev/null" else unquote_path(path).removeprefix(prefix)
+
+
+def parse_unified_hunks(diff_text: str) -> Dict[str, FileHunks]:
+    """
+    Parse `git diff -U0` output into changed line ranges per file.
+
+    Files are keyed by their head path (base path for deleted files).
+    """
+    hunks: Dict[str, FileHunks] = {}
+    old_path = new_path = None
+    current: Optional[FileHunks] = None
+    for line in diff_text.splitlines():
+        if line.startswith("diff --git "):
+            old_path = new_path = None
+            current = None
+        elif line.startswith("--- "):
+            old_path = _header_path(line, "a/")
+        elif line.startswith("+++ "):
+            new_path = _header_path(line, "b/")
+            current = hunks.setdefault(new_path or old_path, FileHunks([], []))
+        elif current is not None:
+            match = _HUNK_RE.match(line)
+            if not match:
+                continue
+            old_start, old_count, new_start, new_count = match.groups()
+            if old_path is not None:
+                current.old.append(_hunk_range(int(old_start), old_count))
+            if new_path is not None:
+                current.new.append(_hunk_range(int(new_start), new_count))
+    return hunks
+
+
+def expand_ranges(ranges: Sequence[LineRange], context: int, max_line: int) -> List[LineRange]:
+    """Add `context` lines around each range, clamp to the file and merge overlaps"""
+    expanded = sorted((max(1, start - context), min(max_line, end + context)) for start, end in ranges)
+    merged: List[LineRange] = []
+    for start, end in expanded:
+        if start > end:
+            continue
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def changed_files(repo_path: str, base: str, head: str) -> List[ChangedFile]:
+    return parse_name_status(run_git(repo_path, *_DIFF_OPTIONS, "diff", "--name-status", "-M",
+                                     diff_spec(base, head)))
+
+
+def changed_hunks(repo_path: str, base: str, head: str) -> Dict[str, FileHunks]:
+    return parse_unified_hunks(run_git(repo_path, *_DIFF_OPTIONS, "diff", "-U0", "-M", "--no-color",
+                                       diff_spec(base, head)))
+
+
+def resolve_commit(repo_path: str, ref: str) -> str:
+    """
+    Commit SHA of a ref. A fresh clone has only the default branch locally,
+    so a branch name is also looked up as origin/<ref> and, as a last resort,
+    fetched (e.g. pull/1/head).
+    """
+    for candidate in (ref, f"origin/{ref}"):
+        try:
+            return run_git(repo_path, "rev-parse", "--verify", "--quiet", f"{candidate}^{{commit}}").strip()
+        except RuntimeError:
+            continue
+    run_git(repo_path, "fetch", "--quiet", "origin", ref)
+    return run_git(repo_path, "rev-parse", "--verify", "FETCH_HEAD^{commit}").strip()
+
+
+def merge_base(repo_path: str, base: str, head: str) -> str:
+    """Common ancestor the three-dot diff starts from"""
+    return run_git(repo_path, "merge-base", base, head).strip()
+
+
+def show_file(repo_path: str, ref: str, path: str) -> str:
+    """Contents of `path` at `ref`"""
+    return run_git(repo_path, "show", f"{ref}:{path}")
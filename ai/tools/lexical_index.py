@@ -0,0 +1,120 @@
+"""
+Lexical (BM25) inverted index over repository chunks.
+
+Built next to the Chroma store so that questions mentioning exact identifiers
+(`process_all_files_lint`, `_CppLintState`) are matched token by token, which
+MiniLM embeddings do poorly. Tokenization is identifier-aware: every identifier
+is indexed as a whole and split into its snake_case / camelCase parts.
+"""
+import json
+import math
+import os
+import re
+from collections import Counter, defaultdict
+from typing import Dict, Hashable, Iterable, List, Sequence, Tuple
+
+LEXICAL_INDEX_FILE = "lexical_index.json"
+
+WORD_RE = re.compile(r"\w+", re.UNICODE)
+CAMEL_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z]|\d|\b)|[A-Z]?[a-z]+|[A-Z]+|\d+")
+
+# Сглаживающая константа RRF: документ на месте rank (с нуля) получает 1 / (RRF_K + rank + 1)
+RRF_K = 60
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase terms, expanding identifiers into their parts."""
+    terms = []
+    for word in WORD_RE.findall(text):
+        whole = word.strip("_").lower()
+        if not whole:
+            continue
+        terms.append(whole)
+        parts = [
+            part.lower()
+            for chunk in word.split("_") if chunk
+            for part in (CAMEL_RE.findall(chunk) or [chunk])
+        ]
+        if len(parts) > 1:
+            terms.extend(part for part in parts if len(part) > 1)
+    return terms
+
+
+class LexicalIndex:
+    """Okapi BM25 index of text chunks with their metadata."""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.docs: List[Dict] = []
+        self.lengths: List[int] = []
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+
+    def add(self, text: str, metadata: Dict) -> None:
+        doc_id = len(self.docs)
+        counts = Counter(tokenize(text))
+        self.docs.append({"text": text, "metadata": dict(metadata)})
+        self.lengths.append(sum(counts.values()))
+        for term, tf in counts.items():
+            self.postings[term].append((doc_id, tf))
+
+    def search(self, query: str, k: int = 20) -> List[Tuple[Dict, float]]:
+        """Return up to k (doc, score) pairs ordered by BM25 score."""
+        if not self.docs:
+            return []
+        n_docs = len(self.docs)
+        avgdl = sum(self.lengths) / n_docs or 1.0
+        scores: Dict[int, float] = defaultdict(float)
+
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, tf in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[doc_id] / avgdl)
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(self.docs[doc_id], score) for doc_id, score in ranked]
+
+    def save(self, directory: str) -> str:
+        path = os.path.join(directory, LEXICAL_INDEX_FILE)
+        payload = {
+            "k1": self.k1,
+            "b": self.b,
+            "docs": self.docs,
+            "lengths": self.lengths,
+            "postings": self.postings,
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
+        return path
+
+    @classmethod
+    def load(cls, directory: str) -> "LexicalIndex":
+        """Load a saved index; returns an empty index for stores built before it existed."""
+        index = cls()
+        path = os.path.join(directory, LEXICAL_INDEX_FILE)
+        if not os.path.exists(path):
+            return index
+        with open(path, "r", encoding="utf-8") as f:
+            payload = json.load(f)
+        index.k1 = payload.get("k1", index.k1)
+        index.b = payload.get("b", index.b)
+        index.docs = payload["docs"]
+        index.lengths = payload["lengths"]
+        index.postings = defaultdict(list, {
+            term: [tuple(posting) for posting in postings]
+            for term, postings in payload["postings"].items()
+        })
+        return index
+
+
+def reciprocal_rank_fusion(rankings: Iterable[Sequence[Hashable]], k: int = RRF_K) -> List[Tuple[Hashable, float]]:
+    """Fuse several ranked key lists into one ranking (Cormack et al., RRF)."""
+    scores: Dict[Hashable, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, key in enumerate(ranking):
+            scores[key] += 1.0 / (k + rank + 1)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
@@ -0,0 +1,168 @@
+"""
+Ownership of files and line ranges, computed once per commit.
+
+Every line counts for the author who last changed it (git blame), weighted by
+recency: a change `half_life_days` old weighs half as much as one made at
+HEAD. Authors listed in CODEOWNERS for the file get an extra weight. The task
+allocation puts the result straight into the prompt and the tasks, so the
+agent does not need blame tool calls.
+"""
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from ai.instrumentation import register_cache
+from ai.tools.blame import BlameService, CommitInfo, blame_service
+from ai.tools.git_diff import run_git
+from ai.tools.retrieval_cache import LRUCache
+
+HALF_LIFE_DAYS = 180
+# Владельцы из CODEOWNERS получают вес (1 + CODEOWNER_WEIGHT)
+CODEOWNER_WEIGHT = 0.5
+CODEOWNERS_LOCATIONS = ("CODEOWNERS", ".github/CODEOWNERS", "docs/CODEOWNERS")
+
+Rule = Tuple["re.Pattern", List[str]]
+
+
+def _pattern_regex(pattern: str) -> "re.Pattern":
+    """gitignore-style CODEOWNERS pattern -> regex over repository-relative paths"""
+    # Шаблон со слешем в начале или в середине привязан к корню репозитория
+    anchored = "/" in pattern.rstrip("/")
+    directory = pattern.endswith("/")
+    pattern = pattern.strip("/")
+    regex = ""
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**", i):
+            regex += ".*"
+            i += 2
+        elif pattern[i] == "*":
+            regex += "[^/]*"
+            i += 1
+        elif pattern[i] == "?":
+            regex += "[^/]"
+            i += 1
+        else:
+            regex += re.escape(pattern[i])
+            i += 1
+    prefix = "" if anchored else "(?:.*/)?"
+    if directory:
+        suffix = "/.*"
+    elif pattern.endswith("*") and not pattern.endswith("**"):
+        suffix = ""  # "docs/*" - только файлы самого каталога
+    else:
+        suffix = "(?:/.*)?"  # файл или каталог со всем содержимым
+    return re.compile(f"^{prefix}{regex}{suffix}$")
+
+
+def parse_codeowners(text: str) -> List[Rule]:
+    rules = []
+    for line in text.splitlines():
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+        pattern, *owners = line.split()
+        rules.append((_pattern_regex(pattern), owners))
+    return rules
+
+
+def codeowners_for(rules: List[Rule], path: str) -> List[str]:
+    """Owners of a path: the last matching rule wins, as on GitHub"""
+    owners: List[str] = []
+    for regex, rule_owners in rules:
+        if regex.match(path):
+            owners = rule_owners
+    return owners
+
+
+def load_codeowners(repo_path: str) -> List[Rule]:
+    for location in CODEOWNERS_LOCATIONS:
+        path = os.path.join(repo_path, location)
+        if os.path.isfile(path):
+            with open(path, "r", encoding="utf-8", errors="ignore") as f:
+                return parse_codeowners(f.read())
+    return []
+
+
+def is_code_owner(info: CommitInfo, owners: List[str]) -> bool:
+    """@user matches the e-mail local part or the name without spaces; teams (@org/team) cannot be resolved"""
+    email = info.email.lower()
+    name = info.author.replace(" ", "").lower()
+    for owner in owners:
+        owner = owner.lower()
+        if "@" in owner[1:]:
+            if owner == email:
+                return True
+        elif owner.startswith("@") and "/" not in owner:
+            if owner[1:] in (email.split("@")[0], name):
+                return True
+    return False
+
+
+class OwnershipIndex:
+    """Recency- and CODEOWNERS-weighted authors of any line range at one commit"""
+
+    def __init__(self, repo_path: str, half_life_days: float = HALF_LIFE_DAYS,
+                 owner_weight: float = CODEOWNER_WEIGHT, blame: Optional[BlameService] = None):
+        self.repo_path = repo_path
+        self.blame = blame or blame_service
+        self.half_life_days = half_life_days
+        self.owner_weight = owner_weight
+        self.commit = self.blame.head(repo_path)
+        self.commit_time = int(run_git(repo_path, "show", "-s", "--format=%ct", self.commit).strip())
+        self.rules = load_codeowners(repo_path)
+
+    def _weight(self, info: CommitInfo, owners: List[str]) -> float:
+        age_days = max(0, self.commit_time - info.author_time) / 86400
+        weight = 0.5 ** (age_days / self.half_life_days)
+        if owners and is_code_owner(info, owners):
+            weight *= 1 + self.owner_weight
+        return weight
+
+    def owners(self, file_path: str, start: int = 1, end: Optional[int] = None) -> List[Tuple[str, float]]:
+        """(author, share of the weighted lines) in [start, end], largest share first"""
+        index = self.blame.index(self.repo_path, file_path, self.commit)
+        if index is None or not index.ranges:
+            return []
+        end = end if end is not None else index.ranges[-1].end
+        codeowners = codeowners_for(self.rules, self.blame.relative_path(self.repo_path, file_path))
+        scores: Dict[str, float] = {}
+        for blame_range, lines in index.overlapping(max(start, 1), end):
+            info = index.commits[blame_range.commit]
+            scores[info.author] = scores.get(info.author, 0.0) + lines * self._weight(info, codeowners)
+        total = sum(scores.values())
+        if not total:
+            return []
+        return sorted(((author, score / total) for author, score in scores.items()), key=lambda item: -item[1])
+
+    def owner(self, file_path: str, start: int = 1, end: Optional[int] = None) -> Optional[str]:
+        owners = self.owners(file_path, start, end)
+        return owners[0][0] if owners else None
+
+
+# (repo path, commit) -> OwnershipIndex; долгоживущий процесс не копит индексы всех коммитов
+ownership_cache = LRUCache(maxsize=16)
+register_cache("ownership", ownership_cache)
+_lock = threading.Lock()
+
+
+def get_ownership_index(repo_path: str) -> Optional[OwnershipIndex]:
+    """Ownership index of the repository's HEAD, built once per commit; None outside git"""
+    try:
+        key = (os.path.abspath(repo_path), blame_service.head(repo_path))
+    except RuntimeError:
+        return None
+    with _lock:
+        index = ownership_cache.get(key)
+        if index is None:
+            # Индексы старых HEAD того же репозитория больше не запрашиваются
+            ownership_cache.discard_where(lambda cached: cached[0] == key[0])
+            index = OwnershipIndex(repo_path)
+            ownership_cache.put(key, index)
+        return index
+
+
+def format_owners(owners: List[Tuple[str, float]], limit: int = 3) -> str:
+    """"Alice (70%), Bob (30%)" """
+    return ", ".join(f"{author} ({share:.0%})" for author, share in owners[:limit]) or "неизвестен"
@@ -0,0 +1,57 @@
+"""
+Local, CPU-only gate deciding whether a chat message is about code.
+
+Reuses the MiniLM embedding model already loaded for retrieval: the message is
+compared with code / non-code prototype phrases from agents.yaml. Only when the
+similarity margin is inside the ambiguity band the caller falls back to the LLM.
+"""
+from functools import lru_cache
+from typing import List, Optional, Sequence, Tuple
+
+from ai.config import get_agent_setting
+
+
+def cosine(a: Sequence[float], b: Sequence[float]) -> float:
+    """Embeddings are normalized, so the dot product is the cosine similarity"""
+    return sum(x * y for x, y in zip(a, b))
+
+
+def classify(query_vector: Sequence[float],
+             code_vectors: List[Sequence[float]],
+             non_code_vectors: List[Sequence[float]],
+             threshold: float) -> Tuple[Optional[bool], float]:
+    """
+    Compare the query with the closest prototype of each class.
+
+    Returns:
+        tuple: (True/False when the margin is at least `threshold`, None when ambiguous; margin)
+    """
+    code_score = max(cosine(query_vector, vector) for vector in code_vectors)
+    non_code_score = max(cosine(query_vector, vector) for vector in non_code_vectors)
+    margin = code_score - non_code_score
+    if margin >= threshold:
+        return True, margin
+    if margin <= -threshold:
+        return False, margin
+    return None, margin
+
+
+@lru_cache(maxsize=1)
+def _prototype_vectors():
+    from ai.tools.rag_tool import get_embeddings
+
+    gate_config = get_agent_setting('ChatAgent', 'gate')
+    embeddings = get_embeddings()
+    return (
+        embeddings.embed_documents(gate_config['code_prototypes']),
+        embeddings.embed_documents(gate_config['non_code_prototypes']),
+        gate_config['threshold'],
+    )
+
+
+def local_code_gate(message: str) -> Tuple[Optional[bool], float]:
+    """Classify a message locally; None means the LLM should decide"""
+    from ai.tools.rag_tool import embed_query
+
+    code_vectors, non_code_vectors, threshold = _prototype_vectors()
+    return classify(embed_query(message), code_vectors, non_code_vectors, threshold)
@@ -1,56 +1,150 @@
 import os
-import git
 import tempfile
-import torch
 
-from typing import List
+from functools import lru_cache
+from typing import List, Tuple, Union
+from langchain_core.documents import Document
 from langchain_core.tools import tool
 from pathlib import Path
-from langchain_text_splitters import RecursiveCharacterTextSplitter, Language
-from langchain_community.document_loaders import TextLoader
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import Chroma
-from huggingface_hub import login
 
-from typing import List
-from langchain_core.tools import tool
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import Chroma
-import os
+from ai.tools.lexical_index import RRF_K, LexicalIndex, reciprocal_rank_fusion
+from ai.tools.snippets import merge_adjacent, render_snippets
+from ai.config import get_agent_setting
+from ai.tools.retrieval_cache import (
+    bump_index_version,
+    get_index_version,
+    lexical_index_cache,
+    normalize_db_path,
+    normalize_query,
+    query_embedding_cache,
+    search_key,
+    search_result_cache,
+    store_cache,
+)
+
+EMBEDDING_MODEL_NAME = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+SEARCH_K = 20
+
+
+@lru_cache(maxsize=1)
+def get_embeddings() -> "HuggingFaceEmbeddings":
+    """Load the MiniLM embedding model once per process"""
+    # torch и sentence-transformers грузятся секундами, поэтому только при первом поиске
+    import torch
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+
+    device = "mps" if torch.backends.mps.is_available() else "cpu"
+    return HuggingFaceEmbeddings(
+        model_name=EMBEDDING_MODEL_NAME,
+        model_kwargs={'device': device, 'trust_remote_code': True},
+        encode_kwargs={'normalize_embeddings': True}  # For cosine similarity
+    )
+
+
+def embed_query(query: str) -> List[float]:
+    """Embed a query, reusing the vector of an identical (normalized) query"""
+    # Эмбеддинг считается от той же строки, что служит ключом кэша
+    query = normalize_query(query)
+    return query_embedding_cache.get_or_compute(query, lambda: get_embeddings().embed_query(query))
+
+
+def get_vector_store(vector_db_path: str) -> "Chroma":
+    """Open the Chroma store of a repository once per index version"""
+    from langchain_community.vectorstores import Chroma
+
+    key = (normalize_db_path(vector_db_path), get_index_version(vector_db_path))
+    return store_cache.get_or_compute(
+        key,
+        lambda: Chroma(persist_directory=vector_db_path, embedding_function=get_embeddings())
+    )
+
+
+def get_lexical_index(vector_db_path: str) -> LexicalIndex:
+    """Load the BM25 index stored next to the Chroma store once per index version"""
+    key = (normalize_db_path(vector_db_path), get_index_version(vector_db_path))
+    return lexical_index_cache.get_or_compute(key, lambda: LexicalIndex.load(vector_db_path))
+
+
+def search_documents(query: str, vector_db_path: str, k: int = SEARCH_K) -> List[Tuple[Document, float]]:
+    """
+    Hybrid top-k search: vector similarity and BM25 rankings fused with RRF.
+
+    Results are cached per (vector_db_path, index_version, query).
+
+    Returns:
+        list: (document, score) pairs, score normalized to 0..1
+    """
+    key = search_key(vector_db_path, query, k)
+
+    def run_search():
+        db = get_vector_store(vector_db_path)
+        vector_docs = db.similarity_search_by_vector(embed_query(query), k=k)
+        lexical_docs = [
+            Document(page_content=doc["text"], metadata=doc["metadata"])
+            for doc, _ in get_lexical_index(vector_db_path).search(query, k=k)
+        ]
+
+        by_key = {}
+        rankings = []
+        for docs in (vector_docs, lexical_docs):
+            ranking = []
+            for doc in docs:
+                doc_key = (doc.metadata.get("source", ""), doc.page_content)
+                by_key.setdefault(doc_key, doc)
+                ranking.append(doc_key)
+            rankings.append(ranking)
+
+        # Максимальный RRF-балл: документ первый во всех ранжированиях
+        best_score = len(rankings) / (RRF_K + 1)
+        return [
+            (by_key[doc_key], score / best_score)
+            for doc_key, score in reciprocal_rank_fusion(rankings)[:k]
+        ]
+
+    return search_result_cache.get_or_compute(key, run_search)
+
+
+def _to_hit(doc: Document, score: float) -> dict:
+    return {
+        "source": doc.metadata.get("source", ""),
+        "start_line": doc.metadata.get("start_line"),
+        "end_line": doc.metadata.get("end_line"),
+        "score": score,
+        "text": doc.page_content,
+    }
+
 
 @tool
-def retrieve_context(query: str, vector_db_path: str) -> List[str]:
+def retrieve_context(query: str, vector_db_path: str, mode: str = "snippets") -> Union[str, List[str]]:
     """
     Автоматически находит и извлекает релевантный контекст из векторной БД
     
     Args:
         query: Поисковый запрос
         vector_db_path: Путь к векторной БД
+        mode: "snippets" - компактные фрагменты с путём, строками и оценкой релевантности
+              (по умолчанию); "raw" - полные фрагменты без метаданных
         
     Returns:
         Релевантные фрагменты контекста
     """
-    # Инициализируем эмбеддинг-функцию
-    embeddings = HuggingFaceEmbeddings(
-        model_name="sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2",
-        model_kwargs={'device': 'mps'},
-        encode_kwargs={'normalize_embeddings': True}
-    )
+    # Выполняем поиск (повторные запросы обслуживаются из кэша)
+    results = search_documents(query, vector_db_path)
     
-    # Загружаем базу данных с эмбеддинг-функцией
-    db = Chroma(
-        persist_directory=vector_db_path,
-        embedding_function=embeddings  # Добавляем эмбеддинг-функцию
-    )
-    
-    # Выполняем поиск
-    docs = db.similarity_search(query, k=20)
+    if mode == "snippets":
+        retrieval_config = get_agent_setting('ChatAgent', 'retrieval')
+        snippets = merge_adjacent([_to_hit(doc, score) for doc, score in results])
+        return render_snippets(
+            snippets,
+            token_budget=retrieval_config['token_budget'],
+            max_snippets=retrieval_config['max_snippets']
+        )
     
     # Фильтрация и обработка результатов
     unique_sources = set()
     filtered_docs = []
     
-    for doc in docs:
+    for doc, _ in results:
         source = doc.metadata.get("source", "")
         if source not in unique_sources:
             unique_sources.add(source)
@@ -59,6 +153,17 @@ def retrieve_context(query: str, vector_db_path: str) -> List[str]:
     return [doc.page_content for doc in filtered_docs[:15]]
 
 
+def _add_line_ranges(splits: List[Document], text: str) -> None:
+    """Convert the splitter's start_index into 1-based start/end lines of each chunk"""
+    for split in splits:
+        start_index = split.metadata.pop("start_index", -1)
+        if start_index is None or start_index < 0:
+            continue
+        start_line = text.count("\n", 0, start_index) + 1
+        split.metadata["start_line"] = start_line
+        split.metadata["end_line"] = start_line + split.page_content.count("\n")
+
+
 def initialize_vector_db_from_github(repo_url: str, storage_base_path: str = "storage"):
     """
     Initialize a Chroma vector database with repository files from GitHub using language-specific text splitters.
@@ -68,6 +173,12 @@ def initialize_vector_db_from_github(repo_url: str, storage_base_path: str = "st
         output_db_path: Path where the vector database will be stored
         github_token: GitHub personal access token (optional)
     """
+    import git
+    from huggingface_hub import login
+    from langchain_community.document_loaders import TextLoader
+    from langchain_community.vectorstores import Chroma
+    from langchain_text_splitters import RecursiveCharacterTextSplitter, Language
+
     # Create temporary directory for cloning
     tmp_dir = tempfile.mkdtemp()
     
@@ -79,19 +190,14 @@ def initialize_vector_db_from_github(repo_url: str, storage_base_path: str = "st
         # Login to HuggingFace
         login(token=os.getenv("HF_TOKEN"))
         
-        device = "mps" if torch.backends.mps.is_available() else "cpu"
-        
         # Initialize embeddings model (optimized for multilingual semantic similarity)
-        embeddings = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2",
-            model_kwargs={'device': device, 'trust_remote_code': True},
-            encode_kwargs={'normalize_embeddings': True}  # For cosine similarity
-        )
+        embeddings = get_embeddings()
         
         # Create the default text splitter for non-code files
         default_splitter = RecursiveCharacterTextSplitter(
             chunk_size=1000,
-            chunk_overlap=200
+            chunk_overlap=200,
+            add_start_index=True
         )
         
         # Map file extensions to language-specific splitters
@@ -114,6 +220,8 @@ def initialize_vector_db_from_github(repo_url: str, storage_base_path: str = "st
         os.makedirs(output_db_path, exist_ok=True)
         
         db = Chroma(persist_directory=output_db_path, embedding_function=embeddings)
+        # Лексический индекс строится заново вместе с векторным
+        lexical_index = LexicalIndex()
         
         # Process all files in the repository
         repo_path = Path(tmp_dir)
@@ -149,20 +257,29 @@ def initialize_vector_db_from_github(repo_url: str, storage_base_path: str = "st
                     splitter = RecursiveCharacterTextSplitter.from_language(
                         language=language,
                         chunk_size=400,
-                        chunk_overlap=100
+                        chunk_overlap=100,
+                        add_start_index=True
                     )
                     print(f"Using {language.name} splitter for {file_path.relative_to(repo_path)}")
                     splits = splitter.split_documents(documents)
                 else:
                     splits = default_splitter.split_documents(documents)
                 
+                # Номера строк нужны, чтобы ответы могли ссылаться на место в файле
+                _add_line_ranges(splits, documents[0].page_content if documents else "")
+                
                 db.add_documents(splits)
+                for split in splits:
+                    lexical_index.add(split.page_content, split.metadata)
                 
                 print(f"Added {file_path.relative_to(repo_path)} to the vector database")
             except Exception as e:
                 print(f"Error processing {file_path}: {e}")
         
         db.persist()
+        lexical_index.save(output_db_path)
+        # Новая версия индекса сбрасывает закэшированные результаты поиска
+        bump_index_version(output_db_path)
         print(f"Vector database initialized at {output_db_path}")
         return db
     
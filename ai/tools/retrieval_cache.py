@@ -0,0 +1,132 @@
+"""
+LRU caches for chat retrieval: query embeddings and top-k search results.
+
+Search results are keyed by (vector_db_path, index_version, query, k). The index
+version is a marker file written next to the Chroma store every time the index
+for a repository is rebuilt, so stale results are never served after a rebuild.
+"""
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+from ai.instrumentation import register_cache
+
+INDEX_VERSION_FILE = "index_version"
+
+
+class LRUCache:
+    """Thread-safe least-recently-used cache with a fixed number of entries."""
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        marker = object()
+        value = self.get(key, marker)
+        if value is marker:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def discard_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Remove every entry whose key matches the predicate."""
+        with self._lock:
+            stale = [key for key in self._data if predicate(key)]
+            for key in stale:
+                del self._data[key]
+            return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def normalize_db_path(vector_db_path: str) -> str:
+    """Same store may be referenced as 'storage/x/vectore_store/' or 'storage/x/vectore_store'."""
+    return os.path.normpath(os.path.abspath(vector_db_path))
+
+
+def normalize_query(query: str) -> str:
+    """Collapse whitespace so trivially reformatted tool calls share an entry.
+
+    Case is kept: the embedding model is cased, so "Main" and "main" are different queries.
+    """
+    return re.sub(r"\s+", " ", query).strip()
+
+
+def get_index_version(vector_db_path: str) -> str:
+    """Return the version marker of the index, or an empty string for legacy stores."""
+    try:
+        with open(os.path.join(vector_db_path, INDEX_VERSION_FILE), "r", encoding="utf-8") as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+
+def bump_index_version(vector_db_path: str) -> str:
+    """Write a new version marker after the index was rebuilt and drop cached results."""
+    version = f"{time.time_ns():x}"
+    os.makedirs(vector_db_path, exist_ok=True)
+    with open(os.path.join(vector_db_path, INDEX_VERSION_FILE), "w", encoding="utf-8") as f:
+        f.write(version)
+    invalidate(vector_db_path)
+    return version
+
+
+# Query embeddings depend only on the embedding model, not on the index
+query_embedding_cache = LRUCache(maxsize=512)
+# (vector_db_path, index_version, query, k) -> retrieved documents
+search_result_cache = LRUCache(maxsize=256)
+# (vector_db_path, index_version) -> opened Chroma store
+store_cache = LRUCache(maxsize=16)
+# (vector_db_path, index_version) -> loaded lexical (BM25) index
+lexical_index_cache = LRUCache(maxsize=16)
+
+register_cache("query_embedding", query_embedding_cache)
+register_cache("search_result", search_result_cache)
+register_cache("vector_store", store_cache)
+register_cache("lexical_index", lexical_index_cache)
+
+
+def search_key(vector_db_path: str, query: str, k: int) -> Tuple[str, str, str, int]:
+    path = normalize_db_path(vector_db_path)
+    return path, get_index_version(vector_db_path), normalize_query(query), k
+
+
+def invalidate(vector_db_path: Optional[str] = None) -> None:
+    """Drop cached results and stores for one repository index (or for all of them)."""
+    if vector_db_path is None:
+        search_result_cache.clear()
+        store_cache.clear()
+        lexical_index_cache.clear()
+        return
+    path = normalize_db_path(vector_db_path)
+    search_result_cache.discard_where(lambda key: key[0] == path)
+    store_cache.discard_where(lambda key: key[0] == path)
+    lexical_index_cache.discard_where(lambda key: key[0] == path)
@@ -0,0 +1,102 @@
+"""
+Compact, source-annotated retrieval output.
+
+Retrieved chunks are merged per file when their line ranges overlap or touch,
+ordered by score and rendered as `path:start-end (score)` headers with code,
+trimmed to a token budget so one tool call does not flood the model context.
+"""
+from typing import Dict, List, Optional
+
+CHARS_PER_TOKEN = 4
+MIN_TRIMMED_CHARS = 200
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _merge_into(snippet: Dict, hit: Dict) -> None:
+    lines = dict(snippet["lines"])
+    for offset, line in enumerate(hit["text"].split("\n")):
+        lines.setdefault(hit["start_line"] + offset, line)
+    snippet["lines"] = lines
+    snippet["end_line"] = max(snippet["end_line"], hit["end_line"])
+    snippet["score"] = max(snippet["score"], hit["score"])
+
+
+def merge_adjacent(hits: List[Dict], max_gap: int = 1) -> List[Dict]:
+    """
+    Merge hits from the same file whose line ranges overlap or are at most
+    `max_gap` lines apart.
+
+    Args:
+        hits: dicts with source, start_line, end_line (None if unknown), score, text
+
+    Returns:
+        list: merged snippets ordered by score (same keys as hits)
+    """
+    by_source: Dict[str, List[Dict]] = {}
+    unlocated = []
+    for hit in hits:
+        if hit.get("start_line") is None or hit.get("end_line") is None:
+            unlocated.append(dict(hit))
+        else:
+            by_source.setdefault(hit["source"], []).append(hit)
+
+    merged = []
+    for source, source_hits in by_source.items():
+        current: Optional[Dict] = None
+        for hit in sorted(source_hits, key=lambda h: (h["start_line"], h["end_line"])):
+            if current and hit["start_line"] <= current["end_line"] + max_gap + 1:
+                _merge_into(current, hit)
+                continue
+            current = {
+                "source": source,
+                "start_line": hit["start_line"],
+                "end_line": hit["end_line"],
+                "score": hit["score"],
+                "lines": {},
+            }
+            _merge_into(current, hit)
+            merged.append(current)
+
+    for snippet in merged:
+        lines = snippet.pop("lines")
+        snippet["text"] = "\n".join(
+            lines.get(number, "") for number in range(snippet["start_line"], snippet["end_line"] + 1)
+        )
+
+    seen_texts = set()
+    for hit in unlocated:
+        if hit["text"] not in seen_texts:
+            seen_texts.add(hit["text"])
+            merged.append(hit)
+
+    return sorted(merged, key=lambda s: s["score"], reverse=True)
+
+
+def render_snippets(snippets: List[Dict], token_budget: int, max_snippets: Optional[int] = None) -> str:
+    """Render snippets best-first until the token budget is spent; the last one may be cut."""
+    blocks = []
+    used = 0
+    for snippet in snippets[:max_snippets]:
+        location = snippet["source"]
+        if snippet.get("start_line") is not None:
+            location += f":{snippet['start_line']}-{snippet['end_line']}"
+        header = f"{location} (score {snippet['score']:.2f})"
+        text = snippet["text"]
+
+        # Заголовок, ограждение ``` и маркер обрезки "..." тоже расходуют бюджет
+        remaining = (token_budget - used) * CHARS_PER_TOKEN - len(header) - 16
+        if len(text) > remaining:
+            if remaining < MIN_TRIMMED_CHARS:
+                break
+            text = text[:remaining].rsplit("\n", 1)[0] + "\n..."
+
+        block = f"{header}\n```\n{text}\n```"
+        blocks.append(block)
+        used += estimate_tokens(block)
+        if used >= token_budget:
+            break
+
+    return "\n\n".join(blocks) if blocks else "Ничего не найдено"
@@ -0,0 +1,177 @@
+"""
+Structured (JSON) output of the ErrorSearcher.
+
+The model answers {"issues": [{rows, error, criticality, solution}, ...]}.
+IssueStreamParser reads the answer as it streams: every object of the array
+is decoded and validated as soon as its closing brace arrives, so a long
+answer is never re-scanned and a broken item does not cost the others. The
+invalid items (with their problems) are what the re-ask prompt is built from.
+"""
+import json
+import re
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+ISSUE_FIELDS = ("rows", "error", "criticality", "solution")
+CRITICALITIES = ("low", "medium", "high")
+
+ISSUE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "issues": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "rows": {"type": "string", "pattern": r"^\d+(-\d+)?$"},
+                    "error": {"type": "string"},
+                    "criticality": {"type": "string", "enum": list(CRITICALITIES)},
+                    "solution": {"type": "string"},
+                },
+                "required": list(ISSUE_FIELDS),
+            },
+        },
+    },
+    "required": ["issues"],
+}
+
+ROWS_PATTERN = re.compile(ISSUE_SCHEMA["properties"]["issues"]["items"]["properties"]["rows"]["pattern"])
+# Начало массива: {"issues": [ ... или ответ сразу массивом (в том числе внутри ```json)
+ARRAY_START = (re.compile(r'"issues"\s*:\s*\['), re.compile(r"\A\s*(?:```(?:json)?\s*)?\[(?=\s*[{\]])"))
+
+
+def normalize_criticality(value: str) -> str:
+    """low/medium/high; Russian answers ("высокий", "Средний риск") are matched by stem"""
+    value = value.strip().lower()
+    if value in CRITICALITIES:
+        return value
+    return (
+        'low' if 'низк' in value or 'low' in value else
+        'medium' if 'средн' in value or 'medium' in value else
+        'high' if 'высок' in value or 'high' in value else
+        'unknown'
+    )
+
+
+def validate_issue(item: Any) -> Tuple[Optional[Dict], List[str]]:
+    """(normalized issue, []) or (None, problems) for one array element"""
+    if not isinstance(item, dict):
+        return None, ["item is not an object"]
+    problems = []
+    issue = {}
+    for field in ISSUE_FIELDS:
+        value = item.get(field)
+        if isinstance(value, (int, float)) and field == "rows":
+            value = str(value)
+        if not isinstance(value, str) or not value.strip():
+            problems.append(f"missing field '{field}'")
+            continue
+        issue[field] = value.strip()
+    if "rows" in issue and not ROWS_PATTERN.match(issue["rows"].replace(" ", "")):
+        problems.append("rows must look like 'X-Y' (line numbers)")
+    if "criticality" in issue:
+        issue["criticality"] = normalize_criticality(issue["criticality"])
+        if issue["criticality"] == "unknown":
+            problems.append(f"criticality must be one of {', '.join(CRITICALITIES)}")
+    if problems:
+        return None, problems
+    issue["rows"] = issue["rows"].replace(" ", "")
+    return issue, []
+
+
+class ParsedIssue(NamedTuple):
+    index: int  # position in the answer's array
+    issue: Optional[Dict]  # normalized issue, None if invalid
+    raw: str  # item text as the model wrote it
+    problems: List[str]
+
+
+class IssueStreamParser:
+    """Incremental parser of the issues array; feed() chunks, close() at the end of the stream"""
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._item_start: Optional[int] = None
+        self._in_string = False
+        self._escape = False
+        self.found = False  # массив issues найден в ответе
+        self.done = False
+        self.items: List[ParsedIssue] = []
+
+    def _find_array(self) -> None:
+        for pattern in ARRAY_START:
+            match = pattern.search(self._buffer)
+            if match:
+                self.found = True
+                self._pos = match.end()
+                return
+
+    def feed(self, chunk: str) -> List[ParsedIssue]:
+        """Items completed by this chunk"""
+        self._buffer += chunk
+        if not self.found:
+            self._find_array()
+            if not self.found:
+                return []
+        completed = []
+        buffer = self._buffer
+        while self._pos < len(buffer) and not self.done:
+            char = buffer[self._pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"' and self._depth:
+                self._in_string = True
+            elif char == "{":
+                if not self._depth:
+                    self._item_start = self._pos
+                self._depth += 1
+            elif char == "}" and self._depth:
+                self._depth -= 1
+                if not self._depth:
+                    completed.append(self._complete(buffer[self._item_start:self._pos + 1]))
+                    self._item_start = None
+            elif char == "]" and not self._depth:
+                self.done = True
+            self._pos += 1
+        return completed
+
+    def _complete(self, raw: str) -> ParsedIssue:
+        try:
+            issue, problems = validate_issue(json.loads(raw))
+        except json.JSONDecodeError as e:
+            issue, problems = None, [f"not valid JSON ({e.msg})"]
+        item = ParsedIssue(len(self.items), issue, raw, problems)
+        self.items.append(item)
+        return item
+
+    def close(self) -> List[ParsedIssue]:
+        """All items; an object cut off by the end of the stream is reported as invalid"""
+        if self._item_start is not None:
+            self.items.append(ParsedIssue(len(self.items), None, self._buffer[self._item_start:],
+                                          ["object is truncated"]))
+            self._item_start = None
+        self.done = True
+        return self.items
+
+
+def split_valid(items: List[ParsedIssue]) -> Tuple[List[Dict], List[ParsedIssue]]:
+    return [item.issue for item in items if item.issue], [item for item in items if not item.issue]
+
+
+def describe_invalid(items: List[ParsedIssue], max_chars: int = 1500) -> str:
+    """Re-ask block: what is wrong with every invalid item, with its text"""
+    lines = []
+    for item in items:
+        raw = item.raw if len(item.raw) <= max_chars else item.raw[:max_chars] + " ..."
+        lines.append(f"- item {item.index + 1}: {'; '.join(item.problems)}\n  {raw}")
+    return "\n".join(lines)
+
+
+def schema_text() -> str:
+    return json.dumps(ISSUE_SCHEMA, ensure_ascii=False, indent=1)
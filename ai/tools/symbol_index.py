@@ -0,0 +1,200 @@
+"""
+Symbol-level code index: symbol -> definitions/references, file -> outline.
+
+Built once per analysis from Python `ast` (classes, functions, methods), the
+lizard function list (every other language) and cpplint's class tracking
+(C/C++ classes and structs), so that navigation questions in the chat are
+answered by a dictionary lookup instead of similarity searches.
+"""
+import ast
+import json
+import os
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+SYMBOL_INDEX_FILE = "symbol_index.json"
+MAX_REFERENCES = 200
+
+IDENTIFIER_RE = re.compile(r"\b[A-Za-z_]\w*\b")
+CPP_EXTENSIONS = (".cpp", ".cc", ".cxx", ".c", ".h", ".hpp")
+
+
+def short_name(name: str) -> str:
+    """'Outer.method' / 'Outer::method' -> 'method'"""
+    return re.split(r"\.|::", name)[-1]
+
+
+def _python_symbols(code: str) -> List[Dict]:
+    symbols = []
+
+    def visit(node, prefix, in_class):
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, ast.ClassDef):
+                kind = "class"
+            elif isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                kind = "method" if in_class else "function"
+            else:
+                continue
+            qualname = f"{prefix}{child.name}"
+            symbols.append({
+                "name": qualname,
+                "kind": kind,
+                "start_line": child.lineno,
+                "end_line": getattr(child, "end_lineno", child.lineno),
+            })
+            visit(child, f"{qualname}.", isinstance(child, ast.ClassDef))
+
+    visit(ast.parse(code), "", False)
+    return symbols
+
+
+def _lizard_symbols(full_path: str) -> List[Dict]:
+    import lizard
+
+    analysis = lizard.analyze_file(full_path)
+    return [
+        {
+            "name": function.name,
+            "kind": "method" if "::" in function.name else "function",
+            "start_line": function.start_line,
+            "end_line": function.start_line + function.length - 1,
+        }
+        for function in analysis.function_list
+    ]
+
+
+def _cpplint_classes(file_path: str, code: str) -> List[Dict]:
+    from ai.linters import cpplint
+
+    def ignore_error(*args, **kwargs):
+        pass
+
+    # Маркеры в начале и конце, как в cpplint.ProcessFileData: индекс == номер строки
+    lines = ["// marker"] + code.split("\n") + ["// marker"]
+    cpplint.RemoveMultiLineComments(file_path, lines, ignore_error)
+    clean_lines = cpplint.CleansedLines(lines)
+    nesting_state = cpplint.NestingState()
+
+    classes = []
+    seen = set()
+    for linenum in range(clean_lines.NumLines()):
+        nesting_state.Update(file_path, clean_lines, linenum, ignore_error)
+        outer = [
+            block.name for block in nesting_state.stack
+            if isinstance(block, cpplint._ClassInfo)
+        ]
+        for block in nesting_state.stack:
+            if isinstance(block, cpplint._ClassInfo) and id(block) not in seen:
+                seen.add(id(block))
+                qualname = "::".join(outer[:outer.index(block.name) + 1])
+                classes.append({
+                    "name": qualname,
+                    "kind": "struct" if block.is_struct else "class",
+                    "start_line": block.starting_linenum,
+                    "end_line": block.last_line or block.starting_linenum,
+                })
+    return classes
+
+
+def extract_file_symbols(root_path: str, file_path: str) -> List[Dict]:
+    """Definitions found in one file, ordered by line."""
+    full_path = os.path.join(root_path, file_path)
+    with open(full_path, "r", encoding="utf-8", errors="ignore") as f:
+        code = f.read()
+
+    if file_path.endswith(".py"):
+        try:
+            symbols = _python_symbols(code)
+        except SyntaxError:
+            symbols = _lizard_symbols(full_path)
+    else:
+        symbols = _lizard_symbols(full_path)
+        if file_path.endswith(CPP_EXTENSIONS):
+            symbols += _cpplint_classes(file_path, code)
+
+    return sorted(symbols, key=lambda symbol: (symbol["start_line"], symbol["name"]))
+
+
+def build_symbol_index(root_path: str, file_paths: List[str]) -> Dict:
+    """
+    Build the index for a checked out repository.
+
+    Returns:
+        dict: {"definitions": {short_name: [symbol...]},
+               "references": {short_name: ["file:line", ...]},
+               "outlines": {file: [symbol...]},
+               "errors": {file: message}}
+    """
+    definitions = defaultdict(list)
+    outlines = {}
+    errors = {}
+
+    for file_path in file_paths:
+        try:
+            symbols = extract_file_symbols(root_path, file_path)
+        except Exception as e:
+            errors[file_path] = str(e)
+            continue
+        outlines[file_path] = symbols
+        for symbol in symbols:
+            definitions[short_name(symbol["name"])].append({"file": file_path, **symbol})
+
+    # Ссылки ищем по идентификаторам, совпадающим с известными определениями
+    definition_lines = {
+        (entry["file"], entry["start_line"], name)
+        for name, entries in definitions.items() for entry in entries
+    }
+    references = defaultdict(list)
+    for file_path in outlines:
+        try:
+            with open(os.path.join(root_path, file_path), "r", encoding="utf-8", errors="ignore") as f:
+                lines = f.readlines()
+        except OSError:
+            continue
+        for lineno, line in enumerate(lines, start=1):
+            for name in set(IDENTIFIER_RE.findall(line)):
+                if name not in definitions or (file_path, lineno, name) in definition_lines:
+                    continue
+                if len(references[name]) < MAX_REFERENCES:
+                    references[name].append(f"{file_path}:{lineno}")
+
+    return {
+        "definitions": dict(definitions),
+        "references": dict(references),
+        "outlines": outlines,
+        "errors": errors,
+    }
+
+
+def save_symbol_index(index: Dict, path: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, separators=(",", ":"))
+
+
+def load_symbol_index(path: str) -> Dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def find_definitions(index: Dict, symbol: str) -> List[Dict]:
+    """Look up by short name; a qualified query ('Cls.method', 'Cls::method') narrows the result."""
+    entries = index.get("definitions", {}).get(short_name(symbol), [])
+    if re.search(r"\.|::", symbol):
+        wanted = re.split(r"\.|::", symbol)
+        entries = [e for e in entries if re.split(r"\.|::", e["name"])[-len(wanted):] == wanted]
+    return entries
+
+
+def find_references(index: Dict, symbol: str) -> List[str]:
+    return index.get("references", {}).get(short_name(symbol), [])
+
+
+def file_outline(index: Dict, file_path: str) -> Optional[List[Dict]]:
+    """Outline of a file; accepts a path relative to the repo root or a unique suffix of it."""
+    outlines = index.get("outlines", {})
+    normalized = re.sub(r"^(\./)+", "", file_path.replace("\\", "/"))
+    if normalized in outlines:
+        return outlines[normalized]
+    matches = [path for path in outlines if path.replace("\\", "/").endswith("/" + normalized)]
+    return outlines[matches[0]] if len(matches) == 1 else None
@@ -0,0 +1,100 @@
+"""
+Packing of report entries into task allocation prompts.
+
+An entry of the complexity or error report is one file: a list of fragments
+or a dict of issues plus file metrics. Entries of the same kind share a prompt
+while they fit the token budget; an entry larger than the budget is split by
+fragment/issue, with the file metrics repeated in every part. Nothing is
+summarised or dropped: a single fragment over the budget gets its own prompt.
+"""
+import json
+from typing import Dict, List
+
+from ai.tools.snippets import estimate_tokens
+
+# Часть записи отчета, которую можно делить, и поле задачи с данными записи
+ITEMS_KEY = {"complexity": "fragments", "error": "issues"}
+DATA_KEY = {"complexity": "complexity_data", "error": "error_data"}
+TITLES = {"complexity": "Complexity Report", "error": "Error Report"}
+
+
+def _dumps(data) -> str:
+    # ensure_ascii=False: кириллица занимает 1 символ вместо 6 (\uXXXX)
+    return json.dumps(data, ensure_ascii=False, indent=1)
+
+
+def render_entry(entry: Dict) -> str:
+    """Prompt text of one entry (or part of an entry)"""
+    part = f" (part {entry['part']})" if entry.get("part") else ""
+    data = entry.get(DATA_KEY.get(entry["source"], ""), {})
+    return f"{TITLES.get(entry['source'], 'Report')} for {entry['file_path']}{part}:\n{_dumps(data)}"
+
+
+def entry_tokens(entry: Dict) -> int:
+    return estimate_tokens(render_entry(entry))
+
+
+def split_entry(entry: Dict, token_budget: int) -> List[Dict]:
+    """
+    Parts of an entry within the budget, by fragment/issue in report order.
+
+    File metrics go to every part, so each prompt is self-contained. An entry
+    that fits (or has a single item) is returned as is.
+    """
+    if entry_tokens(entry) <= token_budget:
+        return [entry]
+    data_key = DATA_KEY.get(entry["source"])
+    data = entry.get(data_key)
+    items_key = ITEMS_KEY.get(entry["source"])
+    items = data.get(items_key) if isinstance(data, dict) else None
+    if not items or len(items) < 2:
+        return [entry]
+
+    keyed = isinstance(items, dict)
+    pairs = list(items.items()) if keyed else list(enumerate(items))
+
+    def part(chunk) -> Dict:
+        values = dict(chunk) if keyed else [value for _, value in chunk]
+        return {**entry, data_key: {**data, items_key: values}}
+
+    # Размер части = общая часть записи + размеры элементов, без повторной сериализации
+    base = entry_tokens(part([]))
+    parts, chunk, used = [], [], base
+    for pair in pairs:
+        tokens = estimate_tokens(_dumps({str(pair[0]): pair[1]}))
+        if chunk and used + tokens > token_budget:
+            parts.append(part(chunk))
+            chunk, used = [], base
+        chunk.append(pair)
+        used += tokens
+    parts.append(part(chunk))
+    for number, item in enumerate(parts, 1):
+        item["part"] = f"{number}/{len(parts)}"
+    return parts
+
+
+def plan_batches(entries: List[Dict], token_budget: int, max_entries: int) -> List[Dict]:
+    """
+    Group report entries into prompts: {"source", "entries", "tokens"}.
+
+    Entries keep report order and are packed next-fit, one open batch per
+    source, so a prompt is about complexity or about errors only. A batch
+    holds at most `max_entries` entries (the model writes tasks for each).
+    """
+    batches: List[Dict] = []
+    open_batches: Dict[str, Dict] = {}
+    for entry in entries:
+        for part in split_entry(entry, token_budget):
+            tokens = entry_tokens(part)
+            batch = open_batches.get(part["source"])
+            if batch is None or batch["tokens"] + tokens > token_budget or len(batch["entries"]) >= max_entries:
+                batch = {"source": part["source"], "entries": [], "tokens": 0}
+                open_batches[part["source"]] = batch
+                batches.append(batch)
+            batch["entries"].append(part)
+            batch["tokens"] += tokens
+    return batches
+
+
+def render_batch(batch: Dict) -> str:
+    return "\n\n".join(render_entry(entry) for entry in batch["entries"])
@@ -1,5 +1,3 @@
-import yaml
-import pylint.lint
 import libcst as cst
 import io
 import sys
@@ -7,14 +5,8 @@ import subprocess
 import os
 import re
 
-def load_agent_config():
-    with open("ai/config/agents.yaml", "r", encoding="utf-8") as f:
-        return yaml.safe_load(f)
-    
-def load_model_config():
-    with open("ai/config/models.yaml", "r", encoding="utf-8") as f:
-        return yaml.safe_load(f)
-    
+from ai.config import load_agent_config, load_model_config
+
 def get_function_code(file_path, start_line, end_line):
     try:
         with open(file_path, 'r', encoding='utf-8') as file:
@@ -24,6 +16,8 @@ def get_function_code(file_path, start_line, end_line):
         return f"# Error extracting code: {str(e)}"
 
 def run_pylint(file_path):
+    import pylint.lint
+
     pylint_output = io.StringIO()
     sys.stdout = pylint_output
     try:
@@ -1,4 +1,4 @@
-from ai.graphs.linters_graph import linters_graph
+from ai.graphs.code_analyse import integrated_code_analysis_graph
 from IPython.display import Image, display
 
 # result = code_analysis_graph.invoke({
@@ -7,7 +7,7 @@ from IPython.display import Image, display
 
 # print(result)
 
-png_data = linters_graph.get_graph().draw_mermaid_png()
+png_data = integrated_code_analysis_graph.get_graph().draw_mermaid_png()
 with open('workflow_graph.png', 'wb') as f:
     f.write(png_data)
 
@@ -1,5 +1,5 @@
+import importlib
 import streamlit as st
-from ui.pages import add_repository, chat, metrics, complexity, mistakes, code_smells, custom, problem_mistakes
 from ui.sidebar import draw_common_sidebar
 from ui.pages.problem_mistakes import draw_problem_sidebar
 import os
@@ -54,24 +54,26 @@ def main():
     else:
         draw_common_sidebar(prefix="common")
 
-    # Отображение контента страницы
+    # Отображение контента страницы: модуль страницы (и ее графы) импортируется только при открытии
     page_mapping = {
-        "Добавить репозиторий": add_repository.show_add_repository_page,
-        "Чат": chat.show_chat_page,
-        "Метрики": metrics.show_metrics_page,
-        "Сложность кода": complexity.show_complexity_page,
-        "Ошибки": mistakes.show_mistakes_page,
-        "Code Smells": code_smells.show_code_smells_page,
-        "Кастомные метрики": custom.show_custom_page,
-        "Проблемные файлы": problem_mistakes.show_problem_file,
+        "Добавить репозиторий": ("ui.pages.add_repository", "show_add_repository_page"),
+        "Чат": ("ui.pages.chat", "show_chat_page"),
+        "Метрики": ("ui.pages.metrics", "show_metrics_page"),
+        "Сложность кода": ("ui.pages.complexity", "show_complexity_page"),
+        "Ошибки": ("ui.pages.mistakes", "show_mistakes_page"),
+        "Code Smells": ("ui.pages.code_smells", "show_code_smells_page"),
+        "Кастомные метрики": ("ui.pages.custom", "show_custom_page"),
+        "Проблемные файлы": ("ui.pages.problem_mistakes", "show_problem_file"),
     }
     
     if selected_tab in page_mapping:
+        module_name, function_name = page_mapping[selected_tab]
+        show_page = getattr(importlib.import_module(module_name), function_name)
         # Если это вкладка с проблемными файлами, можно передавать необходимые данные или пустой словарь
         if selected_tab.startswith("Проблемные файлы"):
-            page_mapping[selected_tab]({})
+            show_page({})
         else:
-            page_mapping[selected_tab]()
+            show_page()
 
 if __name__ == "__main__":
     main()
@@ -2,9 +2,55 @@ import streamlit as st
 import requests
 import time
 import os
-from ai.tools.rag_tool import initialize_vector_db_from_github
-import git
-from ai.graphs.code_analyse import integrated_code_analysis_graph
+from ai.jobs import JOBS_DB, DONE, FAILED, JobRunner, JobStore
+
+JOB_WORKERS = int(os.getenv("GITMETRICS_JOB_WORKERS", "2"))
+JOB_POLL_SECONDS = 2
+
+# Подписи счетчиков прогресса задачи
+PROGRESS_LABELS = {
+    "files_linted": "Файлов проверено линтерами",
+    "files_complexity": "Файлов проверено на сложность",
+    "files_error_searched": "Файлов проверено на ошибки",
+    "llm_calls": "Запросов к LLM",
+}
+
+
+@st.cache_resource
+def get_job_store():
+    """Хранилище задач и (если воркер не запущен отдельно) пул воркеров, один на сервер"""
+    store = JobStore(JOBS_DB)
+    if not os.getenv("GITMETRICS_EXTERNAL_WORKER"):
+        JobRunner(store, workers=JOB_WORKERS).start()
+    return store
+
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def show_job_status(job_id):
+    """Статус задачи анализа; фрагмент перерисовывается сам, пока задача идет"""
+    job = get_job_store().get(job_id)
+    if job is None:
+        return
+    
+    progress = job["progress"]
+    total = progress.get("files_total", 0)
+    if job["status"] == "queued":
+        st.info("Анализ в очереди...")
+    elif job["status"] == "running":
+        done = progress.get("files_linted", 0) + progress.get("files_complexity", 0) + progress.get("files_error_searched", 0)
+        fraction = min(done / (3 * total), 1.0) if total else 0.0
+        st.progress(fraction, text=f"Производим анализ: {job['stage'] or 'подготовка'}")
+        for counter, label in PROGRESS_LABELS.items():
+            if counter in progress:
+                st.caption(f"{label}: {progress[counter]}" + (f" / {total}" if total and counter != "llm_calls" else ""))
+    elif job["status"] == FAILED:
+        st.error(f"Анализ завершился с ошибкой: {job['error']}")
+    elif job["status"] == DONE:
+        st.success(job["message"] or "Анализ завершен")
+        if st.session_state.get("analysis_jobs", {}).pop(job["repo_url"], None) == job_id:
+            # Переходим на вкладку "Метрики"
+            st.session_state["selected_main_tab"] = "Метрики"
+            st.rerun(scope="app")
 
 
 def is_private_repository(repo_url):
@@ -42,64 +88,6 @@ def get_branches(repo_url):
         st.error(f"Ошибка при выполнении запроса: {str(e)}")
         return []
 
-def get_latest_commit(storage_repo_path):
-    """Возвращает хеш последнего коммита в локальном репозитории."""
-    try:
-        repo = git.Repo(storage_repo_path)
-        return repo.head.commit.hexsha
-    except (git.exc.InvalidGitRepositoryError, ValueError):
-        return None
-
-def run_all_analyses(repo_url):
-    """Запускает все анализы для репозитория при необходимости."""
-    repo_name = repo_url.split("/")[-1]
-    storage_dir = f"storage/{repo_name}"
-    repo_path = os.path.join(storage_dir, "repo")
-    
-    # Пути к файлам отчетов
-    error_report_path = os.path.join(storage_dir, "error_report.json")
-    complexity_report_path = os.path.join(storage_dir, "complexity_report.json")
-    linters_report_path = os.path.join(storage_dir, "linters_report.json")
-    
-    # Проверка существования репозитория
-    if os.path.exists(repo_path):
-        latest_commit = get_latest_commit(repo_path)
-        
-        # Проверка удаленного репозитория на новый коммит
-        try:
-            temp_repo = git.Repo.clone_from(repo_url, "temp_repo", depth=1)
-            remote_commit = temp_repo.head.commit.hexsha
-            temp_repo.close()
-            os.system("rm -rf temp_repo")  # Удаление временного клона
-        except git.exc.GitCommandError:
-            remote_commit = None
-        
-        if latest_commit == remote_commit and all(os.path.exists(p) for p in [error_report_path, complexity_report_path, linters_report_path]):
-            return {"result": "Анализ не требуется", "storage_dir": storage_dir}
-    
-    # Если нет репозитория, или есть новый коммит, или нет отчетов - анализируем
-    os.makedirs(storage_dir, exist_ok=True)
-    if os.path.exists(repo_path):
-        os.system(f"rm -rf {repo_path}")  # Удаление старого репозитория перед клонированием
-    
-    try:
-        git.Repo.clone_from(repo_url, repo_path)
-    except git.exc.GitCommandError:
-        return {"result": "Ошибка при клонировании репозитория", "storage_dir": storage_dir}
-    
-    initialize_vector_db_from_github(repo_url)
-    
-    input_state = {
-        "repo_url": repo_url,
-        "use_llm": True,
-        "output_linter_path": linters_report_path,
-        "output_complexity_path": complexity_report_path,
-        "output_error_path": error_report_path
-    }
-    result = integrated_code_analysis_graph.invoke(input_state)
-    
-    return {"result": result, "storage_dir": storage_dir}
-
 def show_add_repository_page():
     st.title("Добавить репозиторий")
     
@@ -132,25 +120,21 @@ def show_add_repository_page():
                 st.session_state["analysis_ready"] = True
     
     if st.session_state.get("analysis_ready"):
+        # Получаем URL текущего выбранного репозитория
+        current_repo = st.session_state["repositories"][st.session_state["selected_repo_index"]]
+        repo_url = current_repo["url"]
+        store = get_job_store()
+        
         analyze_btn = st.button("Анализ")
         if analyze_btn:
-            with st.spinner("Производим анализ..."):
-                # Получаем URL текущего выбранного репозитория
-                current_repo = st.session_state["repositories"][st.session_state["selected_repo_index"]]
-                repo_url = current_repo["url"]
-                
-                # Запускаем все анализы
-                analysis_results = run_all_analyses(repo_url)
-                
-                # Сохраняем результаты в session_state для доступа на других вкладках
-                if "analysis_results" not in st.session_state:
-                    st.session_state["analysis_results"] = {}
-                
-                st.session_state["analysis_results"][repo_url] = analysis_results
-                st.session_state["analysis_completed"] = True
-            
-            # Переходим на вкладку "Метрики"
-            st.session_state["selected_main_tab"] = "Метрики"
-            st.rerun()
+            # Анализ ставится в очередь; повторное нажатие вернет уже активную задачу
+            st.session_state.setdefault("analysis_jobs", {})[repo_url] = store.submit(repo_url)
+        
+        job_id = st.session_state.get("analysis_jobs", {}).get(repo_url)
+        if job_id is None:
+            active_job = store.active_job(repo_url)
+            job_id = active_job["id"] if active_job else None
+        if job_id:
+            show_job_status(job_id)
     else:
         st.button("Анализ", disabled=True)
\ No newline at end of file
@@ -1,8 +1,11 @@
 import streamlit as st
 
-from langchain.schema import HumanMessage
-from ai.graphs.chat_graph import chat_graph
+from langchain_core.messages import HumanMessage
+from ai.graphs.chat_graph import stream_chat, make_thread_id, get_chat_history
 import re
+import uuid
+
+GREETING = {"role": "assistant", "content": "Привет! Чем могу помочь?"}
 
 # Функция для получения короткого имени репозитория
 def get_short_repo_name(url: str) -> str:
@@ -22,16 +25,38 @@ def get_vector_db_path():
     else:
         return "storage/default/vectore_store/"
 
+# Функция для получения потока диалога: отдельный для пользователя, репозитория и ветки
+def get_chat_thread_id():
+    if "chat_user_id" not in st.session_state:
+        # Идентификатор хранится в URL, чтобы история переживала перезагрузку страницы
+        user_id = st.query_params.get("uid") or uuid.uuid4().hex
+        st.query_params["uid"] = user_id
+        st.session_state["chat_user_id"] = user_id
+    selected_repo = st.session_state["selected_repo"]
+    return make_thread_id(
+        st.session_state["chat_user_id"],
+        selected_repo.get("repo_name", "default"),
+        selected_repo.get("branch", "main")
+    )
+
+def get_thread_messages(thread_id):
+    """История сообщений потока; при первом открытии восстанавливается из хранилища"""
+    if "chat_histories" not in st.session_state:
+        st.session_state.chat_histories = {}
+    if thread_id not in st.session_state.chat_histories:
+        try:
+            history = get_chat_history({"configurable": {"thread_id": thread_id}})
+        except Exception:
+            history = []
+        st.session_state.chat_histories[thread_id] = [GREETING] + history
+    return st.session_state.chat_histories[thread_id]
+
 def show_chat_page():
     st.title("Чат по выбранному репозиторию")
 
     # Инициализация переменных сессии
     if "selected_repo" not in st.session_state:
         st.session_state.selected_repo = None
-    if "chat1_messages" not in st.session_state:
-        st.session_state.chat1_messages = [
-            {"role": "assistant", "content": "Привет! Чем могу помочь?"}
-        ]
     
     if not st.session_state.get("selected_repo"):
         # Временное решение для тестирования
@@ -44,49 +69,66 @@ def show_chat_page():
     st.write(f"Текущий репозиторий: **{st.session_state['selected_repo']['repo_name']}**")
     st.write(f"Ветка: **{st.session_state['selected_repo']['branch']}**")
 
-    # Получаем путь к векторной базе данных для текущего репозитория
+    # Получаем путь к векторной базе данных и поток диалога для текущего репозитория
     vector_db_path = get_vector_db_path()
+    thread_id = get_chat_thread_id()
+    chat_messages = get_thread_messages(thread_id)
     
     with st.sidebar:
         st.subheader("Информация о векторной базе данных")
         st.info(f"Путь к векторной базе данных: {vector_db_path}")
 
     # Отображаем историю сообщений
-    for msg in st.session_state.chat1_messages:
+    for msg in chat_messages:
         st.chat_message(msg["role"]).write(msg["content"])
 
     # Текстовый чат
     if prompt := st.chat_input(placeholder="Введите запрос"):
-        st.session_state.chat1_messages.append({"role": "user", "content": prompt})
+        chat_messages.append({"role": "user", "content": prompt})
         st.chat_message("user").write(prompt)
 
         # Обработка текстового запроса
-        process_text_query(prompt, vector_db_path)
+        process_text_query(prompt, vector_db_path, thread_id)
 
-def process_text_query(prompt, vector_db_path):
+def process_text_query(prompt, vector_db_path, thread_id):
     """Обрабатывает текстовый запрос и возвращает ответ, используя графовый чат"""
     try:
         # Создаем сообщение в формате HumanMessage
         messages = [HumanMessage(content=prompt)]
         
-        # Вызываем графовый чат
+        # Вызываем графовый чат и показываем ответ по мере генерации
         with st.chat_message("assistant"):
-            with st.spinner("Обрабатываю запрос..."):
-                # Вызываем графовый чат с динамическим путем к векторной базе
-                res = chat_graph.invoke({
-                    "messages": messages,
-                    "vector_db_path": vector_db_path
-                }, config={"configurable": {"thread_id": "default"}})
-                
-                # Получаем ответ из результата
-                response = res['messages'][-1].content
-                
-                # Добавляем ответ в историю сообщений
-                st.session_state.chat1_messages.append({"role": "assistant", "content": response})
-                st.write(response)
-                return response
+            status = st.status("Обрабатываю запрос...", expanded=False)
+            placeholder = st.empty()
+            response = ""
+            
+            # Вызываем графовый чат с динамическим путем к векторной базе
+            for event in stream_chat({
+                "messages": messages,
+                "vector_db_path": vector_db_path
+            }, config={"configurable": {"thread_id": thread_id}}):
+                if event["type"] == "tool_call":
+                    # Текст до вызова инструмента - рассуждение агента, а не ответ
+                    response = ""
+                    placeholder.empty()
+                    status.update(label=f"Вызываю {event['name']}...")
+                    status.write(f"🔧 {event['name']}")
+                elif event["type"] == "tool_result":
+                    status.write(f"✅ {event['name']} выполнен")
+                elif event["type"] == "token":
+                    response += event["text"]
+                    placeholder.markdown(response + "▌")
+                elif event["type"] == "final":
+                    response = event["content"]
+            
+            status.update(label="Готово", state="complete")
+            placeholder.markdown(response)
+            
+            # Добавляем ответ в историю сообщений
+            get_thread_messages(thread_id).append({"role": "assistant", "content": response})
+            return response
     except Exception as e:
         error_msg = f"Произошла ошибка при обработке запроса: {str(e)}"
         st.error(error_msg)
-        st.session_state.chat1_messages.append({"role": "assistant", "content": error_msg})
+        get_thread_messages(thread_id).append({"role": "assistant", "content": error_msg})
         return error_msg
\ No newline at end of file
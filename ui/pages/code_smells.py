@@ -1,9 +1,8 @@
 import streamlit as st
 import pandas as pd
-import json
-import os
 import re
-import matplotlib.pyplot as plt
+
+from ui.reports import load_table, report_path, report_view
 
 def get_short_repo_name(url: str) -> str:
     url = re.sub(r"\.git$", "", url)
@@ -25,38 +24,28 @@ def show_code_smells_page():
     repo_url = selected_repo["url"]
     repo_name = get_short_repo_name(repo_url)
     
-    # Формируем путь к JSON-файлу с отчетом
-    json_path = f"./storage/{repo_name}/linters_report.json"
-    
-    # Проверяем существование файла
-    if not os.path.exists(json_path):
-        st.error(f"Файл с отчетом не найден: {json_path}")
-        return
-    
     try:
-        # Загружаем данные из JSON-файла
-        with open(json_path, 'r') as file:
-            linters_data = json.load(file)
+        # Отчет и сводка по файлам кэшируются до следующей перезаписи файла
+        files_df = load_table(repo_name, "files", ["file", "lint_errors"])
+        if files_df is not None:
+            files_df = files_df.sort_values(by="lint_errors", ascending=False)
+            summary = {"total": int(files_df["lint_errors"].sum()),
+                       "rows": list(zip(files_df["file"], files_df["lint_errors"]))}
+        else:
+            summary = report_view(repo_name, "linters", "linter_rows")
+        if summary is None:
+            st.error(f"Файл с отчетом не найден: {report_path(repo_name, 'linters')}")
+            return
         
-        # Рассчитываем общее количество ошибок
-        total_code_smells = sum(item['error_count'] for item in linters_data)
+        total_code_smells = summary["total"]
         
         # Выводим общую метрику Code Smells
         st.metric("Всего Code Smells", total_code_smells, 
                  help="Общее количество проблем, обнаруженных в последнем коммите")
         
         # Формируем данные для визуализации
-        files = [item['file'] for item in linters_data]
-        error_counts = [item['error_count'] for item in linters_data]
-        
-        # Создаем DataFrame для таблицы и диаграммы
-        df = pd.DataFrame({
-            "Файл": files,
-            "Количество ошибок": error_counts
-        })
-        
-        # Сортируем по количеству ошибок (по убыванию)
-        df = df.sort_values(by="Количество ошибок", ascending=False)
+        # Строки уже отсортированы по убыванию количества ошибок
+        df = pd.DataFrame(summary["rows"], columns=["Файл", "Количество ошибок"])
         
         # Отображаем столбчатую диаграмму
         st.subheader("Распределение ошибок по файлам")
@@ -69,9 +58,8 @@ def show_code_smells_page():
         # При нажатии на кнопку "Подробнее о Code Smells" выбирается первый файл с ошибками
         if st.button("Подробнее о недочётах"):
             # Находим первый файл с ошибками
-            for file in files:
-                file_data = next((item for item in linters_data if item['file'] == file and item['error_count'] > 0), None)
-                if file_data:
+            for file, error_count in summary["rows"]:
+                if error_count > 0:
                     st.session_state["selected_problem_file"] = file
                     st.session_state["selected_main_tab"] = "Проблемные файлы"
                     break
@@ -1,24 +1,27 @@
 import streamlit as st
 import pandas as pd
-import json
-import os
 import re
 
+from ui.reports import load_table, report_path, report_view
+
 def get_short_repo_name(url: str) -> str:
     url = re.sub(r"\.git$", "", url)
     parts = url.split("/")
     return parts[-1] if parts else "unknown"
 
-def load_complexity_report(repo_name):
-    """Load the complexity report JSON file for the selected repository."""
-    file_path = f"storage/{repo_name}/complexity_report.json"
+def load_complexity_summary(repo_name):
+    """Total complexity and per-file rows of the selected repository (cached per report version)."""
     try:
-        if os.path.exists(file_path):
-            with open(file_path, 'r', encoding='utf-8') as file:
-                return json.load(file)
-        else:
-            st.warning(f"Файл отчета не найден: {file_path}")
-            return None
+        # Колоночная таблица читает только два столбца, без разбора всего JSON
+        files_df = load_table(repo_name, "files", ["file", "total_complexity"])
+        if files_df is not None:
+            files_df = files_df.sort_values(by="total_complexity", ascending=False)
+            rows = list(zip(files_df["file"], files_df["total_complexity"]))
+            return {"total": int(files_df["total_complexity"].sum()), "rows": rows}
+        summary = report_view(repo_name, "complexity", "complexity_rows")
+        if summary is None:
+            st.warning(f"Файл отчета не найден: {report_path(repo_name, 'complexity')}")
+        return summary
     except Exception as e:
         st.error(f"Ошибка при загрузке отчета: {e}")
         return None
@@ -43,28 +46,20 @@ def show_complexity_page():
     st.session_state["selected_metric"] = "Сложность кода"
 
     try:
-        linters_data = load_complexity_report(repo_name)
+        summary = load_complexity_summary(repo_name)
+        if summary is None:
+            return
         
-        # Рассчитываем общее количество ошибок
-        total_code_smells = sum(file_data.get('total_complexity', 0) for file_data in linters_data.values())
+        # Общая сложность уже посчитана в кэшированном представлении
+        total_code_smells = summary["total"]
         
         # Выводим общую метрику Code Smells
         st.metric("Всего Code Smells", total_code_smells, 
                  help="Общее количество проблем, обнаруженных в последнем коммите")
         
         # Формируем данные для визуализации
-        files = [file_data['file_path'] for file_data in linters_data.values()]
-        error_counts = [file_data.get('total_complexity', 0) for file_data in linters_data.values()]
-
-        
-        # Создаем DataFrame для таблицы и диаграммы
-        df = pd.DataFrame({
-            "Файл": files,
-            "Количество ошибок": error_counts
-        })
-        
-        # Сортируем по количеству ошибок (по убыванию)
-        df = df.sort_values(by="Количество ошибок", ascending=False)
+        # Строки уже отсортированы по убыванию сложности
+        df = pd.DataFrame(summary["rows"], columns=["Файл", "Количество ошибок"])
         
         # Отображаем столбчатую диаграмму
         st.subheader("Распределение ошибок по файлам")
@@ -87,9 +82,8 @@ def show_complexity_page():
         # При нажатии на кнопку "Подробнее о Code Smells" выбирается первый файл с ошибками
         if st.button("Подробнее о недочётах"):
             # Находим первый файл с ошибками
-            for file in files:
-                file_data = next((item for item in linters_data if item['file'] == file and item['error_count'] > 0), None)
-                if file_data:
+            for file, complexity in summary["rows"]:
+                if complexity > 0:
                     st.session_state["selected_problem_file"] = file
                     st.session_state["selected_main_tab"] = "Проблемные файлы"
                     break
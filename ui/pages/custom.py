@@ -1,7 +1,6 @@
 import streamlit as st
 import re
 import os
-from ai.graphs.custom_criteria_graph import custom_criteria_graph
 
 def get_short_repo_name(url: str) -> str:
     url = re.sub(r"\.git$", "", url)
@@ -13,6 +12,7 @@ def generate_report(repo_url, criteria):
     folder_path = f"storage/{repo_name}"
     os.makedirs(folder_path, exist_ok=True)
     
+    from ai.graphs.custom_criteria_graph import custom_criteria_graph
     report = custom_criteria_graph.invoke({
         "repo_url": repo_url,
         "criteria": criteria,
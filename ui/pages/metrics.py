@@ -1,30 +1,16 @@
 import streamlit as st
+import pandas as pd
 import re
-import json
 import os
 
+from ui.reports import load_report, report_view
+from ai.storage.metrics_store import METRICS_DB, MetricsStore
+
 def get_short_repo_name(url: str) -> str:
     url = re.sub(r"\.git$", "", url)
     parts = url.split("/")
     return parts[-1] if parts else "unknown"
 
-def get_linters_score(linters_data):
-    sum_score = sum(item['error_count'] for item in linters_data)
-    
-    return sum_score
-
-def load_json(filepath: str):
-    if os.path.exists(filepath):
-        with open(filepath, "r", encoding="utf-8") as file:
-            return json.load(file)
-    return None
-
-def calculate_average_complexity(complexity_data):
-    if not complexity_data:
-        return "N/A"
-    complexities = [file_data["average_complexity"] for file_data in complexity_data.values()]
-    return round(sum(complexities) / len(complexities), 2) if complexities else "N/A"
-
 def get_error_score(error_data):
     return error_data.get("repository_summary", {}).get("total_issues", "N/A") if error_data else "N/A"
 
@@ -49,17 +35,13 @@ def show_metrics_page():
         st.error("Репозиторий не выбран.")
         return
     
-    complexity_path = f"storage/{short_name}/complexity_report.json"
-    error_path = f"storage/{short_name}/error_report.json"
-    linters_path = f"storage/{short_name}/linters_report.json"
-
-    complexity_data = load_json(complexity_path)
-    error_data = load_json(error_path)
-    linters_data = load_json(linters_path)
-
-    avg_complexity = calculate_average_complexity(complexity_data) if complexity_data else "N/A"
-    error_score = get_error_score(error_data) if error_data else "N/A"
-    linters_score = get_linters_score(linters_data) if linters_data else "N/A"
+    # Отчеты и производные значения кэшируются до следующей перезаписи файлов
+    avg_complexity = report_view(short_name, "complexity", "average_complexity")
+    if avg_complexity is None:
+        avg_complexity = "N/A"
+    error_score = get_error_score(load_report(short_name, "errors"))
+    linter_summary = report_view(short_name, "linters", "linter_rows")
+    linters_score = linter_summary["total"] if linter_summary and linter_summary["rows"] else "N/A"
     
     st.markdown("""
         <style>
@@ -122,4 +104,40 @@ def show_metrics_page():
             '<p>В последнем коммите найдено ошибок</p>'
             '</div>',
             unsafe_allow_html=True
-        )
\ No newline at end of file
+        )
+
+    show_metrics_history(short_name)
+
+@st.cache_resource(show_spinner=False)
+def get_metrics_store(path: str) -> MetricsStore:
+    # Конструктор открывает базу и применяет схему: один раз на процесс, а не на каждый рендер
+    return MetricsStore(path)
+
+def show_metrics_history(repo_name):
+    """Динамика метрик по прогонам анализа и изменения с предыдущего прогона"""
+    if not os.path.exists(METRICS_DB):
+        return
+    store = get_metrics_store(METRICS_DB)
+    runs = store.history(repo_name)
+    if len(runs) < 2:
+        return
+
+    st.subheader("Динамика по прогонам")
+    history_df = pd.DataFrame(runs)
+    history_df["Дата"] = pd.to_datetime(history_df["created_at"], unit="s")
+    st.line_chart(
+        history_df.set_index("Дата")[["total_complexity", "lint_errors", "total_issues"]].rename(columns={
+            "total_complexity": "Сложность",
+            "lint_errors": "Code Smells",
+            "total_issues": "Ошибки",
+        }),
+        use_container_width=True
+    )
+
+    base_run, head_run = runs[-2], runs[-1]
+    changes = store.diff_runs(base_run["id"], head_run["id"])
+    st.caption(f"Изменения: {(base_run['commit_sha'] or '?')[:8]} → {(head_run['commit_sha'] or '?')[:8]}")
+    if changes:
+        st.dataframe(pd.DataFrame(changes), use_container_width=True)
+    else:
+        st.info("Метрики файлов не изменились")
@@ -1,15 +1,34 @@
 import streamlit as st
 import pandas as pd
-import json
-import os
 import re
 import altair as alt
 
+from ui.reports import load_table, report_path, report_view
+
+# Столбцы таблицы files -> ключи строк представления error_rows
+ERROR_COLUMNS = {
+    "file": "file",
+    "total_issues": "total",
+    "high_priority": "high",
+    "medium_priority": "medium",
+    "low_priority": "low",
+    "error_score": "error_score",
+    "error_summary": "errors",
+}
+
 def get_short_repo_name(url: str) -> str:
     url = re.sub(r"\.git$", "", url)
     parts = url.split("/")
     return parts[-1] if parts else "unknown"
 
+def load_error_summary(repo_name):
+    """Сводка ошибок: из колоночной таблицы, если она есть, иначе из JSON-отчета"""
+    files_df = load_table(repo_name, "files", list(ERROR_COLUMNS))
+    if files_df is None:
+        return report_view(repo_name, "errors", "error_rows")
+    files_df = files_df.rename(columns=ERROR_COLUMNS).sort_values(by="total", ascending=False)
+    return {"total": int(files_df["total"].sum()), "files": files_df.to_dict("records")}
+
 def show_mistakes_page():
     st.title("Ошибки")
 
@@ -25,43 +44,28 @@ def show_mistakes_page():
         st.sidebar.warning("Репозиторий не выбран")
         return
     
-    # Путь к JSON-файлу с отчетом об ошибках
-    json_path = f"storage/{repo_name}/error_report.json"
-    
     try:
-        # Загрузка данных из JSON
-        if os.path.exists(json_path):
-            with open(json_path, 'r', encoding='utf-8') as f:
-                error_data = json.load(f)
-                
-            # Извлечение общей информации
-            repo_summary = error_data.get("repository_summary", {})
-            total_errors = repo_summary.get("total_issues", 0)
+        # Отчет и сводка по файлам кэшируются до следующей перезаписи файла
+        error_summary = load_error_summary(repo_name)
+        if error_summary is not None:
+            total_errors = error_summary["total"]
             
             # Вывод общей метрики ошибок
             st.metric("Всего ошибок", total_errors, help="Общее количество ошибок в последнем коммите")
             
-            # Получаем данные по файлам для столбчатой диаграммы
-            file_reports = error_data.get("file_reports", {})
+            # Данные по файлам уже отсортированы по общему количеству ошибок
+            file_rows = error_summary["files"]
             
-            if file_reports:
+            if file_rows:
                 # Создаем DataFrame для построения графика
-                files_data = []
-                for file_name, report in file_reports.items():
-                    metrics = report.get("metrics", {})
-                    files_data.append({
-                        "Файл": file_name,
-                        "Всего": metrics.get("total_issues", 0),  # Переименовано из "Количество"
-                        "Высокий приоритет": metrics.get("high_priority", 0),
-                        "Средний приоритет": metrics.get("medium_priority", 0),
-                        "Низкий приоритет": metrics.get("low_priority", 0),
-                        "Error Score": metrics.get("error_score", 0)
-                    })
-                
-                files_df = pd.DataFrame(files_data)
-                
-                # Сортировка файлов по общему количеству ошибок
-                files_df = files_df.sort_values(by="Всего", ascending=False)
+                files_df = pd.DataFrame({
+                    "Файл": [row["file"] for row in file_rows],
+                    "Всего": [row["total"] for row in file_rows],
+                    "Высокий приоритет": [row["high"] for row in file_rows],
+                    "Средний приоритет": [row["medium"] for row in file_rows],
+                    "Низкий приоритет": [row["low"] for row in file_rows],
+                    "Error Score": [row["error_score"] for row in file_rows],
+                })
                 
                 # Столбчатая диаграмма с ошибками по файлам
                 st.subheader("Распределение ошибок по файлам")
@@ -91,33 +95,12 @@ def show_mistakes_page():
                 # Отображаем таблицу с проблемными файлами
                 st.subheader("Проблемные файлы")
                 
-                # Подготовка данных для отображения в таблице
-                table_data = []
-                
-                for file_name, report in file_reports.items():
-                    metrics = report.get("metrics", {})
-                    issues = report.get("issues", {})
-                    
-                    # Формируем список ошибок для файла
-                    error_descriptions = []
-                    for issue_id, issue_data in issues.items():
-                        error_text = issue_data.get("error", "")
-                        error_descriptions.append(error_text)
-                    
-                    # Объединяем описания ошибок в одну строку
-                    error_str = ", ".join(error_descriptions[:2])
-                    if len(error_descriptions) > 2:
-                        error_str += f" и еще {len(error_descriptions) - 2} ошибок"
-                    
-                    table_data.append({
-                        "Файл": file_name,
-                        "Количество": metrics.get("total_issues", 0),
-                        "Ошибка": error_str
-                    })
-                
-                # Создаем DataFrame для таблицы
-                table_df = pd.DataFrame(table_data)
-                table_df = table_df.sort_values(by="Количество", ascending=False)
+                # Таблица: первые ошибки каждого файла уже собраны в строку
+                table_df = pd.DataFrame({
+                    "Файл": [row["file"] for row in file_rows],
+                    "Количество": [row["total"] for row in file_rows],
+                    "Ошибка": [row["errors"] for row in file_rows],
+                })
                 
                 # Устанавливаем выбранную метрику – "Ошибки"
                 st.session_state["selected_metric"] = "Ошибки"
@@ -133,6 +116,6 @@ def show_mistakes_page():
             else:
                 st.info("Нет данных об ошибках в файлах")
         else:
-            st.error(f"Файл отчета не найден: {json_path}")
+            st.error(f"Файл отчета не найден: {report_path(repo_name, 'errors')}")
     except Exception as e:
         st.error(f"Ошибка при загрузке или обработке данных: {str(e)}")
\ No newline at end of file
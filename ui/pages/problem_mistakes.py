@@ -4,6 +4,8 @@ import os
 from streamlit.components.v1 import html
 import re
 
+from ui.reports import METRIC_REPORTS, report_path, report_view
+
 
 def get_short_repo_name(url: str) -> str:
     url = re.sub(r"\.git$", "", url)
@@ -11,34 +13,27 @@ def get_short_repo_name(url: str) -> str:
     return parts[-1] if parts else "unknown"
 
 
-def load_repository_data(repo_name, selected_metric):
+def load_repository_view(repo_name, selected_metric, view, *args):
     """
-    Load appropriate report data based on selected metric.
+    Cached view of the report behind the selected metric (see ui/report_views.py).
     
     Args:
         repo_name (str): Name of the repository being analyzed
         selected_metric (str): Selected metric type ("Сложность кода", "Ошибки", or "Code Smells")
+        view (str): Name of the derived view
         
     Returns:
-        dict: Report data
+        View result, or None if the report is missing or unreadable
     """
-    report_path = ""
-    if selected_metric == "Сложность кода":
-        report_path = os.path.join("storage", repo_name, "complexity_report.json")
-    elif selected_metric == "Ошибки":
-        report_path = os.path.join("storage", repo_name, "error_report.json")
-    elif selected_metric == "Code Smells":
-        report_path = os.path.join("storage", repo_name, "linters_report.json")
-    
+    kind = METRIC_REPORTS[selected_metric]
     try:
-        with open(report_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        st.error(f"Файл отчета не найден: {report_path}")
-        return {}
+        result = report_view(repo_name, kind, view, *args)
     except json.JSONDecodeError:
-        st.error(f"Ошибка при чтении JSON из файла: {report_path}")
-        return {}
+        st.error(f"Ошибка при чтении JSON из файла: {report_path(repo_name, kind)}")
+        return None
+    if result is None:
+        st.error(f"Файл отчета не найден: {report_path(repo_name, kind)}")
+    return result
 
 
 def load_source_file(repo_name, file_path):
@@ -116,53 +111,12 @@ def draw_problem_sidebar(prefix):
         st.sidebar.warning("Репозиторий не выбран")
         return
     
-    # Загрузить данные отчета в зависимости от выбранной метрики
-    report_data = load_repository_data(repo_name, selected_metric)
+    # Список файлов, уже отсортированный по количеству проблем, кэшируется вместе с отчетом
+    sorted_files = load_repository_view(repo_name, selected_metric, "problem_files", selected_metric)
     
-    # Подготовка списка файлов для отображения в сайдбаре
-    files_list = []
-    
-    if selected_metric == "Сложность кода":
-        for file_path, file_data in report_data.items():
-            # Пропустить файлы без фрагментов с проблемами
-            if len(file_data.get("fragments", [])) > 0:
-                base_filename = extract_base_filename(file_path)
-                files_list.append({
-                    "file_name": base_filename,
-                    "file_path": file_path,  # Используем относительный путь
-                    "issues": len(file_data.get("fragments", [])),
-                    "complexity": file_data.get("total_complexity", 0)
-                })
-    elif selected_metric == "Ошибки":
-        if "file_reports" in report_data:
-            for file_path, file_data in report_data["file_reports"].items():
-                files_list.append({
-                    "file_name": file_path,
-                    "file_path": file_path,  # Используем относительный путь
-                    "issues": file_data.get("metrics", {}).get("total_issues", 0)
-                })
-    elif selected_metric == "Code Smells":
-        # Обработка данных для Code Smells
-        for file_data in report_data:
-            file_name = file_data.get("file", "")
-            error_count = file_data.get("error_count", 0)
-            fixed_code = file_data.get("fixed_code", "")
-            
-            # Добавляем только файлы с ошибками или с исправленным кодом
-            if error_count > 0 or fixed_code:
-                files_list.append({
-                    "file_name": file_name,
-                    "file_path": file_name,
-                    "issues": error_count,
-                    "has_fixed_code": bool(fixed_code)
-                })
-    
-    if not files_list:
+    if not sorted_files:
         st.sidebar.info("Нет проблемных файлов для выбранной метрики.")
     else:
-        # Сортировка файлов по количеству проблем по убыванию
-        sorted_files = sorted(files_list, key=lambda x: x["issues"], reverse=True)
-    
         for idx, file in enumerate(sorted_files):
             file_name = file["file_name"]
             issues_count = file["issues"]
@@ -190,52 +144,10 @@ def prepare_issue_tooltips(repo_name, file_path, selected_metric):
     Returns:
         dict: Mapping from line numbers to tooltip content
     """
-    tooltips = {}
-    report_data = load_repository_data(repo_name, selected_metric)
-    
-    if selected_metric == "Сложность кода":
-        # В отчете о сложности ищем по полному пути
-        for path, data in report_data.items():
-            if path.endswith(file_path) or extract_base_filename(path) == file_path:
-                for fragment in data.get("fragments", []):
-                    start_line = fragment.get("start_line", 0)
-                    end_line = fragment.get("end_line", 0)
-                    
-                    for line in range(start_line, end_line + 1):
-                        tooltips[line] = {
-                            "text": fragment.get("description", ""),
-                            "solution": fragment.get("solve", ""),
-                            "criticality": fragment.get("criticality", "medium")
-                        }
-    
-    elif selected_metric == "Ошибки":
-        # В отчете об ошибках ищем по имени файла
-        file_data = report_data.get("file_reports", {}).get(file_path, {})
-        
-        for issue_id, issue in file_data.get("issues", {}).items():
-            rows_str = issue.get("rows", "")
-            # Обработка строк вида "34-37"
-            match = re.match(r"(\d+)-(\d+)", rows_str)
-            if match:
-                start_line = int(match.group(1))
-                end_line = int(match.group(2))
-            else:
-                try:
-                    start_line = int(rows_str)
-                    end_line = start_line
-                except ValueError:
-                    continue
-                
-            for line in range(start_line, end_line + 1):
-                tooltips[line] = {
-                    "text": issue.get("error", ""),
-                    "solution": issue.get("solution", ""),
-                    "criticality": issue.get("criticality", "medium")
-                }
-    
-    # Для Code Smells нет tooltips с привязкой к строкам, поэтому здесь они не обрабатываются
-    
-    return tooltips
+    # Для Code Smells нет tooltips с привязкой к строкам
+    if selected_metric == "Code Smells":
+        return {}
+    return load_repository_view(repo_name, selected_metric, "issue_tooltips", selected_metric, file_path) or {}
 
 
 def show_problem_file(repo_name):
@@ -263,14 +175,8 @@ def show_problem_file(repo_name):
     
     # Специальная обработка для Code Smells
     if selected_metric == "Code Smells":
-        report_data = load_repository_data(repo_name, selected_metric)
-        
         # Найти данные выбранного файла
-        file_data = None
-        for item in report_data:
-            if item.get("file") == file_path:
-                file_data = item
-                break
+        file_data = load_repository_view(repo_name, selected_metric, "linter_entry", file_path)
         
         if file_data:
             # Если есть исправленный код, отобразить его
@@ -0,0 +1,150 @@
+"""
+Derived views over the analysis reports in storage/<repo>/.
+
+Pure functions of the parsed JSON; ui/reports.py memoizes them per report
+version, so the returned objects are shared and must not be mutated.
+"""
+import os
+import re
+from typing import Dict, List, Optional
+
+
+def average_complexity(complexity_data: Dict):
+    complexities = [file_data["average_complexity"] for file_data in complexity_data.values()]
+    return round(sum(complexities) / len(complexities), 2) if complexities else "N/A"
+
+
+def complexity_rows(complexity_data: Dict) -> Dict:
+    """Total complexity of the repository and (file, complexity) pairs, largest first"""
+    rows = [(file_data["file_path"], file_data.get("total_complexity", 0))
+            for file_data in complexity_data.values()]
+    return {
+        "total": sum(complexity for _, complexity in rows),
+        "rows": sorted(rows, key=lambda row: row[1], reverse=True),
+    }
+
+
+def linter_rows(linters_data: List[Dict]) -> Dict:
+    """Total linter messages and (file, error_count) pairs, largest first"""
+    rows = [(item["file"], item["error_count"]) for item in linters_data]
+    return {
+        "total": sum(count for _, count in rows),
+        "rows": sorted(rows, key=lambda row: row[1], reverse=True),
+    }
+
+
+def error_rows(error_data: Dict) -> Dict:
+    """Per-file error metrics with a short description of the first issues, largest first"""
+    files = []
+    for file_name, report in error_data.get("file_reports", {}).items():
+        metrics = report.get("metrics", {})
+        descriptions = [issue.get("error", "") for issue in report.get("issues", {}).values()]
+        error_str = ", ".join(descriptions[:2])
+        if len(descriptions) > 2:
+            error_str += f" и еще {len(descriptions) - 2} ошибок"
+        files.append({
+            "file": file_name,
+            "total": metrics.get("total_issues", 0),
+            "high": metrics.get("high_priority", 0),
+            "medium": metrics.get("medium_priority", 0),
+            "low": metrics.get("low_priority", 0),
+            "error_score": metrics.get("error_score", 0),
+            "errors": error_str,
+        })
+    return {
+        "total": error_data.get("repository_summary", {}).get("total_issues", 0),
+        "files": sorted(files, key=lambda row: row["total"], reverse=True),
+    }
+
+
+def problem_files(report_data, metric: str) -> List[Dict]:
+    """Files shown in the problem sidebar for a metric, most issues first"""
+    files_list = []
+    if metric == "Сложность кода":
+        for file_path, file_data in report_data.items():
+            # Пропустить файлы без фрагментов с проблемами
+            if len(file_data.get("fragments", [])) > 0:
+                files_list.append({
+                    "file_name": os.path.basename(file_path),
+                    "file_path": file_path,
+                    "issues": len(file_data.get("fragments", [])),
+                    "complexity": file_data.get("total_complexity", 0)
+                })
+    elif metric == "Ошибки":
+        for file_path, file_data in report_data.get("file_reports", {}).items():
+            files_list.append({
+                "file_name": file_path,
+                "file_path": file_path,
+                "issues": file_data.get("metrics", {}).get("total_issues", 0)
+            })
+    elif metric == "Code Smells":
+        for file_data in report_data:
+            file_name = file_data.get("file", "")
+            error_count = file_data.get("error_count", 0)
+            fixed_code = file_data.get("fixed_code", "")
+            # Добавляем только файлы с ошибками или с исправленным кодом
+            if error_count > 0 or fixed_code:
+                files_list.append({
+                    "file_name": file_name,
+                    "file_path": file_name,
+                    "issues": error_count,
+                    "has_fixed_code": bool(fixed_code)
+                })
+    return sorted(files_list, key=lambda x: x["issues"], reverse=True)
+
+
+def _line_range(rows_str: str) -> Optional[range]:
+    # Строки вида "34-37" или "34"
+    match = re.match(r"(\d+)-(\d+)", rows_str)
+    if match:
+        return range(int(match.group(1)), int(match.group(2)) + 1)
+    try:
+        line = int(rows_str)
+    except ValueError:
+        return None
+    return range(line, line + 1)
+
+
+def issue_tooltips(report_data, metric: str, file_path: str) -> Dict[int, Dict]:
+    """Line number -> tooltip of the issue covering it (complexity and error reports only)"""
+    tooltips = {}
+    if metric == "Сложность кода":
+        # В отчете о сложности ищем по полному пути
+        for path, data in report_data.items():
+            if path.endswith(file_path) or os.path.basename(path) == file_path:
+                for fragment in data.get("fragments", []):
+                    for line in range(fragment.get("start_line", 0), fragment.get("end_line", 0) + 1):
+                        tooltips[line] = {
+                            "text": fragment.get("description", ""),
+                            "solution": fragment.get("solve", ""),
+                            "criticality": fragment.get("criticality", "medium")
+                        }
+    elif metric == "Ошибки":
+        file_data = report_data.get("file_reports", {}).get(file_path, {})
+        for issue in file_data.get("issues", {}).values():
+            lines = _line_range(issue.get("rows", ""))
+            if lines is None:
+                continue
+            for line in lines:
+                tooltips[line] = {
+                    "text": issue.get("error", ""),
+                    "solution": issue.get("solution", ""),
+                    "criticality": issue.get("criticality", "medium")
+                }
+    return tooltips
+
+
+def linter_entry(linters_data: List[Dict], file_path: str) -> Dict:
+    """Linter report item of a file, empty if the file has no messages"""
+    return next((item for item in linters_data if item.get("file") == file_path), {})
+
+
+VIEWS = {
+    "average_complexity": average_complexity,
+    "complexity_rows": complexity_rows,
+    "linter_rows": linter_rows,
+    "error_rows": error_rows,
+    "problem_files": problem_files,
+    "issue_tooltips": issue_tooltips,
+    "linter_entry": linter_entry,
+}
@@ -0,0 +1,108 @@
+"""
+Shared, memoized access to the reports in storage/<repo>/.
+
+Parsed reports, their derived views and the Parquet tables written next to
+them are kept in st.cache_resource, keyed by (path, mtime, size): they are shared by all sessions and pages and re-read
+only after the analysis rewrites a file. Returned objects are shared, so
+callers must not mutate them.
+"""
+import json
+import os
+from typing import Optional, Sequence, Tuple
+
+import streamlit as st
+
+from ui.report_views import VIEWS
+
+REPORT_FILES = {
+    "complexity": "complexity_report.json",
+    "errors": "error_report.json",
+    "linters": "linters_report.json",
+}
+
+# Метрика из интерфейса -> отчет, из которого она строится
+METRIC_REPORTS = {
+    "Сложность кода": "complexity",
+    "Ошибки": "errors",
+    "Code Smells": "linters",
+}
+
+
+def report_path(repo_name: str, kind: str) -> str:
+    return os.path.join("storage", repo_name, REPORT_FILES[kind])
+
+
+def _file_stamp(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+@st.cache_resource(show_spinner=False, max_entries=32)
+def _load_json(path: str, mtime_ns: int, size: int):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@st.cache_resource(show_spinner=False, max_entries=512)
+def _build_view(view: str, path: str, mtime_ns: int, size: int, args: tuple):
+    return VIEWS[view](_load_json(path, mtime_ns, size), *args)
+
+
+@st.cache_resource(show_spinner=False, max_entries=64)
+def _load_table(path: str, mtime_ns: int, size: int, columns: Optional[tuple]):
+    from ai.storage.columnar import read_table
+
+    return read_table(path, columns).to_pandas()
+
+
+def load_table(repo_name: str, name: str, columns: Optional[Sequence[str]] = None):
+    """
+    Columns of a report table (storage/<repo>/tables/<name>.parquet) as a DataFrame.
+
+    Returns None if the table was not written (older analyses) or pyarrow is not
+    available; the caller then falls back to the JSON report.
+    """
+    from ai.storage.columnar import TABLES_DIR, table_path
+
+    path = table_path(os.path.join("storage", repo_name, TABLES_DIR), name)
+    stamp = _file_stamp(path)
+    if stamp is None:
+        return None
+    try:
+        return _load_table(path, *stamp, tuple(columns) if columns else None)
+    except ImportError:
+        return None
+
+
+def load_report(repo_name: str, kind: str):
+    """
+    Parsed report of a repository, or None if it has not been generated yet.
+
+    Raises:
+        json.JSONDecodeError: the report file is corrupted
+    """
+    path = report_path(repo_name, kind)
+    stamp = _file_stamp(path)
+    if stamp is None:
+        return None
+    return _load_json(path, *stamp)
+
+
+def report_view(repo_name: str, kind: str, view: str, *args):
+    """
+    Derived view of a report (see ui/report_views.py), memoized per report version.
+
+    Example:
+        report_view(repo_name, "errors", "error_rows")
+        report_view(repo_name, "complexity", "issue_tooltips", "Сложность кода", file_path)
+
+    Returns None if the report does not exist.
+    """
+    path = report_path(repo_name, kind)
+    stamp = _file_stamp(path)
+    if stamp is None:
+        return None
+    return _build_view(view, path, *stamp, args)